@@ -8,6 +8,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import timedelta
 from ..config import settings
+from ..execution import ExecutorSaturated
 
 router = APIRouter()
 
@@ -33,9 +34,19 @@ class UserResponse(BaseModel):
     class Config:
         orm_mode = True
 
+def server_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = utils.authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await utils.authenticate_user_async(db, form_data.username, form_data.password)
+    except ExecutorSaturated:
+        raise server_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -59,8 +70,12 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create new user
-    hashed_password = utils.get_password_hash(user.password)
+    # Create new user; release the DB connection while the password is hashed
+    db.rollback()
+    try:
+        hashed_password = await utils.get_password_hash_async(user.password)
+    except ExecutorSaturated:
+        raise server_busy_exception()
     db_user = User(
         username=user.username,
         email=user.email,
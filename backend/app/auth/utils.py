@@ -2,22 +2,104 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+import threading
+import time
 from ..database import get_db
 from ..config import settings
+from ..execution import password_executor
 from .models import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+class PrincipalCache:
+    """
+    TTL- and size-bounded cache from access token to resolved user.
+    
+    Entries hold a detached copy of the ``User`` row and never outlive the
+    token's own ``exp`` claim. All entries for a user are dropped when that
+    user's account changes in this process; other worker processes only
+    notice once their entries expire, so ``ttl`` bounds how long a
+    deactivated user or revoked admin stays authenticated there. Keep it
+    short.
+    """
+    
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+    
+    def put(self, token: str, user: User, token_expires_at: Optional[float]) -> None:
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate_user(self, username: str) -> None:
+        with self._lock:
+            for token in [t for t, (user, _) in self._entries.items() if user.username == username]:
+                del self._entries[token]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache(ttl=settings.AUTH_CACHE_TTL_SECONDS, max_size=settings.AUTH_CACHE_MAX_SIZE)
+
+@event.listens_for(User, "after_update")
+def _invalidate_cached_principal(mapper, connection, target):
+    # Drop cached tokens when a user's status or identity changes in this process
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("is_active", "is_admin", "username", "email")):
+        for username in {target.username, *state.attrs.username.history.deleted}:
+            principal_cache.invalidate_user(username)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_principal(mapper, connection, target):
+    principal_cache.invalidate_user(target.username)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password on the dedicated hashing pool instead of the event loop."""
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Hash a password on the dedicated hashing pool instead of the event loop."""
+    return await password_executor.run(get_password_hash, password)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -39,7 +121,30 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
+async def authenticate_user_async(db: Session, username: str, password: str):
+    user = get_user(db, username)
+    if not user:
+        return False
+    # End the read transaction so the pooled DB connection is not held while
+    # waiting for the hashing pool
+    db.expunge(user)
+    db.rollback()
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
+def detached_copy(user: User) -> User:
+    """A copy of a loaded user that belongs to no session, safe to share between requests."""
+    copy = User(**{column.name: getattr(user, column.name) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        # Attach a per-request copy to this session without querying
+        return db.merge(cached_user, load=False)
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -55,6 +160,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user = get_user(db, username=username)
     if user is None:
         raise credentials_exception
+    
+    principal_cache.put(token, detached_copy(user), payload.get("exp"))
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
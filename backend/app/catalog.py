@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .plugins.models import Plugin
+from .tools.models import Tool
+
+
+def _rows_to_entries(rows, model) -> List[SimpleNamespace]:
+    columns = [column.name for column in model.__table__.columns]
+    return [SimpleNamespace(**{name: getattr(row, name) for name in columns}) for row in rows]
+
+
+class CatalogSnapshot:
+    """An immutable, process-local copy of the tool and plugin tables."""
+
+    def __init__(self, tools: List[SimpleNamespace], plugins: List[SimpleNamespace]):
+        self.tools = tools
+        self.plugins = plugins
+        self.tools_by_id = {tool.id: tool for tool in tools}
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.plugins_by_id = {plugin.id: plugin for plugin in plugins}
+        self.plugins_by_name = {plugin.name: plugin for plugin in plugins}
+        self.loaded_at = time.monotonic()
+
+        content = json.dumps(
+            {"tools": [vars(tool) for tool in tools], "plugins": [vars(plugin) for plugin in plugins]},
+            sort_keys=True,
+            default=str
+        )
+        self.version = hashlib.sha1(content.encode()).hexdigest()[:16]
+
+    def etag(self, *parts) -> str:
+        """Build a weak ETag for a view of this snapshot."""
+        suffix = "-".join(str(part) for part in parts)
+        return f'W/"{self.version}-{suffix}"'
+
+
+class Catalog:
+    """
+    Caches the tool and plugin catalog with name and id indexes.
+
+    The snapshot is reloaded after :meth:`invalidate` (called by every write
+    route) or once it is older than ``ttl`` seconds, which bounds staleness
+    across worker processes. That staleness is fine for listings and lookups,
+    but not for authorization: routes that run a plugin read its approval
+    and activation flags from the database.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl: float):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Optional[Session] = None) -> CatalogSnapshot:
+        """Get the current snapshot, loading it if it is missing or stale."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= self.ttl:
+                snapshot = self._load(db)
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next read reloads it from the database."""
+        self._snapshot = None
+
+    def tool_ids_by_name(self) -> Dict[str, str]:
+        return {name: tool.id for name, tool in self.get().tools_by_name.items()}
+
+    def _load(self, db: Optional[Session]) -> CatalogSnapshot:
+        own_session = db is None
+        if own_session:
+            db = self.session_factory()
+        try:
+            return CatalogSnapshot(
+                tools=_rows_to_entries(db.query(Tool).all(), Tool),
+                plugins=_rows_to_entries(db.query(Plugin).all(), Plugin)
+            )
+        finally:
+            if own_session:
+                db.close()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check a request's If-None-Match header against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Create singleton instance
+catalog = Catalog(session_factory=SessionLocal, ttl=settings.CATALOG_TTL_SECONDS)
@@ -15,11 +15,115 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL_SECONDS: float = 5.0  # How long other worker processes may serve a deactivated user
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    
+    # Password hashing settings
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # Logins waiting beyond this are rejected with 503
     
     # Plugin settings
     PLUGIN_DIR: str = os.getenv("PLUGIN_DIR", "plugins")
     MAX_PLUGIN_SIZE_MB: int = 10
     
+    # Sandbox container pool settings
+    PLUGIN_SANDBOX_IMAGE: str = "python:3.9-slim"
+    PLUGIN_SANDBOX_MEM_LIMIT: str = "256m"
+    PLUGIN_POOL_MIN_SIZE: int = 1
+    PLUGIN_POOL_MAX_SIZE: int = 4
+    PLUGIN_POOL_MAX_CALLS_PER_CONTAINER: int = 500
+    PLUGIN_POOL_IDLE_TIMEOUT_SECONDS: int = 300
+    PLUGIN_POOL_ACQUIRE_TIMEOUT_SECONDS: int = 30
+    PLUGIN_INSTANCE_POOL_SIZE: int = 4  # Reusable instances per trusted in-process plugin
+    PLUGIN_BLOB_SPILL_BYTES: int = 1024 * 1024  # Binary inputs and container results this large go through a file
+    PLUGIN_MAX_RESULT_BLOB_MB: int = 256  # Largest binary result a container may hand back through a file
+    PLUGIN_OUTPUT_CAPTURE_CHARS: int = 16384  # Plugin stdout/stderr kept per call
+    MAX_PLUGIN_INPUT_MB: int = 100  # Largest file accepted by the file execute endpoint
+    
+    # Execution backends: local (trusted, in-process), forkserver or docker
+    PLUGIN_DEFAULT_BACKEND: str = "docker"
+    PLUGIN_FORKSERVER_MEMORY_MB: int = 256  # Address space a call may add to the preloaded runner
+    PLUGIN_FORKSERVER_REQUIRE_ISOLATION: bool = True  # Refuse to run plugins without namespaces and a private root
+    PLUGIN_FORKSERVER_UID: int = 65534  # Unprivileged uid a runner started as root switches to
+    PLUGIN_FORKSERVER_MAX_PROCESSES: int = 64  # Processes and threads a call may have at once
+    
+    # Plugin scheduler settings
+    PLUGIN_MAX_CONCURRENT: int = 16  # Sandboxed calls running at once, across all users
+    PLUGIN_MAX_CONCURRENT_PER_USER: int = 4
+    PLUGIN_MAX_QUEUED_PER_USER: int = 64  # Calls beyond this are rejected with 429
+    PLUGIN_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    PLUGIN_USER_WEIGHT: float = 1.0  # Share of plugin execution time in the fair queue
+    PLUGIN_ADMIN_WEIGHT: float = 2.0
+    PLUGIN_DEFAULT_WALL_SECONDS: int = 30
+    PLUGIN_DEFAULT_CPU_SECONDS: int = 10
+    
+    # Plugin dependency environment settings
+    PLUGIN_ENV_DIR: str = os.getenv("PLUGIN_ENV_DIR", "plugin_envs")
+    PLUGIN_ENV_IMAGE_REPOSITORY: str = "repoai-plugin-env"  # Docker environments are tagged <repository>:<hash>
+    PLUGIN_ENV_MAX_DISK_MB: int = 10240  # Unused environments beyond this are evicted, least recently used first
+    PLUGIN_ENV_MAX_REQUIREMENTS: int = 50
+    PLUGIN_ENV_BUILD_TIMEOUT_SECONDS: int = 1800
+    PLUGIN_ENV_POLL_INTERVAL_SECONDS: float = 5.0
+    
+    # Execution pool settings
+    CPU_EXECUTOR_WORKERS: int = os.cpu_count() or 1
+    CPU_EXECUTOR_MAX_CONCURRENCY: int = 2 * (os.cpu_count() or 1)
+    IO_EXECUTOR_WORKERS: int = 32
+    IO_EXECUTOR_MAX_CONCURRENCY: int = 32
+    
+    # Map-reduce summarization settings
+    SUMMARIZER_CHUNK_SIZE: int = 1024 * 1024  # Characters per chunk
+    SUMMARIZER_MAX_WORKERS: int = os.cpu_count() or 1  # CPU executor tasks one summary's map step may use
+    
+    # Batch execution settings
+    TOOL_BATCH_MAX_ITEMS: int = 10000
+    TOOL_BATCH_CHUNK_SIZE: int = 1000  # Items per process-pool task
+    
+    # Pipeline settings
+    PIPELINE_MAX_STEPS: int = 32
+    
+    # Result cache settings (opt-in)
+    RESULT_CACHE_ENABLED: bool = False
+    RESULT_CACHE_TOOLS: str = "text_summarizer,sentiment_analyzer"  # Comma-separated tool names
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: float = 3600.0
+    
+    # Catalog cache settings
+    CATALOG_TTL_SECONDS: float = 60.0  # Bounds staleness across worker processes
+    
+    # Usage log writer settings
+    USAGE_LOG_QUEUE_SIZE: int = 10000
+    USAGE_LOG_BATCH_SIZE: int = 500
+    USAGE_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+    USAGE_LOG_MAX_FIELD_CHARS: int = 2000  # Longer inputs/outputs are truncated in the log
+    
+    # Streaming execution settings
+    STREAM_READ_CHUNK_CHARS: int = 64 * 1024  # Text fed to a tool per step
+    STREAM_SUMMARY_CANDIDATES: int = 256  # Sentences kept as summary candidates
+    STREAM_SUMMARY_MAX_TERMS: int = 100000  # Distinct terms whose sentence frequencies are tracked
+    STREAM_MAX_PENDING_CHARS: int = 64 * 1024  # Text without a sentence or word break held back at most
+    
+    # Bulk job settings
+    BULK_JOB_DIR: str = os.getenv("BULK_JOB_DIR", "bulk_jobs")
+    MAX_BULK_UPLOAD_MB: int = 4096
+    BULK_JOB_BATCH_SIZE: int = 2000  # Records per process-pool task
+    BULK_JOB_WORKERS: int = os.cpu_count() or 1
+    BULK_JOB_MAX_RUNNING: int = 2  # Jobs processed at once per API process
+    BULK_JOB_POLL_INTERVAL_SECONDS: float = 5.0
+    BULK_JOB_STALE_SECONDS: float = 60.0  # Running jobs without a heartbeat this long are resumed
+    
+    # Background job queue settings
+    JOB_WORKERS: int = 2  # Worker processes per API process
+    JOB_WORKER_START_METHOD: str = "spawn"
+    JOB_DEFAULT_TIMEOUT_SECONDS: int = 300
+    JOB_MAX_TIMEOUT_SECONDS: int = 3600
+    JOB_MAX_PRIORITY: int = 10  # Priorities range from -JOB_MAX_PRIORITY to this; above 0 is admin-only
+    JOB_MAX_ATTEMPTS: int = 3  # Runs interrupted by a crash or restart are retried up to this many times
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_STALE_SECONDS: float = 30.0  # Running jobs without a heartbeat this long are requeued
+    JOB_LONG_POLL_MAX_SECONDS: float = 60.0
+    
     # AI model settings
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     HUGGINGFACE_API_KEY: Optional[str] = os.getenv("HUGGINGFACE_API_KEY")
@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .config import settings
+
+
+class ExecutorSaturated(Exception):
+    """Raised when an executor's wait queue is full and new work is rejected."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking work off the event loop with a bounded number of concurrent calls.
+
+    Callers beyond ``max_concurrency`` wait on a semaphore instead of piling up
+    inside the underlying pool; the number of waiting callers is reported as the
+    queue depth. If ``max_queue`` is set, callers that would exceed it are
+    rejected with :class:`ExecutorSaturated`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        executor_factory: Callable[[], Executor],
+        max_concurrency: int,
+        max_queue: Optional[int] = None
+    ):
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self._executor_factory = executor_factory
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the pool and await its result."""
+        semaphore = self._get_semaphore()
+        if self.max_queue is not None and semaphore.locked() and self._queued >= self.max_queue:
+            self._rejected += 1
+            raise ExecutorSaturated(f"The {self.name} executor is at capacity")
+
+        self._queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._active -= 1
+            self._completed += 1
+            semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._executor_factory()
+            return self._executor
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one execution.
+
+    The first caller for a key starts the work as its own task; callers
+    arriving with the same key while it is in flight await that task instead
+    of starting another run. The key is forgotten as soon as the work
+    finishes, so nothing is cached beyond the in-flight window. A caller that
+    is cancelled does not cancel the shared work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def run(self, key: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Await ``fn(*args, **kwargs)``, sharing the run with identical in-flight calls.
+
+        Returns:
+            ``(result, coalesced)`` where ``coalesced`` is True if this caller
+            joined a run started by another caller
+        """
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self._coalesced += 1
+        else:
+            self._leaders += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), coalesced
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self._leaders,
+            "coalesced": self._coalesced,
+        }
+
+
+# CPU-bound core tools run in worker processes so they don't hold the GIL
+cpu_executor = BoundedExecutor(
+    "cpu",
+    lambda: ProcessPoolExecutor(max_workers=settings.CPU_EXECUTOR_WORKERS),
+    settings.CPU_EXECUTOR_MAX_CONCURRENCY
+)
+
+# I/O-bound work (plugin sandboxes, database writes) runs in threads
+io_executor = BoundedExecutor(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=settings.IO_EXECUTOR_WORKERS, thread_name_prefix="repoai-io"),
+    settings.IO_EXECUTOR_MAX_CONCURRENCY
+)
+
+# Password hashing gets its own small pool so a burst of logins cannot starve
+# other work, and is rejected early once the backlog is too deep
+password_executor = BoundedExecutor(
+    "password",
+    lambda: ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="repoai-bcrypt"),
+    settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+
+# Identical concurrent tool and plugin calls share one execution
+tool_flight = SingleFlight("tools")
+plugin_flight = SingleFlight("plugins")
+
+
+def get_executor_stats() -> Dict[str, Dict[str, int]]:
+    return {executor.name: executor.stats() for executor in (cpu_executor, io_executor, password_executor)}
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, int]]:
+    return {flight.name: flight.stats() for flight in (tool_flight, plugin_flight)}
+
+
+def shutdown_executors() -> None:
+    cpu_executor.shutdown()
+    io_executor.shutdown()
+    password_executor.shutdown()
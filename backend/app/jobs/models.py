@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, DateTime, Text, Integer, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import uuid
+from ..database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"))
+    kind = Column(String)  # tool or plugin
+    target = Column(String)  # Tool name or plugin id
+    method_name = Column(String, nullable=True)  # Plugin method
+    params = Column(Text)  # JSON-encoded
+    priority = Column(Integer, default=0, index=True)  # Higher runs first
+    timeout_seconds = Column(Integer)
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed, cancelled, timed_out
+    result = Column(Text, nullable=True)  # JSON-encoded
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    execution_time_ms = Column(Integer, nullable=True)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    user = relationship("User")
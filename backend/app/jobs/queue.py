@@ -0,0 +1,504 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from datetime import datetime
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..execution import io_executor
+from ..leases import Leases
+from ..plugins.calls import call_plugin
+from ..plugins.protocol import jsonable
+from ..plugins.models import Plugin
+from ..plugins.scheduler import SchedulerRejected, weight_for
+from ..tools.service import tool_service
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "timed_out")
+
+
+def worker_main(conn: Connection) -> None:
+    """
+    Worker process loop: run one tool job at a time as sent over ``conn``.
+
+    Messages are ``(job_id, tool_name, params)``; the reply is
+    ``(job_id, status, result_json, execution_time_ms)``. ``None`` asks the
+    worker to exit.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Shutdown is driven by the parent
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        job_id, tool_name, params = message
+        start_time = time.time()
+        try:
+            outcome = tool_service.run_tool(tool_name, params)
+            status, result = outcome["status"], outcome["result"]
+        except Exception as e:
+            status, result = "error", {"error": str(e)}
+
+        execution_time = int((time.time() - start_time) * 1000)
+        conn.send((job_id, status, json.dumps(jsonable(result), default=str), execution_time))
+
+
+class _Worker:
+    """A worker process and the job it is running, if any."""
+
+    def __init__(self, context: multiprocessing.context.BaseContext):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child_conn,), name="repoai-job-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job_id: Optional[str] = None
+        self.deadline = 0.0
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class JobQueue:
+    """
+    Persistent queue of tool and plugin executions.
+
+    Jobs live in the ``jobs`` table, so queued and interrupted work survives a
+    restart. A dispatcher thread claims queued jobs (highest priority first)
+    with a conditional update, so several API processes can share the table.
+    Tool jobs go to local worker processes, one job at a time each; a worker
+    whose job times out or is cancelled is killed and replaced. Plugin jobs
+    run on the event loop the queue was started from, like ``/execute``
+    calls: through the result cache and the fair scheduler under their
+    owner's weight and limits, so jobs cannot take more sandboxes than their
+    owner could directly. A plugin job that is not admitted goes back to the
+    queue. Running jobs are heartbeated, and jobs whose heartbeat goes stale
+    (their process died) are requeued up to ``max_attempts`` times.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        workers: int,
+        start_method: str,
+        poll_interval: float,
+        stale_after: float,
+        max_attempts: int
+    ):
+        self.session_factory = session_factory
+        self.worker_count = max(workers, 1)
+        self.start_method = start_method
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max(max_attempts, 1)
+        self.leases = Leases(session_factory, Job, stale_after)
+        self.worker_id = self.leases.worker_id
+
+        self._workers: List[_Worker] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._plugin_jobs: Dict[str, concurrent.futures.Future] = {}
+        self._not_before: Dict[str, float] = {}  # Plugin jobs not admitted, and when to retry them
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake_reader: Optional[Connection] = None
+        self._wake_writer: Optional[Connection] = None
+        self._cancel_requests: Set[str] = set()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._cancelled = 0
+        self._restarts = 0
+
+    def start(self) -> None:
+        """Start the dispatcher; plugin jobs run on the calling event loop, if there is one."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._loop = None  # Plugin jobs are then left to API processes
+            self._stop.clear()
+            self._wake_reader, self._wake_writer = multiprocessing.Pipe(duplex=False)
+            self._thread = threading.Thread(target=self._run, name="repoai-jobs", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the dispatcher and workers; running jobs go back to the queue."""
+        self._stop.set()
+        self.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self) -> None:
+        """Dispatch newly queued jobs now instead of at the next poll."""
+        with self._lock:
+            if self._wake_writer is not None:
+                try:
+                    self._wake_writer.send_bytes(b"1")
+                except OSError:
+                    pass
+
+    def cancel(self, job_id: str) -> None:
+        """Kill the worker running ``job_id`` in this process, if any."""
+        with self._lock:
+            self._cancel_requests.add(job_id)
+        self.wake()
+
+    async def wait_for(self, job_id: str, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for this process to finish ``job_id``."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.setdefault(job_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "busy": sum(1 for worker in self._workers if worker.job_id is not None),
+            "plugin_jobs": len(self._plugin_jobs),
+            "completed": self._completed,
+            "failed": self._failed,
+            "timed_out": self._timed_out,
+            "cancelled": self._cancelled,
+            "worker_restarts": self._restarts,
+        }
+
+    def _run(self) -> None:
+        context = multiprocessing.get_context(self.start_method)
+        self._workers = [_Worker(context) for _ in range(self.worker_count)]
+        last_heartbeat = 0.0
+
+        while not self._stop.is_set():
+            try:
+                self._dispatch()
+                busy = [worker for worker in self._workers if worker.job_id is not None]
+                waitables = [self._wake_reader] + [worker.conn for worker in busy]
+                waitables += [worker.process.sentinel for worker in self._workers]
+                ready = wait(waitables, timeout=self._next_timeout(busy))
+
+                if self._wake_reader in ready:
+                    while self._wake_reader.poll():
+                        self._wake_reader.recv_bytes()
+
+                for index, worker in enumerate(self._workers):
+                    replacement = self._check_worker(worker, ready)
+                    if replacement:
+                        worker.kill()
+                        self._workers[index] = _Worker(context)
+                        self._restarts += 1
+                self._check_plugin_jobs()
+
+                if time.monotonic() - last_heartbeat > self.stale_after / 3:
+                    self._heartbeat()
+                    last_heartbeat = time.monotonic()
+            except Exception:
+                logger.exception("Job dispatcher error")
+                self._stop.wait(self.poll_interval)
+
+        self._shutdown_workers()
+
+    def _next_timeout(self, busy: List[_Worker]) -> float:
+        timeout = self.poll_interval
+        now = time.monotonic()
+        for worker in busy:
+            timeout = min(timeout, worker.deadline - now)
+        return max(timeout, 0)
+
+    def _check_worker(self, worker: _Worker, ready: List[Any]) -> bool:
+        """Collect a worker's result or enforce its deadline; returns True if it must be replaced."""
+        if worker.job_id is not None and worker.conn in ready:
+            try:
+                job_id, status, result, execution_time = worker.conn.recv()
+            except (EOFError, OSError):
+                self._finish(worker.job_id, "failed", error="Worker process exited unexpectedly")
+                return True
+            worker.job_id = None
+            if status == "success":
+                self._finish(job_id, "completed", result=result, execution_time=execution_time)
+            else:
+                detail = json.loads(result)
+                error = detail.get("error") if isinstance(detail, dict) else result
+                self._finish(job_id, "failed", result=result, error=error, execution_time=execution_time)
+            return False
+
+        if not worker.process.is_alive():
+            if worker.job_id is not None:
+                self._finish(worker.job_id, "failed", error="Worker process exited unexpectedly")
+            return True
+
+        if worker.job_id is None:
+            return False
+
+        with self._lock:
+            cancelled = worker.job_id in self._cancel_requests
+            self._cancel_requests.discard(worker.job_id)
+        if cancelled:
+            self._cancelled += 1
+            self._notify(worker.job_id)
+            return True
+
+        if time.monotonic() >= worker.deadline:
+            self._finish(worker.job_id, "timed_out", error="Job exceeded its timeout")
+            return True
+        return False
+
+    def _dispatch(self) -> None:
+        idle = [worker for worker in self._workers if worker.job_id is None and worker.process.is_alive()]
+        plugin_slots = settings.PLUGIN_MAX_CONCURRENT - len(self._plugin_jobs) if self._loop is not None else 0
+        if not idle and plugin_slots <= 0:
+            return
+
+        db = self.session_factory()
+        try:
+            order_by = [Job.priority.desc(), Job.created_at]
+            values = lambda now: {"attempts": Job.attempts + 1, "started_at": func.coalesce(Job.started_at, now)}
+            claimed = []
+            if idle:
+                claimed += self.leases.claim(db, len(idle), order_by, values, where=[Job.kind == "tool"])
+            if plugin_slots > 0:
+                now = time.monotonic()
+                with self._lock:
+                    self._not_before = {job_id: at for job_id, at in self._not_before.items() if at > now}
+                    waiting = list(self._not_before)
+                where = [Job.kind == "plugin"] + ([Job.id.notin_(waiting)] if waiting else [])
+                claimed += self.leases.claim(db, plugin_slots, order_by, values, where=where)
+
+            for job_id in claimed:
+                job = db.query(Job).filter(Job.id == job_id).first()
+                if job.attempts > self.max_attempts:
+                    self._finish(job.id, "failed", error=f"Interrupted {self.max_attempts} times; giving up")
+                    continue
+
+                params = json.loads(job.params or "{}")
+                if job.kind == "tool":
+                    worker = idle.pop()
+                    worker.job_id = job.id
+                    worker.deadline = time.monotonic() + job.timeout_seconds
+                    worker.conn.send((job.id, job.target, params))
+                    continue
+
+                plugin = db.query(Plugin).filter(Plugin.id == job.target).first()
+                if plugin is None or not plugin.is_approved or not plugin.is_active:
+                    self._finish(job.id, "failed", error="Plugin is not available")
+                    continue
+                future = asyncio.run_coroutine_threadsafe(
+                    self._run_plugin_job(
+                        job.id, plugin, job.method_name, params, job.user_id, weight_for(job.user), job.timeout_seconds
+                    ),
+                    self._loop
+                )
+                with self._lock:
+                    self._plugin_jobs[job.id] = future
+                future.add_done_callback(lambda _, job_id=job.id: self._plugin_job_done(job_id))
+        finally:
+            db.close()
+
+    async def _run_plugin_job(
+        self,
+        job_id: str,
+        plugin: Plugin,
+        method_name: str,
+        params: Dict[str, Any],
+        user_id: str,
+        weight: float,
+        timeout: float
+    ) -> None:
+        """Runs on the event loop: one plugin job, admitted like an API call from its owner."""
+        start_time = time.time()
+        try:
+            outcome = await asyncio.wait_for(call_plugin(plugin, method_name, params, user_id, weight), timeout)
+        except asyncio.TimeoutError:
+            await io_executor.run(self._finish, job_id, "timed_out", error="Job exceeded its timeout")
+            return
+        except SchedulerRejected as e:
+            # Over its owner's limits for now; try again later
+            await io_executor.run(self._requeue, [job_id], e.retry_after)
+            return
+        except Exception as e:
+            status, result, error = "failed", json.dumps({"error": str(e)}), str(e)
+        else:
+            status, result, error = "completed", json.dumps(outcome["result"], default=str), None
+        execution_time = int((time.time() - start_time) * 1000)
+        await io_executor.run(self._finish, job_id, status, result=result, error=error, execution_time=execution_time)
+
+    def _plugin_job_done(self, job_id: str) -> None:
+        with self._lock:
+            self._plugin_jobs.pop(job_id, None)
+        self.wake()
+
+    def _check_plugin_jobs(self) -> None:
+        """Cancel plugin jobs cancelled through the API; their sandbox calls end within their budgets."""
+        with self._lock:
+            cancelled = [job_id for job_id in self._plugin_jobs if job_id in self._cancel_requests]
+            self._cancel_requests.difference_update(cancelled)
+            futures = [self._plugin_jobs[job_id] for job_id in cancelled]
+        for job_id, future in zip(cancelled, futures):
+            future.cancel()
+            self._cancelled += 1
+            self._notify(job_id)
+
+    def _heartbeat(self) -> None:
+        running = [worker.job_id for worker in self._workers if worker.job_id is not None]
+        with self._lock:
+            running += list(self._plugin_jobs)
+        if not running:
+            return
+
+        db = self.session_factory()
+        try:
+            self.leases.renew(db, running)
+            # Pick up cancellations made through other API processes
+            cancelled = [
+                job_id for (job_id,) in db.query(Job.id).filter(Job.id.in_(running), Job.status == "cancelled")
+            ]
+        finally:
+            db.close()
+        if cancelled:
+            with self._lock:
+                self._cancel_requests.update(cancelled)
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+        execution_time: Optional[int] = None
+    ) -> None:
+        db = self.session_factory()
+        try:
+            # Only a job this process is still running can be finished; a cancel wins the race
+            updated = db.query(Job).filter(self.leases.owned([job_id])).update(
+                {
+                    "status": status,
+                    "result": result,
+                    "error": error,
+                    "execution_time_ms": execution_time,
+                    "finished_at": datetime.utcnow(),
+                },
+                synchronize_session=False
+            )
+            db.commit()
+
+            if updated:
+                if status == "completed":
+                    self._completed += 1
+                elif status == "timed_out":
+                    self._timed_out += 1
+                else:
+                    self._failed += 1
+
+                job = db.query(Job).filter(Job.id == job_id).first()
+                if job.kind == "tool" and execution_time is not None:
+                    tool_service.log_usage(
+                        job.target,
+                        json.loads(job.params or "{}"),
+                        {
+                            "result": json.loads(result) if result is not None else {"error": error},
+                            "execution_time_ms": execution_time,
+                            "status": "success" if status == "completed" else "error"
+                        },
+                        job.user
+                    )
+        finally:
+            db.close()
+        self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(job_id, [])
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _requeue(self, job_ids: List[str], retry_after: float = 0) -> None:
+        """Put jobs this process runs back in the queue without counting the attempt."""
+        if retry_after:
+            with self._lock:
+                for job_id in job_ids:
+                    self._not_before[job_id] = time.monotonic() + retry_after
+        db = self.session_factory()
+        try:
+            db.query(Job).filter(self.leases.owned(job_ids)).update(
+                {"status": "queued", "worker_id": None, "attempts": Job.attempts - 1},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+        self.wake()
+
+    def _shutdown_workers(self) -> None:
+        interrupted = []
+        for worker in self._workers:
+            if worker.job_id is not None:
+                interrupted.append(worker.job_id)
+                worker.kill()
+            else:
+                worker.close()
+        self._workers = []
+
+        with self._lock:
+            plugin_jobs = dict(self._plugin_jobs)
+        for job_id, future in plugin_jobs.items():
+            if future.cancel():
+                interrupted.append(job_id)
+
+        if interrupted:
+            # A clean shutdown does not count as a failed attempt
+            self._requeue(interrupted)
+
+        with self._lock:
+            for conn in (self._wake_reader, self._wake_writer):
+                conn.close()
+            self._wake_reader = self._wake_writer = None
+
+
+# Create singleton instance
+job_queue = JobQueue(
+    session_factory=SessionLocal,
+    workers=settings.JOB_WORKERS,
+    start_method=settings.JOB_WORKER_START_METHOD,
+    poll_interval=settings.JOB_POLL_INTERVAL_SECONDS,
+    stale_after=settings.JOB_STALE_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
@@ -0,0 +1,199 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..auth.utils import get_current_active_user
+from ..auth.models import User
+from ..config import settings
+from ..plugins.introspection import validate_plugin_call
+from ..plugins.models import Plugin
+from ..tools.service import tool_service
+from .models import Job
+from .queue import TERMINAL_STATUSES, job_queue
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel
+from datetime import datetime
+import json
+import time
+
+router = APIRouter()
+
+class JobSubmitRequest(BaseModel):
+    tool_name: Optional[str] = None
+    plugin_id: Optional[str] = None
+    method_name: Optional[str] = None
+    params: Dict[str, Any] = {}
+    priority: int = 0
+    timeout_seconds: Optional[int] = None
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    target: str
+    method_name: Optional[str]
+    status: str
+    priority: int
+    result: Any
+    error: Optional[str]
+    attempts: int
+    execution_time_ms: Optional[int]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+def job_response(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "target": job.target,
+        "method_name": job.method_name,
+        "status": job.status,
+        "priority": job.priority,
+        "result": json.loads(job.result) if job.result is not None else None,
+        "error": job.error,
+        "attempts": job.attempts or 0,
+        "execution_time_ms": job.execution_time_ms,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def get_own_job(job_id: str, db: Session, current_user: User) -> Job:
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if job is None or (job.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: JobSubmitRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Queue a tool or plugin execution and return its job id immediately.
+    
+    Give either ``tool_name`` or ``plugin_id`` with ``method_name``. Jobs with
+    a higher ``priority`` run first, and only admins may raise a job above
+    the default of 0; a job running longer than ``timeout_seconds`` is killed.
+    """
+    if (request.tool_name is None) == (request.plugin_id is None):
+        raise HTTPException(status_code=400, detail="Give exactly one of tool_name or plugin_id")
+    
+    plugin_id, method_name = request.plugin_id, request.method_name
+    if request.tool_name is not None:
+        try:
+            spec = tool_service.get_tool(request.tool_name, db)
+            spec.validate(request.params)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Plugin tools run as jobs for their plugin's entry method
+        plugin_id, method_name = spec.plugin_id, spec.method_name
+    
+    if plugin_id is None:
+        kind, target = "tool", request.tool_name
+    else:
+        # Authorization flags are read from the database, not the catalog snapshot
+        plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
+        if plugin is None:
+            raise HTTPException(status_code=404, detail="Plugin not found")
+        if not plugin.is_approved:
+            raise HTTPException(status_code=400, detail="Plugin is not approved for use")
+        if not plugin.is_active:
+            raise HTTPException(status_code=400, detail="Plugin is not active")
+        if not method_name:
+            raise HTTPException(status_code=400, detail="method_name is required for plugin jobs")
+        try:
+            validate_plugin_call(plugin, method_name, request.params)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        kind, target = "plugin", plugin_id
+    
+    timeout = request.timeout_seconds or settings.JOB_DEFAULT_TIMEOUT_SECONDS
+    if not 0 < timeout <= settings.JOB_MAX_TIMEOUT_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"timeout_seconds must be between 1 and {settings.JOB_MAX_TIMEOUT_SECONDS}"
+        )
+    
+    if not -settings.JOB_MAX_PRIORITY <= request.priority <= settings.JOB_MAX_PRIORITY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"priority must be between {-settings.JOB_MAX_PRIORITY} and {settings.JOB_MAX_PRIORITY}"
+        )
+    if request.priority > 0 and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only admins can raise job priority")
+    
+    job = Job(
+        user_id=current_user.id,
+        kind=kind,
+        target=target,
+        method_name=method_name if kind == "plugin" else None,
+        params=json.dumps(request.params),
+        priority=request.priority,
+        timeout_seconds=timeout
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    job_queue.wake()
+    
+    return job_response(job)
+
+@router.get("/", response_model=List[JobResponse])
+async def get_jobs(
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the current user's jobs, newest first."""
+    query = db.query(Job).filter(Job.user_id == current_user.id)
+    if status is not None:
+        query = query.filter(Job.status == status)
+    jobs = query.order_by(Job.created_at.desc()).offset(skip).limit(limit).all()
+    return [job_response(job) for job in jobs]
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    wait: float = 0,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Get a job's status and result.
+    
+    With ``wait`` > 0 the request long-polls: it returns as soon as the job
+    finishes, or after ``wait`` seconds (capped by the server) with the
+    job still pending.
+    """
+    job = get_own_job(job_id, db, current_user)
+    deadline = time.monotonic() + min(max(wait, 0), settings.JOB_LONG_POLL_MAX_SECONDS)
+    
+    while job.status not in TERMINAL_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Release the connection while waiting; jobs finished by other processes are seen on recheck
+        db.rollback()
+        await job_queue.wait_for(job.id, min(remaining, settings.JOB_POLL_INTERVAL_SECONDS))
+        db.refresh(job)
+    
+    return job_response(job)
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Cancel a queued or running job; a running job's worker is killed."""
+    job = get_own_job(job_id, db, current_user)
+    if job.status in ("queued", "running"):
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        db.refresh(job)
+        job_queue.cancel(job.id)
+    return job_response(job)
@@ -0,0 +1,117 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def new_worker_id() -> str:
+    """An id for this process's claims, unique across hosts and restarts."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Leases:
+    """
+    Claims rows of a work table for one process and keeps them claimed.
+
+    The table needs ``id``, ``status``, ``worker_id`` and ``heartbeat_at``
+    columns. Queued rows, and running rows whose heartbeat is older than
+    ``stale_after`` seconds because their process died, are claimed with a
+    conditional update, so when several processes race for a row only one
+    wins. A claimed row stays with this process while :meth:`renew` runs at
+    least every ``stale_after / 3`` seconds, however long its work takes.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], model: Any, stale_after: float):
+        self.session_factory = session_factory
+        self.model = model
+        self.stale_after = stale_after
+        self.worker_id = new_worker_id()
+
+    def claimable(self, now: datetime):
+        model = self.model
+        return or_(
+            model.status == "queued",
+            and_(model.status == "running", model.heartbeat_at < now - timedelta(seconds=self.stale_after))
+        )
+
+    def owned(self, ids: Iterable[str]):
+        """Rows among ``ids`` that this process is still running."""
+        model = self.model
+        return and_(model.id.in_(list(ids)), model.status == "running", model.worker_id == self.worker_id)
+
+    def claim(
+        self,
+        db: Session,
+        limit: int,
+        order_by: Iterable[Any],
+        values: Optional[Callable[[datetime], Dict[str, Any]]] = None,
+        where: Iterable[Any] = ()
+    ) -> List[str]:
+        """
+        Claim up to ``limit`` rows, in ``order_by`` order.
+
+        Args:
+            db: Database session; committed after each claim
+            limit: Most rows to claim
+            order_by: Columns deciding which claimable rows go first
+            values: Builds extra column updates from the claim time
+            where: Extra conditions on which rows to claim
+
+        Returns:
+            Ids of the rows this process won
+        """
+        model = self.model
+        now = datetime.utcnow()
+        claimable = self.claimable(now)
+        candidates = [
+            row_id
+            for (row_id,) in db.query(model.id).filter(claimable, *where).order_by(*order_by).limit(limit)
+        ]
+        claimed = []
+        for row_id in candidates:
+            # Conditional update, so only one process wins each row
+            updated = db.query(model).filter(model.id == row_id, claimable).update(
+                {
+                    "status": "running",
+                    "worker_id": self.worker_id,
+                    "heartbeat_at": now,
+                    **(values(now) if values is not None else {}),
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            if updated:
+                claimed.append(row_id)
+        return claimed
+
+    def renew(self, db: Session, ids: Iterable[str]) -> None:
+        """Refresh the heartbeat of the rows among ``ids`` this process still runs."""
+        ids = list(ids)
+        if not ids:
+            return
+        db.query(self.model).filter(self.owned(ids)).update(
+            {"heartbeat_at": datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+
+    def keep_alive(self, running: Callable[[], Iterable[str]], stop: threading.Event) -> None:
+        """Thread target: renew the rows ``running`` returns until ``stop`` is set."""
+        while not stop.wait(self.stale_after / 3):
+            ids = list(running())
+            if not ids:
+                continue
+            db = self.session_factory()
+            try:
+                self.renew(db, ids)
+            except Exception:
+                logger.exception("Failed to renew %s leases", self.model.__tablename__)
+            finally:
+                db.close()
@@ -4,7 +4,17 @@ from .auth import routes as auth_routes
 from .users import routes as user_routes
 from .tools import routes as tool_routes
 from .plugins import routes as plugin_routes
+from .jobs import routes as job_routes
 from .database import get_db
+from .plugins.executor import plugin_executor
+from .execution import io_executor, get_executor_stats, get_single_flight_stats, shutdown_executors
+from .tools.usage_log import usage_log_writer
+from .tools.bulk import bulk_job_runner
+from .jobs.queue import job_queue
+from .plugins.scheduler import plugin_scheduler
+from .plugins.environments import environment_store
+from .auth.utils import principal_cache
+from .tools.cache import result_cache
 
 app = FastAPI(
     title="RepoAI API",
@@ -26,6 +36,24 @@ app.include_router(auth_routes.router, prefix="/api/auth", tags=["Authentication
 app.include_router(user_routes.router, prefix="/api/users", tags=["Users"])
 app.include_router(tool_routes.router, prefix="/api/tools", tags=["AI Tools"])
 app.include_router(plugin_routes.router, prefix="/api/plugins", tags=["Plugins"])
+app.include_router(job_routes.router, prefix="/api/jobs", tags=["Jobs"])
+
+@app.on_event("startup")
+async def startup():
+    usage_log_writer.start()
+    bulk_job_runner.start()
+    job_queue.start()
+    environment_store.start()
+    await io_executor.run(plugin_executor.remove_stale_sandboxes)
+
+@app.on_event("shutdown")
+async def shutdown():
+    environment_store.stop()
+    job_queue.stop()
+    bulk_job_runner.stop()
+    plugin_executor.shutdown()
+    shutdown_executors()
+    usage_log_writer.stop()
 
 @app.get("/")
 async def root():
@@ -33,4 +61,18 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"} 
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "executors": get_executor_stats(),
+        "coalescing": get_single_flight_stats(),
+        "usage_log": usage_log_writer.stats(),
+        "auth_cache": principal_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "bulk_jobs": bulk_job_runner.stats(),
+        "jobs": job_queue.stats(),
+        "plugin_scheduler": plugin_scheduler.stats(),
+        "plugin_environments": environment_store.stats()
+    }
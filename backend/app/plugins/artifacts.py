@@ -0,0 +1,131 @@
+import hashlib
+import importlib.util
+import os
+import py_compile
+import re
+import shutil
+import tempfile
+from typing import Tuple
+
+from fastapi import UploadFile
+
+ARTIFACT_NAME = re.compile(r"^[0-9a-f]{64}\.py$")
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class PluginTooLarge(Exception):
+    """Raised when an upload exceeds the plugin size limit."""
+
+
+class ArtifactMismatch(Exception):
+    """Raised when a stored plugin no longer matches the hash it is stored under."""
+
+
+async def store_upload(upload: UploadFile, plugin_dir: str, max_bytes: int) -> Tuple[str, str, int]:
+    """
+    Stream an upload into content-addressed plugin storage.
+
+    The file is written in chunks while its size is checked and its SHA-256
+    computed, then stored as ``<sha256>.py``. Identical uploads share one
+    file.
+
+    Returns:
+        ``(path, sha256, size)``
+
+    Raises:
+        PluginTooLarge: If the upload is larger than ``max_bytes``
+    """
+    os.makedirs(plugin_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, partial = tempfile.mkstemp(prefix=".upload-", dir=plugin_dir)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                data = await upload.read(READ_CHUNK_BYTES)
+                if not data:
+                    break
+                size += len(data)
+                if size > max_bytes:
+                    raise PluginTooLarge(f"Plugin file too large (max {max_bytes // (1024 * 1024)} MB)")
+                digest.update(data)
+                buffer.write(data)
+
+        sha256 = digest.hexdigest()
+        path = os.path.join(plugin_dir, f"{sha256}.py")
+        if os.path.exists(path):
+            os.remove(partial)  # Already stored
+        else:
+            os.replace(partial, path)
+        return path, sha256, size
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def compiled_path(plugin_path: str) -> str:
+    """Where the interpreter looks for a plugin's bytecode."""
+    return importlib.util.cache_from_source(plugin_path)
+
+
+def compile_artifact(plugin_path: str) -> str:
+    """
+    Compile a plugin to bytecode next to it; returns the bytecode path.
+
+    The bytecode is hash-checked: the import system only uses it while the
+    source still matches, so it never goes stale.
+
+    Raises:
+        py_compile.PyCompileError: If the plugin does not compile
+    """
+    return py_compile.compile(
+        plugin_path,
+        cfile=compiled_path(plugin_path),
+        doraise=True,
+        invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH
+    )
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_artifact(plugin_path: str) -> None:
+    """
+    Check a content-addressed plugin against the hash in its name.
+
+    Files stored before content addressing are not checked.
+
+    Raises:
+        ArtifactMismatch: If the file was modified after it was stored
+    """
+    name = os.path.basename(plugin_path)
+    if ARTIFACT_NAME.match(name) and file_sha256(plugin_path) != name[:-3]:
+        raise ArtifactMismatch(f"Plugin file {name} does not match its hash")
+
+
+def stage_artifact(plugin_path: str, directory: str) -> str:
+    """Copy a verified plugin and its bytecode into a sandbox directory; returns the file name."""
+    verify_artifact(plugin_path)
+    filename = os.path.basename(plugin_path)
+    target = os.path.join(directory, filename)
+    shutil.copy(plugin_path, target)
+
+    bytecode = compiled_path(plugin_path)
+    if os.path.exists(bytecode):
+        # Hash-checked bytecode does not depend on the file's location or mtime
+        os.makedirs(os.path.dirname(compiled_path(target)), exist_ok=True)
+        shutil.copy(bytecode, compiled_path(target))
+    return filename
+
+
+def remove_artifact(plugin_path: str) -> None:
+    """Delete a stored plugin and its bytecode."""
+    for path in (plugin_path, compiled_path(plugin_path)):
+        if os.path.exists(path):
+            os.remove(path)
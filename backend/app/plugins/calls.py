@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from ..execution import io_executor, plugin_flight
+from ..tools.cache import ResultCache, result_cache
+from .environments import environment_for
+from .executor import backend_for, plugin_executor
+from .protocol import jsonable
+from .scheduler import budgets_for, plugin_scheduler
+
+
+class SharedInput:
+    """
+    A temporary input file removed once nothing holds it any more.
+
+    The request that wrote the file holds it until it returns. An execution
+    it starts takes its own hold, so when identical calls are coalesced and
+    the request that led them is cancelled, the others still read the file.
+    Holds are only taken and released on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._holders = 1
+
+    def acquire(self) -> None:
+        self._holders += 1
+
+    def release(self) -> None:
+        self._holders -= 1
+        if self._holders == 0:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                logging.warning(f"Could not remove plugin input {self.path}: {str(e)}")
+
+
+async def call_plugin(
+    plugin: Any,
+    method_name: str,
+    params: Dict[str, Any],
+    user_id: str,
+    weight: float,
+    call_params: Optional[Dict[str, Any]] = None,
+    shared_input: Optional[SharedInput] = None
+) -> Dict[str, Any]:
+    """
+    Run a plugin call through the result cache, the fair scheduler and coalescing.
+
+    Every caller is admitted under its own per-user limits; identical calls
+    admitted while one is in flight then share its execution. Both the API
+    and the job queue go through here.
+
+    Args:
+        plugin: The plugin row
+        method_name: Method to call
+        params: Parameters identifying the call for caching and coalescing
+        user_id: The caller, for fair queuing
+        weight: The caller's share of sandbox time
+        call_params: What the plugin receives, when it differs from ``params``
+        shared_input: A file ``call_params`` refer to; the execution holds it
+            until it finishes, even if this caller gives up first
+
+    Returns:
+        ``{"result", "cache_hit": True}`` for a cache hit, otherwise the
+        result with ``queue_time_ms``, ``execution_time_ms`` and ``coalesced``
+
+    Raises:
+        EnvironmentNotReady: If the plugin's environment is not ready; a
+            call never waits for a build
+        SchedulerRejected: If the caller's queue is full or no slot freed up
+        PluginBudgetExceeded: If the call ran over its budget
+    """
+    call_key = ResultCache.make_key(f"plugin:{plugin.id}", plugin.version, {"method": method_name, "params": params})
+    cache_key = None
+    if settings.RESULT_CACHE_ENABLED and plugin_executor.is_cacheable(plugin.file_path, method_name):
+        cache_key = call_key
+        hit, result = result_cache.get(cache_key)
+        if hit:
+            return {"result": result, "cache_hit": True}
+
+    def start(**kwargs) -> asyncio.Future:
+        # Called by plugin_flight only when this call leads the execution
+        execution = asyncio.ensure_future(io_executor.run(plugin_executor.execute, **kwargs))
+        if shared_input is not None:
+            shared_input.acquire()
+            execution.add_done_callback(lambda _: shared_input.release())
+        return execution
+
+    environment = environment_for(plugin)
+    (result, coalesced), queue_time, execution_time = await plugin_scheduler.run_async(
+        user_id,
+        weight,
+        plugin_flight.run,
+        call_key,
+        start,
+        plugin_path=plugin.file_path,
+        method_name=method_name,
+        params=params if call_params is None else call_params,
+        backend=backend_for(plugin),
+        environment=environment,
+        **budgets_for(plugin)
+    )
+    # Binary results go out as base64 text
+    result = jsonable(result)
+    if cache_key is not None and not coalesced:
+        result_cache.put(cache_key, result)
+    return {
+        "result": result,
+        "queue_time_ms": queue_time,
+        "execution_time_ms": execution_time,
+        "coalesced": coalesced
+    }
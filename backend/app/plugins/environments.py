@@ -0,0 +1,484 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import docker
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from .executor import backend_for
+from .models import Plugin, PluginEnvironment
+
+logger = logging.getLogger(__name__)
+
+# A distribution name with optional extras and version constraints; options,
+# URLs and paths are not accepted in a plugin manifest
+REQUIREMENT_PATTERN = re.compile(
+    r"^(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)"
+    r"(?P<extras>\[[A-Za-z0-9._-]+(?:,[A-Za-z0-9._-]+)*\])?"
+    r"(?P<specifiers>(?:(?:===|==|!=|~=|<=|>=|<|>)[A-Za-z0-9.*+!_-]+)(?:,(?:===|==|!=|~=|<=|>=|<|>)[A-Za-z0-9.*+!_-]+)*)?$"
+)
+
+# Backends that run plugins in an environment of their own
+ENVIRONMENT_RUNTIMES = ("docker", "forkserver")
+
+# The only server environment variables a directory build's pip sees, besides
+# PIP_* settings: how to reach the package index, nothing the server itself is
+# configured with
+PIP_ENVIRONMENT = (
+    "PATH", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "http_proxy", "https_proxy", "no_proxy",
+    "SSL_CERT_FILE", "REQUESTS_CA_BUNDLE",
+)
+
+
+class EnvironmentNotReady(Exception):
+    """Raised when a plugin's environment has not been built (yet)."""
+
+    def __init__(self, status: str, error: Optional[str] = None):
+        message = f"Plugin environment build failed: {error}" if status == "failed" else \
+            f"Plugin environment is not ready ({status})"
+        super().__init__(message)
+        self.status = status
+        self.error = error
+
+
+def parse_requirements(text: Optional[str]) -> List[str]:
+    """
+    Parse a requirements.txt-style manifest into a sorted list of specifiers.
+
+    Comments and blank lines are ignored, names are normalized and
+    duplicates dropped, so equivalent manifests give the same list.
+
+    Raises:
+        ValueError: If a line is not a plain requirement specifier, or there are too many
+    """
+    requirements = set()
+    for line in (text or "").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        match = REQUIREMENT_PATTERN.match(re.sub(r"\s+", "", line))
+        if match is None:
+            raise ValueError(f"Invalid requirement: {line}")
+        name = re.sub(r"[-_.]+", "-", match.group("name")).lower()
+        requirements.add(name + (match.group("extras") or "").lower() + (match.group("specifiers") or ""))
+
+    if len(requirements) > settings.PLUGIN_ENV_MAX_REQUIREMENTS:
+        raise ValueError(f"At most {settings.PLUGIN_ENV_MAX_REQUIREMENTS} requirements are allowed")
+    return sorted(requirements)
+
+
+def environment_id(runtime: str, requirements: List[str]) -> str:
+    """Environments are keyed by what they contain, so plugins with the same dependencies share one."""
+    base = settings.PLUGIN_SANDBOX_IMAGE if runtime == "docker" else f"python{sys.version_info[0]}.{sys.version_info[1]}"
+    encoded = json.dumps([runtime, base, requirements], separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def environment_runtime(backend: str) -> Optional[str]:
+    return backend if backend in ENVIRONMENT_RUNTIMES else None
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(directory, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class EnvironmentStore:
+    """
+    Builds and caches dependency environments for plugins.
+
+    An environment is a Docker image for the docker backend and a
+    site-packages directory for the forkserver backend. Builds run in a
+    background thread when a plugin is approved, never on the execute path:
+    a call whose environment is not ready fails fast instead of waiting.
+
+    Builds are incremental. An image is layered on the largest ready image
+    whose requirements are a subset of the new set, so only the missing
+    packages are installed; directory builds share a pip wheel cache. When
+    ready environments exceed the disk budget, those no active plugin uses
+    are evicted, least recently used first, and rebuilt if needed again.
+
+    Directory builds install wheels only, so no package code runs on the
+    host while building, and pip sees a minimal environment.
+
+    Builds are claimed through the database, so several API processes can
+    share the store; a build that outlives its timeout is taken over.
+    Another process may evict an environment, so a ready location is only
+    trusted for ``poll_interval`` seconds (or while its directory exists)
+    before the database is asked again.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        root: str,
+        max_bytes: int,
+        poll_interval: float,
+        build_timeout: float
+    ):
+        self.session_factory = session_factory
+        self.root = root
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.build_timeout = build_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._client = None
+        self._ready: Dict[str, Tuple[str, str, float]] = {}  # Environment id -> (runtime, location, time checked)
+        self._used: Dict[str, float] = {}  # Last use not yet written to the database
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._built = 0
+        self._failed = 0
+        self._evicted = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._build_loop, name="repoai-plugin-envs", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming builds; a build in progress is taken over after its timeout."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def ensure(self, db: Session, runtime: str, requirements: List[str]) -> str:
+        """
+        Make sure an environment is built or queued; returns its id.
+
+        Failed and evicted environments are queued again. The caller
+        commits, then calls :meth:`wake`.
+        """
+        env_id = environment_id(runtime, requirements)
+        env = db.query(PluginEnvironment).filter(PluginEnvironment.id == env_id).first()
+        if env is None:
+            db.add(PluginEnvironment(
+                id=env_id,
+                runtime=runtime,
+                requirements=json.dumps(requirements),
+                status="pending",
+                location=self._location(env_id, runtime)
+            ))
+        elif env.status in ("failed", "evicted"):
+            env.status = "pending"
+            env.error = None
+        return env_id
+
+    def wake(self) -> None:
+        """Look for queued builds now instead of at the next poll."""
+        self._wake.set()
+
+    def resolve(self, env_id: str) -> str:
+        """
+        Location of a ready environment, for the execute path.
+
+        Never builds: an evicted environment is queued for a rebuild and
+        the call fails fast.
+
+        Raises:
+            EnvironmentNotReady: If the environment is not ready
+        """
+        cached = self._ready.get(env_id)
+        if cached is not None and self._still_ready(*cached):
+            location = cached[1]
+        else:
+            self._ready.pop(env_id, None)
+            location = self._check_ready(env_id)
+
+        self._used[env_id] = time.time()
+        return location
+
+    def _still_ready(self, runtime: str, location: str, checked_at: float) -> bool:
+        if time.monotonic() - checked_at > self.poll_interval:
+            return False
+        return runtime == "docker" or os.path.isdir(location)
+
+    def _check_ready(self, env_id: str) -> str:
+        db = self.session_factory()
+        try:
+            env = db.query(PluginEnvironment).filter(PluginEnvironment.id == env_id).first()
+            if env is None:
+                raise EnvironmentNotReady("missing")
+            if env.status == "ready" and env.runtime != "docker" and not os.path.isdir(env.location):
+                env.status = "evicted"  # Removed behind the store's back
+            if env.status == "evicted":
+                env.status = "pending"
+                db.commit()
+                self._wake.set()
+            if env.status != "ready":
+                raise EnvironmentNotReady(env.status, env.error)
+            self._ready[env_id] = (env.runtime, env.location, time.monotonic())
+            return env.location
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": len(self._ready),
+            "built": self._built,
+            "failed": self._failed,
+            "evicted": self._evicted,
+        }
+
+    def _location(self, env_id: str, runtime: str) -> str:
+        if runtime == "docker":
+            return f"{settings.PLUGIN_ENV_IMAGE_REPOSITORY}:{env_id[:32]}"
+        return os.path.abspath(os.path.join(self.root, "envs", env_id))
+
+    def _build_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._flush_usage()
+                env_id = self._claim_build()
+                if env_id is not None:
+                    self._run_build(env_id)
+                    self._evict()
+                    continue  # Look for the next build straight away
+            except Exception:
+                logger.exception("Plugin environment maintenance failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim_build(self) -> Optional[str]:
+        now = datetime.utcnow()
+        claimable = or_(
+            PluginEnvironment.status == "pending",
+            and_(
+                PluginEnvironment.status == "building",
+                PluginEnvironment.heartbeat_at < now - timedelta(seconds=self.build_timeout)
+            )
+        )
+        db = self.session_factory()
+        try:
+            for (env_id,) in db.query(PluginEnvironment.id).filter(claimable) \
+                    .order_by(PluginEnvironment.created_at).limit(5):
+                # Conditional update, so only one process builds each environment
+                updated = db.query(PluginEnvironment).filter(PluginEnvironment.id == env_id, claimable).update(
+                    {"status": "building", "worker_id": self.worker_id, "heartbeat_at": now},
+                    synchronize_session=False
+                )
+                db.commit()
+                if updated:
+                    return env_id
+            return None
+        finally:
+            db.close()
+
+    def _run_build(self, env_id: str) -> None:
+        db = self.session_factory()
+        try:
+            env = db.query(PluginEnvironment).filter(PluginEnvironment.id == env_id).first()
+            requirements = json.loads(env.requirements)
+            started = time.monotonic()
+            try:
+                if env.runtime == "docker":
+                    env.parent_id, env.size_bytes = self._build_image(db, env, requirements)
+                else:
+                    env.size_bytes = self._build_directory(env, requirements)
+            except Exception as e:
+                logger.warning("Building plugin environment %s failed: %s", env_id, e)
+                env.status = "failed"
+                env.error = str(e)[-2000:]
+                self._failed += 1
+            else:
+                env.status = "ready"
+                env.error = None
+                env.last_used_at = datetime.utcnow()
+                self._ready[env_id] = (env.runtime, env.location, time.monotonic())
+                self._built += 1
+            env.build_time_ms = int((time.monotonic() - started) * 1000)
+            db.commit()
+        finally:
+            db.close()
+
+    def _build_directory(self, env: PluginEnvironment, requirements: List[str]) -> int:
+        """
+        Install the requirements into a site-packages directory for the host interpreter.
+
+        Only wheels are accepted: an sdist would run its setup.py on the host.
+        """
+        partial = env.location + ".partial"
+        shutil.rmtree(partial, ignore_errors=True)
+        os.makedirs(os.path.dirname(partial), exist_ok=True)
+        command = [
+            sys.executable, "-m", "pip", "install",
+            "--no-input", "--disable-pip-version-check",
+            "--only-binary=:all:",
+            "--target", partial,
+            "--cache-dir", os.path.join(self.root, "pip-cache"),
+            *requirements
+        ]
+        pip_env = {
+            name: value for name, value in os.environ.items()
+            if name in PIP_ENVIRONMENT or name.startswith("PIP_")
+        }
+        pip_env["HOME"] = os.path.abspath(self.root)
+        completed = subprocess.run(
+            command, capture_output=True, text=True, timeout=self.build_timeout, env=pip_env, cwd=self.root
+        )
+        if completed.returncode != 0:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise RuntimeError(completed.stderr.strip() or completed.stdout.strip())
+
+        shutil.rmtree(env.location, ignore_errors=True)
+        os.rename(partial, env.location)
+        return directory_size(env.location)
+
+    def _build_image(self, db: Session, env: PluginEnvironment, requirements: List[str]):
+        """Build an image on top of the closest ready image; returns ``(parent_id, size_bytes)``."""
+        client = self._docker_client()
+        parent = self._find_parent(db, env, requirements)
+        base = parent.location if parent is not None else settings.PLUGIN_SANDBOX_IMAGE
+        installed = set(json.loads(parent.requirements)) if parent is not None else set()
+        missing = [requirement for requirement in requirements if requirement not in installed]
+
+        dockerfile = (
+            f"FROM {base}\n"
+            f"RUN pip install --no-cache-dir --disable-pip-version-check {' '.join(shlex.quote(r) for r in missing)}\n"
+        )
+        image, _ = client.images.build(
+            fileobj=io.BytesIO(dockerfile.encode()),
+            tag=env.location,
+            rm=True,
+            forcerm=True,
+            timeout=self.build_timeout
+        )
+        # Only the new layers take extra disk space
+        base_size = client.images.get(base).attrs["Size"]
+        return (parent.id if parent is not None else None), max(image.attrs["Size"] - base_size, 0)
+
+    def _find_parent(self, db: Session, env: PluginEnvironment, requirements: List[str]) -> Optional[PluginEnvironment]:
+        wanted = set(requirements)
+        best = None
+        for candidate in db.query(PluginEnvironment).filter(
+            PluginEnvironment.runtime == env.runtime,
+            PluginEnvironment.status == "ready",
+            PluginEnvironment.id != env.id
+        ):
+            installed = set(json.loads(candidate.requirements))
+            if installed < wanted and (best is None or len(installed) > len(json.loads(best.requirements))):
+                best = candidate
+        return best
+
+    def _evict(self) -> None:
+        """Remove unused environments, least recently used first, until the store fits its budget."""
+        db = self.session_factory()
+        try:
+            ready = db.query(PluginEnvironment).filter(PluginEnvironment.status == "ready").all()
+            total = sum(env.size_bytes or 0 for env in ready)
+            if total <= self.max_bytes:
+                return
+
+            in_use: Set[str] = {
+                env_id for (env_id,) in db.query(Plugin.environment_id).filter(
+                    Plugin.is_active == True, Plugin.environment_id.isnot(None)
+                )
+            }
+            # Images that others are layered on cannot be removed before them
+            parents = {env.parent_id for env in ready if env.parent_id}
+            for env in sorted(ready, key=lambda env: env.last_used_at or env.created_at or datetime.min):
+                if total <= self.max_bytes:
+                    break
+                if env.id in in_use or env.id in parents:
+                    continue
+                try:
+                    self._remove(env)
+                except Exception as e:
+                    logger.warning("Evicting plugin environment %s failed: %s", env.id, e)
+                    continue
+                env.status = "evicted"
+                self._ready.pop(env.id, None)
+                total -= env.size_bytes or 0
+                self._evicted += 1
+            db.commit()
+        finally:
+            db.close()
+
+    def _remove(self, env: PluginEnvironment) -> None:
+        if env.runtime == "docker":
+            self._docker_client().images.remove(env.location)
+        else:
+            shutil.rmtree(env.location, ignore_errors=True)
+
+    def _flush_usage(self) -> None:
+        if not self._used:
+            return
+        used, self._used = self._used, {}
+        db = self.session_factory()
+        try:
+            for env_id, timestamp in used.items():
+                db.query(PluginEnvironment).filter(PluginEnvironment.id == env_id).update(
+                    {"last_used_at": datetime.utcfromtimestamp(timestamp)}, synchronize_session=False
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _docker_client(self):
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
+
+
+def request_environment(db: Session, plugin: Plugin) -> None:
+    """
+    Queue the build of the environment a plugin needs for its current backend.
+
+    Plugins without dependencies, and plugins on the local backend (which
+    use the server's own packages), get no environment. The caller commits,
+    then wakes the store.
+    """
+    requirements = json.loads(plugin.requirements or "[]")
+    runtime = environment_runtime(backend_for(plugin))
+    plugin.environment_id = environment_store.ensure(db, runtime, requirements) if requirements and runtime else None
+
+
+def environment_for(plugin: Any) -> Optional[str]:
+    """
+    The environment location a plugin call runs in, or None for the plain sandbox.
+
+    Raises:
+        EnvironmentNotReady: If the plugin's environment is not ready
+    """
+    if not getattr(plugin, "environment_id", None):
+        return None
+    return environment_store.resolve(plugin.environment_id)
+
+
+# Create singleton instance
+environment_store = EnvironmentStore(
+    session_factory=SessionLocal,
+    root=settings.PLUGIN_ENV_DIR,
+    max_bytes=settings.PLUGIN_ENV_MAX_DISK_MB * 1024 * 1024,
+    poll_interval=settings.PLUGIN_ENV_POLL_INTERVAL_SECONDS,
+    build_timeout=settings.PLUGIN_ENV_BUILD_TIMEOUT_SECONDS
+)
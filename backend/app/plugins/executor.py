@@ -1,15 +1,21 @@
-import importlib.util
 import os
-import sys
-import tempfile
-import shutil
-import subprocess
 from typing import Dict, Any, Optional
-import docker
-import json
 import logging
 
 from ..config import settings
+from .introspection import read_cache_policy
+from .loader import LoadedPluginRegistry
+from .forkserver import RUNNER_PATH as FORKSERVER_RUNNER_PATH, ForkServerSandbox
+from .pool import ContainerPoolManager
+from .protocol import load_files
+
+EXECUTION_BACKENDS = ("local", "forkserver", "docker")
+
+
+def backend_for(plugin: Any) -> str:
+    """The execution backend chosen for a plugin, falling back to the default."""
+    return getattr(plugin, "execution_backend", None) or settings.PLUGIN_DEFAULT_BACKEND
+
 
 class PluginExecutor:
     """Manages plugin execution in a secure environment."""
@@ -17,6 +23,13 @@ class PluginExecutor:
     def __init__(self):
         self.plugin_dir = settings.PLUGIN_DIR
         os.makedirs(self.plugin_dir, exist_ok=True)
+        self.container_pools = ContainerPoolManager()
+        self.forkserver_pools = ContainerPoolManager(
+            sandbox_factory=ForkServerSandbox,
+            runner_path=FORKSERVER_RUNNER_PATH
+        )
+        self.loaded_plugins = LoadedPluginRegistry()
+        self._cache_policies: Dict[str, Any] = {}
     
     def execute_local(self, plugin_path: str, method_name: str, params: Dict[str, Any]) -> Any:
         """
@@ -31,137 +44,169 @@ class PluginExecutor:
             Result of the method call
         """
         try:
-            # Import the plugin module dynamically
-            spec = importlib.util.spec_from_file_location("plugin_module", plugin_path)
-            if spec is None or spec.loader is None:
-                raise ImportError(f"Could not load plugin from {plugin_path}")
-                
-            plugin_module = importlib.util.module_from_spec(spec)
-            sys.modules["plugin_module"] = plugin_module
-            spec.loader.exec_module(plugin_module)
-            
-            # Get the run method
-            plugin_class = getattr(plugin_module, "Plugin")
-            plugin_instance = plugin_class()
-            method = getattr(plugin_instance, method_name)
-            
-            # Execute the method
-            return method(**params)
+            # Reuse the imported module and a pooled Plugin instance
+            return self.loaded_plugins.get(plugin_path).call(method_name, params)
             
         except Exception as e:
             logging.error(f"Error executing plugin {plugin_path}: {str(e)}")
             raise
     
-    def execute_docker(self, plugin_path: str, method_name: str, params: Dict[str, Any]) -> Any:
+    def execute_docker(
+        self,
+        plugin_path: str,
+        method_name: str,
+        params: Dict[str, Any],
+        wall_seconds: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+        environment: Optional[str] = None
+    ) -> Any:
         """
         Execute a plugin in a Docker container (safe for untrusted plugins).
         
+        Calls are served by a pool of warm, locked-down containers per plugin
+        instead of starting a fresh container for every call. A call that
+        runs over its budget raises ``PluginBudgetExceeded`` and its
+        container is killed.
+        
         Args:
             plugin_path: Path to the plugin file
             method_name: Name of the method to call
             params: Parameters to pass to the method
+            wall_seconds: Wall-clock budget for the call (None for no limit)
+            cpu_seconds: CPU-time budget for the call (None for no limit)
+            environment: Image with the plugin's dependencies (None for the base image)
             
         Returns:
             Result of the method call
         """
         try:
-            # Create a temporary directory for the plugin
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Copy the plugin file to the temp directory
-                plugin_filename = os.path.basename(plugin_path)
-                temp_plugin_path = os.path.join(temp_dir, plugin_filename)
-                shutil.copy(plugin_path, temp_plugin_path)
-                
-                # Create a wrapper script to run the plugin
-                wrapper_path = os.path.join(temp_dir, "run_plugin.py")
-                with open(wrapper_path, "w") as f:
-                    f.write(f"""
-import json
-import sys
-from {os.path.splitext(plugin_filename)[0]} import Plugin
-
-def main():
-    try:
-        # Load parameters from stdin
-        params = json.loads(sys.stdin.read())
-        
-        # Initialize the plugin
-        plugin = Plugin()
-        
-        # Call the specified method
-        result = getattr(plugin, "{method_name}")(**params)
-        
-        # Return the result as JSON
-        print(json.dumps({{"status": "success", "result": result}}))
-        
-    except Exception as e:
-        print(json.dumps({{"status": "error", "error": str(e)}}))
-
-if __name__ == "__main__":
-    main()
-                    """)
-                
-                # Create a client to interact with Docker
-                client = docker.from_env()
-                
-                # Run the plugin in a container
-                container = client.containers.run(
-                    image="python:3.9-slim",  # Base Python image
-                    command=f"python /app/run_plugin.py",
-                    volumes={temp_dir: {"bind": "/app", "mode": "ro"}},
-                    stdin_open=True,
-                    detach=True,
-                    mem_limit="256m",  # Limit memory usage
-                    network_mode="none",  # Disable network access
-                    auto_remove=True
-                )
-                
-                # Pass the parameters to the container
-                container.attach(
-                    stdin=True, 
-                    stdout=False, 
-                    stderr=False, 
-                    stream=False
-                ).write(json.dumps(params).encode())
-                
-                # Get the output from the container
-                result = container.wait()
-                logs = container.logs().decode()
-                
-                # Check if the execution was successful
-                if result["StatusCode"] != 0:
-                    raise Exception(f"Plugin execution failed: {logs}")
-                
-                # Parse the output
-                try:
-                    output = json.loads(logs)
-                    if output["status"] == "error":
-                        raise Exception(output["error"])
-                    return output["result"]
-                except json.JSONDecodeError:
-                    raise Exception(f"Invalid output from plugin: {logs}")
-                
+            return self.container_pools.call(
+                plugin_path, method_name, params, environment, wall_seconds=wall_seconds, cpu_seconds=cpu_seconds
+            )
         except Exception as e:
             logging.error(f"Error executing plugin {plugin_path} in Docker: {str(e)}")
             raise
     
-    def execute(self, plugin_path: str, method_name: str, params: Dict[str, Any], secure: bool = True) -> Any:
+    def execute_forkserver(
+        self,
+        plugin_path: str,
+        method_name: str,
+        params: Dict[str, Any],
+        wall_seconds: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+        environment: Optional[str] = None
+    ) -> Any:
         """
-        Execute a plugin either locally or in a Docker container.
+        Execute a plugin in a forked, resource-limited child of a preloaded runner.
+        
+        Lighter than Docker: no daemon is needed and a call costs a fork.
+        Network and filesystem confinement use namespaces where the kernel
+        allows them.
         
         Args:
             plugin_path: Path to the plugin file
             method_name: Name of the method to call
             params: Parameters to pass to the method
-            secure: Whether to use Docker for secure execution
+            wall_seconds: Wall-clock budget for the call (None for no limit)
+            cpu_seconds: CPU-time budget for the call (None for no limit)
+            environment: Directory with the plugin's dependencies (None for none)
+            
+        Returns:
+            Result of the method call
+        """
+        try:
+            return self.forkserver_pools.call(
+                plugin_path, method_name, params, environment, wall_seconds=wall_seconds, cpu_seconds=cpu_seconds
+            )
+        except Exception as e:
+            logging.error(f"Error executing plugin {plugin_path} in forkserver: {str(e)}")
+            raise
+    
+    def is_cacheable(self, plugin_path: str, method_name: str) -> bool:
+        """Check whether a plugin declared a method's results as cacheable."""
+        stat = os.stat(plugin_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache_policies.get(plugin_path)
+        if cached is None or cached[0] != signature:
+            with open(plugin_path, encoding="utf-8") as f:
+                cached = (signature, read_cache_policy(f.read()))
+            self._cache_policies[plugin_path] = cached
+        
+        policy = cached[1]
+        return policy is True or method_name in policy
+    
+    def prewarm(self, plugin_path: str, backend: str = "docker", environment: Optional[str] = None) -> None:
+        """Start warm sandboxes for a plugin's backend in the background."""
+        if backend == "docker":
+            self.container_pools.prewarm(plugin_path, environment)
+        elif backend == "forkserver":
+            self.forkserver_pools.prewarm(plugin_path, environment)
+    
+    def unload(self, plugin_path: str, backend: Optional[str] = None) -> None:
+        """
+        Release the execution resources held for a plugin file.
+        
+        Args:
+            plugin_path: Path to the plugin file
+            backend: Only release this backend's sandboxes or loaded module;
+                by default everything held for the file is released
+        """
+        if backend in (None, "docker"):
+            self.container_pools.remove(plugin_path)
+        if backend in (None, "forkserver"):
+            self.forkserver_pools.remove(plugin_path)
+        if backend in (None, "local"):
+            self.loaded_plugins.invalidate(plugin_path)
+        if backend is None:
+            self._cache_policies.pop(plugin_path, None)
+    
+    def remove_stale_sandboxes(self) -> None:
+        """Remove Docker sandboxes left behind by earlier processes that did not shut down cleanly."""
+        self.container_pools.remove_stale_containers()
+    
+    def shutdown(self) -> None:
+        """Release all execution resources held by the executor."""
+        self.container_pools.shutdown()
+        self.forkserver_pools.shutdown()
+        self.loaded_plugins.clear()
+    
+    def execute(
+        self,
+        plugin_path: str,
+        method_name: str,
+        params: Dict[str, Any],
+        secure: bool = True,
+        wall_seconds: Optional[float] = None,
+        cpu_seconds: Optional[float] = None,
+        backend: Optional[str] = None,
+        environment: Optional[str] = None
+    ) -> Any:
+        """
+        Execute a plugin locally, in a forkserver sandbox or in a Docker container.
+        
+        Args:
+            plugin_path: Path to the plugin file
+            method_name: Name of the method to call
+            params: Parameters to pass to the method; may hold bytes and
+                ``BlobFile`` values, which sandboxes receive as memoryviews
+            secure: Whether to use Docker for secure execution (when no backend is given)
+            wall_seconds: Wall-clock budget, enforced by the sandboxed backends
+            cpu_seconds: CPU-time budget, enforced by the sandboxed backends
+            backend: One of ``EXECUTION_BACKENDS``; overrides ``secure``
+            environment: Location of the plugin's dependency environment for
+                sandboxed backends; local plugins use the server's packages
             
         Returns:
             Result of the method call
         """
-        if secure:
-            return self.execute_docker(plugin_path, method_name, params)
-        else:
-            return self.execute_local(plugin_path, method_name, params)
+        backend = backend or ("docker" if secure else "local")
+        if backend == "docker":
+            return self.execute_docker(plugin_path, method_name, params, wall_seconds, cpu_seconds, environment)
+        if backend == "forkserver":
+            return self.execute_forkserver(plugin_path, method_name, params, wall_seconds, cpu_seconds, environment)
+        if backend == "local":
+            return self.execute_local(plugin_path, method_name, load_files(params))
+        raise ValueError(f"Unknown execution backend '{backend}'")
 
 # Create singleton instance
 plugin_executor = PluginExecutor() 
\ No newline at end of file
@@ -0,0 +1,118 @@
+import logging
+import os
+import selectors
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from .pool import PluginBudgetExceeded, build_request, unpack_response
+from .protocol import BlobSpill, encode_message, read_message
+
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "forkserver_runner.py")
+
+# Extra time the host waits beyond a call's wall budget before giving up on the runner itself
+HOST_TIMEOUT_GRACE_SECONDS = 5
+
+
+class ForkServerSandbox:
+    """
+    A preforked Python runner that serves calls for one plugin.
+
+    The runner drops to an unprivileged uid in its own user and PID
+    namespaces and pivots into a read-only, network-less root holding only
+    the plugin and the Python it needs, then imports the plugin once and
+    forks a rlimited child per call, so each call costs a fork instead of a
+    container start. It runs with a minimal environment so no server
+    secrets reach the plugin.
+    """
+
+    def __init__(self, workdir: str, plugin_filename: str, site_packages: Optional[str] = None):
+        self.workdir = workdir
+        self.plugin_filename = plugin_filename
+        self.site_packages = site_packages  # A dependency environment, if the plugin has one
+        self.process: Optional[subprocess.Popen] = None
+        self.calls = 0
+        self.last_used = time.monotonic()
+        self._stdout = bytearray()
+        self._deadline: Optional[float] = None
+
+    def start(self) -> None:
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "REPOAI_FORKSERVER_MEMORY_MB": str(settings.PLUGIN_FORKSERVER_MEMORY_MB),
+            "REPOAI_FORKSERVER_LOAD_CPU_SECONDS": str(settings.PLUGIN_DEFAULT_CPU_SECONDS),
+            "REPOAI_FORKSERVER_MAX_PROCESSES": str(settings.PLUGIN_FORKSERVER_MAX_PROCESSES),
+            "REPOAI_FORKSERVER_UID": str(settings.PLUGIN_FORKSERVER_UID),
+            "REPOAI_FORKSERVER_REQUIRE_ISOLATION": "1" if settings.PLUGIN_FORKSERVER_REQUIRE_ISOLATION else "0",
+        }
+        if self.site_packages:
+            env["PYTHONPATH"] = self.site_packages
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", os.path.join(self.workdir, "runner.py"), os.path.join(self.workdir, self.plugin_filename)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.workdir,
+            env=env,
+            close_fds=True
+        )
+        self.last_used = time.monotonic()
+
+    def call(
+        self,
+        method_name: str,
+        params: Dict[str, Any],
+        wall_seconds: Optional[float] = None,
+        cpu_seconds: Optional[float] = None
+    ) -> Any:
+        """Send one request to the runner and wait for its response."""
+        blobs = BlobSpill(self.workdir)
+        try:
+            frames = encode_message(
+                build_request(method_name, params, wall_seconds=wall_seconds, cpu_seconds=cpu_seconds),
+                spill=blobs.write,
+                spill_threshold=settings.PLUGIN_BLOB_SPILL_BYTES
+            )
+            for frame in frames:
+                self.process.stdin.write(frame)
+            self.process.stdin.flush()
+
+            # The runner enforces the budget on its child; this only catches a stuck runner
+            self._deadline = time.monotonic() + wall_seconds + HOST_TIMEOUT_GRACE_SECONDS if wall_seconds else None
+            response = read_message(self._read_exactly)
+        finally:
+            blobs.clear()
+        self.calls += 1
+        self.last_used = time.monotonic()
+        return unpack_response(response, self.plugin_filename)
+
+    def close(self) -> None:
+        """Stop the runner process."""
+        try:
+            if self.process is not None:
+                self.process.kill()
+                self.process.wait(timeout=5)
+        except Exception as e:
+            logging.warning(f"Error stopping forkserver sandbox: {str(e)}")
+        finally:
+            self.process = None
+
+    def _read_exactly(self, size: int) -> bytes:
+        fd = self.process.stdout.fileno()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while len(self._stdout) < size:
+                remaining = None if self._deadline is None else self._deadline - time.monotonic()
+                if remaining is not None and (remaining <= 0 or not selector.select(remaining)):
+                    raise PluginBudgetExceeded("Plugin runner stopped responding")
+                data = os.read(fd, max(size - len(self._stdout), 1 << 16))
+                if not data:
+                    raise Exception("Forkserver runner exited")
+                self._stdout += data
+
+        data = bytes(self._stdout[:size])
+        del self._stdout[:size]
+        return data
@@ -0,0 +1,610 @@
+"""
+Preforked plugin runner used by the forkserver sandbox backend.
+
+The runner locks itself down before it imports anything from the plugin:
+
+- started as root, it switches to an unprivileged uid
+- new user, network, mount and PID namespaces; the runner forks into the
+  PID namespace as its init, so no process outside it can be signalled
+- the root pivoted to a read-only tree holding only this directory, the
+  Python installation, the plugin's dependency environment and the system
+  libraries, after which every capability is dropped
+- a seccomp filter that rejects socket, exec, ptrace, mount, namespace,
+  module, kexec, io_uring and the other calls that could undo the above
+
+Unless isolation is required, the namespaces are skipped where the kernel
+does not allow them. It then imports the plugin and creates its instance
+once under CPU-time and address-space limits, and closes any file
+descriptors the import left open. For every framed request on stdin (see
+protocol.py) the runner forks a child, which inherits that lockdown,
+starts its own session, may no longer send signals, sets rlimits for CPU
+time, address space, processes, file size and open files, and runs the
+call. The child writes its framed response to a pipe and exits; the runner
+forwards it to stdout unchanged, or kills the child if it overruns its
+wall-clock budget. Whatever the call started is killed with it. Setting up
+the namespaces once keeps the per-call overhead to a fork. This file is
+copied next to the plugin and protocol.py, so it must only depend on the
+standard library.
+"""
+import ctypes
+import ctypes.util
+import importlib.util
+import math
+import os
+import platform
+import resource
+import select
+import signal
+import struct
+import sys
+import sysconfig
+import time
+
+from protocol import MappedBlobs, OutputCapture, encode_message, read_message, stream_reader
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWCGROUP = 0x02000000
+CLONE_NEWUTS = 0x04000000
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWPID = 0x20000000
+CLONE_NEWNET = 0x40000000
+NAMESPACE_FLAGS = (
+    CLONE_NEWNS | CLONE_NEWCGROUP | CLONE_NEWUTS | CLONE_NEWIPC | CLONE_NEWUSER | CLONE_NEWPID | CLONE_NEWNET
+)
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_NOEXEC = 8
+MS_REMOUNT = 32
+MS_NOATIME = 1024
+MS_NODIRATIME = 2048
+MS_BIND = 4096
+MS_REC = 16384
+MS_PRIVATE = 1 << 18
+MS_RELATIME = 1 << 21
+MNT_DETACH = 2
+PR_SET_PDEATHSIG = 1
+PR_SET_DUMPABLE = 4
+PR_CAPBSET_DROP = 24
+PR_SET_NO_NEW_PRIVS = 38
+PR_SET_SECCOMP = 22
+PR_CAP_AMBIENT = 47
+PR_CAP_AMBIENT_CLEAR_ALL = 4
+LINUX_CAPABILITY_VERSION_3 = 0x20080522
+SECCOMP_MODE_FILTER = 2
+SECCOMP_RET_ALLOW = 0x7FFF0000
+SECCOMP_RET_ERRNO = 0x00050000
+EPERM = 1
+ENOSYS = 38
+
+# Classic BPF opcodes used by the seccomp filters
+BPF_LD_ABS = 0x20
+BPF_JEQ = 0x15
+BPF_JGE = 0x35
+BPF_JSET = 0x45
+BPF_RET = 0x06
+
+# Calls shared by both architectures: io_uring_setup, io_uring_enter,
+# io_uring_register, pidfd_getfd and the new mount API (open_tree,
+# move_mount, fsopen, fsconfig, fsmount, fspick, mount_setattr)
+COMMON_DENIED_SYSCALLS = [425, 426, 427, 438, 428, 429, 430, 431, 432, 433, 442]
+
+# Per architecture: the audit arch, the numbers of pivot_root, clone and
+# clone3, the calls the runner denies (socket, ptrace, execve, execveat,
+# mount, unshare, umount2, chroot, pivot_root, setns, name_to_handle_at,
+# open_by_handle_at, init_module, finit_module, delete_module, kexec_load,
+# kexec_file_load, process_vm_readv, process_vm_writev, bpf,
+# perf_event_open, userfaultfd, keyctl, add_key, request_key, reboot,
+# swapon, swapoff, acct, personality) and the signalling calls a call's
+# child denies on top (kill, tkill, tgkill, rt_sigqueueinfo,
+# rt_tgsigqueueinfo, pidfd_send_signal)
+SECCOMP_ARCHES = {
+    "x86_64": {
+        "audit_arch": 0xC000003E,
+        "pivot_root": 155,
+        "clone": 56,
+        "clone3": 435,
+        "denied": [
+            41, 101, 59, 322, 165, 272, 166, 161, 155, 308, 303, 304, 175, 313, 176, 246, 320, 310, 311, 321,
+            298, 323, 250, 248, 249, 169, 167, 168, 163, 135,
+        ] + COMMON_DENIED_SYSCALLS,
+        "signals": [62, 200, 234, 129, 297, 424],
+    },
+    "aarch64": {
+        "audit_arch": 0xC00000B7,
+        "pivot_root": 41,
+        "clone": 220,
+        "clone3": 435,
+        "denied": [
+            198, 117, 221, 281, 40, 97, 39, 51, 41, 268, 264, 265, 105, 273, 106, 104, 294, 270, 271, 280,
+            241, 282, 219, 217, 218, 142, 224, 225, 89, 92,
+        ] + COMMON_DENIED_SYSCALLS,
+        "signals": [129, 130, 131, 138, 240, 424],
+    },
+}
+
+# Shared libraries that extension modules load, besides the Python installation
+SYSTEM_LIBRARY_PATHS = ["/lib", "/lib64", "/usr/lib", "/usr/lib64", "/usr/local/lib", "/etc/ld.so.cache"]
+
+# Statvfs flags a read-only bind mount must keep, with the mount flags that set them
+LOCKED_MOUNT_FLAGS = [
+    (os.ST_NOEXEC, MS_NOEXEC),
+    (os.ST_NOATIME, MS_NOATIME),
+    (os.ST_NODIRATIME, MS_NODIRATIME),
+    (os.ST_RELATIME, MS_RELATIME),
+]
+
+libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+def load_plugin(plugin_path):
+    spec = importlib.util.spec_from_file_location("plugin_module", plugin_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Could not load plugin from {plugin_path}")
+
+    plugin_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plugin_module)
+    return plugin_module.Plugin()
+
+
+def address_space_bytes(statm_fd):
+    """The runner's address space, read through a /proc/self/statm handle opened before the pivot."""
+    return int(os.pread(statm_fd, 4096, 0).split()[0]) * resource.getpagesize()
+
+
+def apply_rlimits(cpu_seconds, memory_mb, max_processes, statm_fd):
+    if cpu_seconds:
+        limit = math.ceil(cpu_seconds)
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 1))
+    if memory_mb:
+        # The child starts with the runner's mappings; the budget is on top of them
+        limit = address_space_bytes(statm_fd) + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if max_processes:
+        # Counted per user namespace, so this bounds the processes and threads of this runner
+        resource.setrlimit(resource.RLIMIT_NPROC, (max_processes, max_processes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+
+
+def visible_paths(workdir):
+    """What the plugin may see: its directory, the Python installation and the system libraries."""
+    paths = {workdir}
+    paths.update(entry for entry in sys.path if entry)  # Includes a dependency environment on PYTHONPATH
+    paths.update(sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib"))
+    paths.update(SYSTEM_LIBRARY_PATHS)
+    return sorted(path for path in paths if os.path.lexists(path))
+
+
+def bind_read_only(source, target):
+    if os.path.isdir(source):
+        os.makedirs(target, exist_ok=True)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        open(target, "a").close()
+    if libc.mount(os.fsencode(source), os.fsencode(target), None, MS_BIND, None) != 0:
+        return False
+
+    # Remounting must keep the flags the source mount is locked with
+    flags = MS_REMOUNT | MS_BIND | MS_RDONLY | MS_NOSUID | MS_NODEV
+    source_flags = os.statvfs(source).f_flag
+    for statvfs_flag, mount_flag in LOCKED_MOUNT_FLAGS:
+        if source_flags & statvfs_flag:
+            flags |= mount_flag
+    return libc.mount(None, os.fsencode(target), None, flags, None) == 0
+
+
+def pivot_root(new_root, put_old):
+    arch = SECCOMP_ARCHES.get(platform.machine())
+    if arch is None:
+        return False
+    return libc.syscall(arch["pivot_root"], os.fsencode(new_root), os.fsencode(put_old)) == 0
+
+
+def drop_privileges(workdir, uid):
+    """Switch a runner started as root to ``uid``, which then owns the staged plugin directory."""
+    os.chown(workdir, uid, uid)
+    os.setgroups([])
+    os.setgid(uid)
+    os.setuid(uid)
+    # Changing uid makes /proc/self root-owned, which would keep us from writing our uid map
+    libc.prctl(PR_SET_DUMPABLE, 1, 0, 0, 0)
+
+
+def map_user(uid, gid):
+    """Map our own ids into a new user namespace, so our files keep their owner."""
+    try:
+        for name, content in (("setgroups", "deny"), ("uid_map", f"{uid} {uid} 1"), ("gid_map", f"{gid} {gid} 1")):
+            with open(f"/proc/self/{name}", "w") as f:
+                f.write(content)
+    except OSError:
+        return False
+    return True
+
+
+def become_init():
+    """
+    Fork into the new PID namespace as its init.
+
+    The original process stays outside it only to wait and pass on the exit
+    status; if it is killed, the kernel kills the namespace's init and so
+    everything in the namespace.
+    """
+    # The parent holds the write end until it exits; the parent is pid 0 from inside
+    alive_read, alive_write = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(alive_read)
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        os._exit(code if code >= 0 else 128 - code)
+    os.close(alive_write)
+    libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL, 0, 0, 0)
+    if select.select([alive_read], [], [], 0)[0]:
+        os._exit(1)  # The parent died before the death signal was armed
+    os.close(alive_read)
+
+
+def enter_namespaces(workdir, uid):
+    """
+    Become an unprivileged init of new user, network, mount and PID namespaces.
+
+    Returns False if the kernel does not allow them. The runner never keeps
+    root: started as root, it switches to ``uid`` before unsharing, and the
+    user namespace maps only that uid.
+    """
+    os.makedirs(os.path.join(workdir, ".root"), exist_ok=True)
+    if os.getuid() == 0:
+        drop_privileges(workdir, uid)
+    uid, gid = os.getuid(), os.getgid()
+    if libc.unshare(CLONE_NEWUSER | CLONE_NEWNET | CLONE_NEWNS | CLONE_NEWPID) != 0:
+        return False
+    if not map_user(uid, gid):
+        return False
+    become_init()
+    return True
+
+
+def enter_root(workdir):
+    """
+    Pivot into a read-only root; returns False if that fails.
+
+    The new root is a tmpfs mounted on ``<workdir>/.root`` holding read-only
+    binds of :func:`visible_paths` at their usual locations. The old root is
+    detached, so nothing else on the host stays reachable.
+    """
+    if libc.mount(None, b"/", None, MS_REC | MS_PRIVATE, None) != 0:
+        return False
+
+    new_root = os.path.join(workdir, ".root")
+    if libc.mount(b"tmpfs", os.fsencode(new_root), b"tmpfs", MS_NOSUID | MS_NODEV, b"mode=0755") != 0:
+        return False
+
+    try:
+        paths = visible_paths(workdir)  # Fails if the uid cannot read the Python installation
+        bound = []
+        for path in paths:
+            if os.path.islink(path):
+                # e.g. /lib -> usr/lib; the link's target is bound in its own right
+                target = new_root + path
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if not os.path.lexists(target):
+                    os.symlink(os.readlink(path), target)
+            source = os.path.realpath(path)
+            if any(source == parent or source.startswith(parent + os.sep) for parent in bound):
+                continue
+            if not bind_read_only(source, new_root + source):
+                return False
+            bound.append(source)
+
+        put_old = os.path.join(new_root, ".old")
+        os.makedirs(put_old, exist_ok=True)
+        if not pivot_root(new_root, put_old):
+            return False
+    except (OSError, ImportError):
+        return False
+
+    os.chdir("/")
+    if libc.umount2(b"/.old", MNT_DETACH) != 0:
+        return False
+    os.rmdir("/.old")
+    return libc.mount(None, b"/", None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV, None) == 0
+
+
+def drop_capabilities():
+    """Give up every capability the user namespace granted; returns False if that fails."""
+    cap = 0
+    while libc.prctl(PR_CAPBSET_DROP, cap, 0, 0, 0) == 0:
+        cap += 1
+    if cap == 0:
+        return False
+    libc.prctl(PR_CAP_AMBIENT, PR_CAP_AMBIENT_CLEAR_ALL, 0, 0, 0)
+    header = struct.pack("Ii", LINUX_CAPABILITY_VERSION_3, 0)
+    data = ctypes.create_string_buffer(24)  # Effective, permitted and inheritable sets, all empty
+    return libc.capset(ctypes.create_string_buffer(header), data) == 0
+
+
+def close_inherited_fds(keep):
+    """Close every file descriptor but ``keep``, e.g. sockets or files the plugin opened on import."""
+    low = 0
+    for fd in sorted(keep) + [os.sysconf("SC_OPEN_MAX")]:
+        if low < fd:  # An empty range may be taken as "everything from low" by close_range
+            os.closerange(low, fd)
+        low = fd + 1
+
+
+def load_with_limits(plugin_path, cpu_seconds, memory_mb, statm_fd):
+    """Import the plugin in the runner itself under soft CPU-time and address-space limits."""
+    def out_of_cpu(signum, frame):
+        raise RuntimeError(f"Plugin exceeded its CPU budget of {cpu_seconds}s while loading")
+
+    previous = {limit: resource.getrlimit(limit) for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS)}
+    signal.signal(signal.SIGXCPU, out_of_cpu)
+    try:
+        if cpu_seconds:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, previous[resource.RLIMIT_CPU][1]))
+        if memory_mb:
+            soft = address_space_bytes(statm_fd) + memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (soft, previous[resource.RLIMIT_AS][1]))
+        return load_plugin(plugin_path)
+    finally:
+        # Soft limits can be raised back up to the untouched hard limits
+        for limit, values in previous.items():
+            resource.setrlimit(limit, values)
+        signal.signal(signal.SIGXCPU, signal.SIG_DFL)
+
+
+def assemble(program):
+    """
+    Encode BPF statements, resolving jump labels.
+
+    ``program`` holds ``(code, k)`` or ``(code, k, jump_true, jump_false)``
+    tuples, where the jump targets are label names or None for the next
+    statement, and label name strings marking the statement that follows.
+    """
+    statements = [item for item in program if not isinstance(item, str)]
+    labels = {}
+    for item in program:
+        if isinstance(item, str):
+            labels[item] = len([other for other in program[:program.index(item)] if not isinstance(other, str)])
+
+    encoded = []
+    for index, statement in enumerate(statements):
+        code, k, jump_true, jump_false = (statement + (None, None))[:4]
+        offsets = [0 if label is None else labels[label] - index - 1 for label in (jump_true, jump_false)]
+        encoded.append(struct.pack("HBBI", code, offsets[0], offsets[1], k))
+    return encoded
+
+
+def install_seccomp(denied):
+    """
+    Reject ``denied`` syscalls with EPERM; returns False if unsupported.
+
+    Every filter also rejects other ABIs and clone flags that create
+    namespaces, and answers clone3, whose flags it cannot inspect, with
+    ENOSYS so the C library falls back to clone. Filters stack, so a
+    forked child can only add to what the runner denies.
+    """
+    arch = SECCOMP_ARCHES.get(platform.machine())
+    if arch is None:
+        return False
+
+    program = [
+        (BPF_LD_ABS, 4),  # Load arch
+        (BPF_JEQ, arch["audit_arch"], None, "deny"),
+        (BPF_LD_ABS, 0),  # Load syscall number
+        (BPF_JGE, 0x40000000, "deny", None),  # x32 ABI calls
+        (BPF_JEQ, arch["clone3"], "enosys", None),
+        (BPF_JEQ, arch["clone"], "clone", None),
+    ]
+    program += [(BPF_JEQ, number, "deny", None) for number in denied]
+    program += [
+        (BPF_RET, SECCOMP_RET_ALLOW),
+        "clone",
+        (BPF_LD_ABS, 16),  # Low half of the flags argument
+        (BPF_JSET, NAMESPACE_FLAGS, "deny", None),
+        (BPF_RET, SECCOMP_RET_ALLOW),
+        "enosys",
+        (BPF_RET, SECCOMP_RET_ERRNO | ENOSYS),
+        "deny",
+        (BPF_RET, SECCOMP_RET_ERRNO | EPERM),
+    ]
+    program = assemble(program)
+
+    filters = ctypes.create_string_buffer(b"".join(program))
+    fprog = struct.pack("HP", len(program), ctypes.addressof(filters))
+    fprog_buffer = ctypes.create_string_buffer(fprog)
+    if libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0) != 0:
+        return False
+    pointer = ctypes.c_void_p(ctypes.addressof(fprog_buffer))
+    return libc.prctl(PR_SET_SECCOMP, SECCOMP_MODE_FILTER, pointer, 0, 0) == 0
+
+
+def run_child(plugin, request, result_fd, options):
+    """Runs in the forked child: lock down, call the plugin, write the response, exit."""
+    stdout = OutputCapture(request.get("capture_chars", 0))
+    stderr = OutputCapture(request.get("capture_chars", 0))
+    try:
+        # The request and response channels belong to the runner
+        os.dup2(options["devnull_fd"], 0)
+        os.dup2(2, 1)
+        sys.stdout, sys.stderr = stdout, stderr
+        # Its own session, so the runner can kill whatever the call starts as one group
+        os.setsid()
+        signals = SECCOMP_ARCHES.get(platform.machine(), {}).get("signals", [])
+        if not install_seccomp(signals) and options["require_isolation"]:
+            raise RuntimeError("Could not stop the plugin from sending signals")
+        apply_rlimits(request.get("cpu_seconds"), options["memory_mb"], options["max_processes"], options["statm_fd"])
+        for fd in (options["channel_fd"], options["devnull_fd"], options["statm_fd"]):
+            os.close(fd)
+        result = getattr(plugin, request["method"])(**request["params"])
+        response = {"status": "success", "result": result}
+    except MemoryError:
+        response = {"status": "error", "error": "Plugin exceeded its memory budget", "budget_exceeded": True}
+    except Exception as e:
+        response = {"status": "error", "error": str(e)}
+    response["stdout"] = stdout.getvalue()
+    response["stderr"] = stderr.getvalue()
+
+    try:
+        frames = encode_message(response)
+    except (TypeError, ValueError) as e:
+        frames = encode_message({"status": "error", "error": f"Could not encode result: {e}"})
+    for frame in frames:
+        view = memoryview(frame)
+        while view:
+            view = view[os.write(result_fd, view):]
+    os._exit(0)
+
+
+def run_request(plugin, request, options):
+    """Serve one request in a forked child; returns the framed response bytes."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run_child(plugin, request, write_fd, options)
+    os.close(write_fd)
+    # Processes the call starts inherit the pipe, so its end is seen on the child's exit, not on EOF
+    exited_fd = os.pidfd_open(pid)
+
+    wall_seconds = request.get("wall_seconds")
+    deadline = time.monotonic() + wall_seconds if wall_seconds else None
+    chunks = []
+    timed_out = False
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        ready, _, _ = select.select([read_fd, exited_fd], [], [], timeout)
+        if not ready:
+            timed_out = True
+            kill_call(pid)
+            break
+        if read_fd not in ready:
+            break  # The child exited and everything it wrote has been read
+        chunk = os.read(read_fd, 1 << 20)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(exited_fd)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    # Nothing the call started may outlive it
+    clean_up_call(pid, options)
+
+    if timed_out:
+        return error_frames(f"Plugin exceeded its wall-clock budget of {wall_seconds}s", budget_exceeded=True)
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) in (signal.SIGXCPU, signal.SIGKILL):
+        return error_frames(f"Plugin exceeded its CPU budget of {request.get('cpu_seconds')}s", budget_exceeded=True)
+    if not chunks or status != 0:
+        return error_frames(f"Plugin process exited without a response (status {status})")
+    return chunks
+
+
+def kill_call(pid):
+    """Kill a call's child and its process group, which it leads."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def clean_up_call(pid, options):
+    """
+    Kill and reap whatever a finished call left running.
+
+    As init of the PID namespace the runner also kills processes that left
+    the call's group; orphans are re-parented to it, so it reaps them all.
+    """
+    kill_call(pid)
+    if not options["init"]:
+        return
+    try:
+        os.kill(-1, signal.SIGKILL)  # Everything in the namespace but the runner
+    except ProcessLookupError:
+        pass
+    while True:
+        try:
+            os.waitpid(-1, 0)
+        except ChildProcessError:
+            return
+
+
+def error_frames(error, budget_exceeded=False):
+    response = {"status": "error", "error": error}
+    if budget_exceeded:
+        response["budget_exceeded"] = True
+    return encode_message(response)
+
+
+def main():
+    plugin_path = sys.argv[1]
+    workdir = os.path.dirname(os.path.abspath(__file__))
+    options = {
+        "memory_mb": int(os.environ.get("REPOAI_FORKSERVER_MEMORY_MB", "0")),
+        "load_cpu_seconds": float(os.environ.get("REPOAI_FORKSERVER_LOAD_CPU_SECONDS", "0")),
+        "max_processes": int(os.environ.get("REPOAI_FORKSERVER_MAX_PROCESSES", "0")),
+        "uid": int(os.environ.get("REPOAI_FORKSERVER_UID", "65534")),
+        "require_isolation": os.environ.get("REPOAI_FORKSERVER_REQUIRE_ISOLATION", "1") == "1",
+    }
+
+    # Keep a private duplicate of stdout for responses and point fd 1 at
+    # stderr, so nothing written while loading the plugin can corrupt the channel
+    sys.stdout.flush()
+    channel = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    options["channel_fd"] = channel.fileno()
+    read_exactly = stream_reader(sys.stdin.buffer)
+    sys.stdout = sys.stderr
+    blobs = MappedBlobs(workdir)
+
+    # Lock down before any plugin code runs, import time included
+    options["init"] = enter_namespaces(workdir, options["uid"])
+    # Opened as the process that serves calls, while the host filesystem is still reachable
+    options["devnull_fd"] = os.open(os.devnull, os.O_RDONLY)
+    options["statm_fd"] = os.open("/proc/self/statm", os.O_RDONLY)
+    isolated = options["init"] and enter_root(workdir) and drop_capabilities()
+    if not isolated:
+        os.chdir("/")
+    arch = SECCOMP_ARCHES.get(platform.machine())
+    isolated = install_seccomp(arch["denied"] if arch else []) and isolated
+
+    plugin = None
+    load_error = None
+    if not isolated and options["require_isolation"]:
+        load_error = "Namespace isolation is not available on this host"
+    else:
+        try:
+            plugin = load_with_limits(
+                plugin_path, options["load_cpu_seconds"], options["memory_mb"], options["statm_fd"]
+            )
+        except Exception as e:
+            load_error = f"Could not initialize plugin: {str(e)}"
+        # Children must not inherit anything the import opened
+        close_inherited_fds({0, 1, 2, options["channel_fd"], options["devnull_fd"], options["statm_fd"]})
+
+    while True:
+        try:
+            # Spilled inputs are mapped here and inherited by the child
+            request = read_message(read_exactly, blobs.open)
+        except EOFError:
+            break
+
+        try:
+            if load_error:
+                raise RuntimeError(load_error)
+            frames = run_request(plugin, request, options)
+        except Exception as e:
+            frames = error_frames(str(e))
+        finally:
+            blobs.close()
+
+        for frame in frames:
+            channel.write(frame)
+        channel.flush()
+
+
+if __name__ == "__main__":
+    main()
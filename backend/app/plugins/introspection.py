@@ -0,0 +1,174 @@
+import ast
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set, Union
+
+
+def find_plugin_class(tree: ast.Module) -> Optional[ast.ClassDef]:
+    """Find the top-level ``Plugin`` class in a parsed plugin module."""
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name == "Plugin":
+            return node
+    return None
+
+
+def read_cache_policy(source: str) -> Union[bool, Set[str]]:
+    """
+    Read a plugin's cacheability declaration without importing it.
+
+    A plugin opts in by setting ``cacheable = True`` on its ``Plugin`` class
+    (all methods are deterministic) or ``cacheable_methods = ["a", "b"]``.
+
+    Returns:
+        True if every method is cacheable, otherwise the set of cacheable
+        method names (empty if the plugin did not opt in)
+    """
+    try:
+        plugin_class = find_plugin_class(ast.parse(source))
+    except SyntaxError:
+        return set()
+    if plugin_class is None:
+        return set()
+
+    for node in plugin_class.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name):
+            continue
+        try:
+            value = ast.literal_eval(node.value)
+        except ValueError:
+            continue
+        if target.id == "cacheable" and value is True:
+            return True
+        if target.id == "cacheable_methods" and isinstance(value, (list, tuple, set)):
+            return {str(name) for name in value}
+
+    return set()
+
+
+def read_signature(source: str) -> Dict[str, Any]:
+    """
+    Index the public methods of a plugin's ``Plugin`` class without importing it.
+
+    Methods are called with keyword arguments only, so positional-only
+    parameters cannot be supplied by a caller; they are flagged, and
+    ``*args`` is left out.
+    ``complete`` is False when the class has base classes, whose methods
+    cannot be seen statically.
+
+    Returns:
+        ``{"complete": bool, "methods": {name: {"params": [...], "var_keyword": bool, "doc": str}}}``
+
+    Raises:
+        SyntaxError: If the source does not parse
+        ValueError: If the module defines no ``Plugin`` class
+    """
+    plugin_class = find_plugin_class(ast.parse(source))
+    if plugin_class is None:
+        raise ValueError("Plugin module defines no Plugin class")
+
+    methods = {}
+    for node in plugin_class.body:
+        if not isinstance(node, ast.FunctionDef) or node.name.startswith("_"):
+            continue
+        decorators = {decorator.id for decorator in node.decorator_list if isinstance(decorator, ast.Name)}
+        if "property" in decorators:
+            continue
+
+        arguments = node.args
+        bound = 0 if "staticmethod" in decorators else 1  # self or cls
+        positional = (arguments.posonlyargs + arguments.args)[bound:]
+        defaults = [None] * (len(positional) - len(arguments.defaults)) + list(arguments.defaults)
+        positional_only = max(len(arguments.posonlyargs) - bound, 0)
+
+        params = []
+        for index, (arg, default) in enumerate(zip(positional, defaults)):
+            params.append(_describe_param(arg, default is None, index < positional_only))
+        for arg, default in zip(arguments.kwonlyargs, arguments.kw_defaults):
+            params.append(_describe_param(arg, default is None, False))
+
+        methods[node.name] = {
+            "params": params,
+            "var_keyword": arguments.kwarg is not None,
+            "doc": ast.get_docstring(node),
+        }
+
+    return {"complete": not plugin_class.bases, "methods": methods}
+
+
+def _describe_param(arg: ast.arg, required: bool, positional_only: bool) -> Dict[str, Any]:
+    param = {"name": arg.arg, "required": required}
+    if arg.annotation is not None:
+        param["annotation"] = ast.unparse(arg.annotation)
+    if positional_only:
+        param["positional_only"] = True
+    return param
+
+
+# JSON types accepted for parameters annotated with these builtins
+SIMPLE_ANNOTATIONS = {
+    "str": (str,),
+    "int": (int,),
+    "float": (int, float),
+    "bool": (bool,),
+    "list": (list,),
+    "dict": (dict,),
+}
+
+
+@lru_cache(maxsize=1024)
+def load_signature(encoded: str) -> Dict[str, Any]:
+    """Decode a stored signature index; the result is shared and must not be modified."""
+    return json.loads(encoded)
+
+
+def validate_call(signature: Dict[str, Any], method_name: str, params: Dict[str, Any]) -> None:
+    """
+    Check a call against a plugin's signature index before any execution work.
+
+    Unknown methods are only rejected when the index is complete. Parameters
+    annotated with a builtin type (str, int, float, bool, list, dict) are
+    type-checked; other annotations are not.
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+    method = signature["methods"].get(method_name)
+    if method is None:
+        if signature.get("complete", True):
+            available = ", ".join(sorted(signature["methods"])) or "none"
+            raise ValueError(f"Plugin has no method '{method_name}' (available: {available})")
+        return
+
+    declared = {param["name"]: param for param in method["params"]}
+    for name, param in declared.items():
+        if param.get("positional_only"):
+            raise ValueError(f"Method '{method_name}' has a positional-only parameter '{name}' and cannot be called")
+        if param["required"] and name not in params:
+            raise ValueError(f"Missing required parameter '{name}' for method '{method_name}'")
+
+    for name, value in params.items():
+        param = declared.get(name)
+        if param is None:
+            if not method["var_keyword"]:
+                raise ValueError(f"Unknown parameter '{name}' for method '{method_name}'")
+            continue
+        expected = SIMPLE_ANNOTATIONS.get(param.get("annotation"))
+        if expected is None or value is None:
+            continue
+        # JSON booleans are not numbers
+        if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+            raise ValueError(f"Parameter '{name}' of method '{method_name}' must be of type {param['annotation']}")
+
+
+def validate_plugin_call(plugin: Any, method_name: str, params: Dict[str, Any]) -> None:
+    """
+    Validate a call against the signature index stored on a plugin row, if it has one.
+
+    Raises:
+        ValueError: If the call does not match the plugin's methods
+    """
+    if getattr(plugin, "signature", None):
+        validate_call(load_signature(plugin.signature), method_name, params)
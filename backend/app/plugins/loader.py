@@ -0,0 +1,121 @@
+import hashlib
+import importlib.util
+import os
+import queue
+import sys
+import threading
+from typing import Any, Dict, Tuple
+
+from ..config import settings
+from .artifacts import verify_artifact
+
+
+def _file_signature(plugin_path: str) -> Tuple[int, int]:
+    """Cheap change detector for a plugin file: modification time and size."""
+    stat = os.stat(plugin_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LoadedPlugin:
+    """An imported plugin module plus a small pool of reusable ``Plugin`` instances."""
+
+    def __init__(self, plugin_path: str, signature: Tuple[int, int], pool_size: int):
+        self.plugin_path = plugin_path
+        self.signature = signature
+        self.module_name = "repoai_plugin_" + hashlib.sha1(plugin_path.encode()).hexdigest()[:16]
+        self.module = self._import()
+
+        self._pool_size = max(pool_size, 1)
+        self._instances: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def call(self, method_name: str, params: Dict[str, Any]) -> Any:
+        """Call a method on a pooled instance."""
+        instance = self._borrow()
+        try:
+            return getattr(instance, method_name)(**params)
+        finally:
+            self._instances.put(instance)
+
+    def unload(self) -> None:
+        """Drop the module from ``sys.modules``."""
+        if sys.modules.get(self.module_name) is self.module:
+            del sys.modules[self.module_name]
+
+    def _import(self):
+        # Bytecode compiled at approval is used when present; it is checked against the source
+        verify_artifact(self.plugin_path)
+        spec = importlib.util.spec_from_file_location(self.module_name, self.plugin_path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Could not load plugin from {self.plugin_path}")
+
+        plugin_module = importlib.util.module_from_spec(spec)
+        sys.modules[self.module_name] = plugin_module
+        try:
+            spec.loader.exec_module(plugin_module)
+        except Exception:
+            del sys.modules[self.module_name]
+            raise
+        return plugin_module
+
+    def _borrow(self) -> Any:
+        try:
+            return self._instances.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self._pool_size
+            if create:
+                self._created += 1
+
+        if not create:
+            return self._instances.get()
+
+        try:
+            # Heavy __init__ work (models, lexicons) runs once per pooled instance
+            return getattr(self.module, "Plugin")()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+
+class LoadedPluginRegistry:
+    """
+    Cache of imported trusted plugins, keyed by plugin file.
+
+    Each plugin file gets its own module name, so plugins no longer overwrite
+    each other in ``sys.modules``. An entry is reloaded when the file's
+    modification time or size changes and dropped on :meth:`invalidate`.
+    """
+
+    def __init__(self):
+        self._loaded: Dict[str, LoadedPlugin] = {}
+        self._lock = threading.Lock()
+
+    def get(self, plugin_path: str) -> LoadedPlugin:
+        """Get the loaded plugin for a file, importing it if needed."""
+        signature = _file_signature(plugin_path)
+        with self._lock:
+            loaded = self._loaded.get(plugin_path)
+            if loaded is None or loaded.signature != signature:
+                if loaded is not None:
+                    loaded.unload()
+                loaded = LoadedPlugin(plugin_path, signature, settings.PLUGIN_INSTANCE_POOL_SIZE)
+                self._loaded[plugin_path] = loaded
+            return loaded
+
+    def invalidate(self, plugin_path: str) -> None:
+        """Forget a plugin, e.g. after it was deleted or replaced."""
+        with self._lock:
+            loaded = self._loaded.pop(plugin_path, None)
+        if loaded is not None:
+            loaded.unload()
+
+    def clear(self) -> None:
+        with self._lock:
+            loaded, self._loaded = list(self._loaded.values()), {}
+        for plugin in loaded:
+            plugin.unload()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, BigInteger, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -15,9 +15,35 @@ class Plugin(Base):
     repository_url = Column(String, nullable=True)
     is_approved = Column(Boolean, default=False)
     is_active = Column(Boolean, default=False)
-    file_path = Column(String)  # Path to the plugin file
+    file_path = Column(String)  # Path to the plugin file, named by its SHA-256
+    sha256 = Column(String, index=True, nullable=True)
+    size_bytes = Column(Integer, nullable=True)
+    signature = Column(Text, nullable=True)  # JSON index of the Plugin class's public methods, read on approval
+    max_wall_seconds = Column(Integer, nullable=True)  # Per-call budgets; None uses the defaults
+    max_cpu_seconds = Column(Integer, nullable=True)
+    execution_backend = Column(String, nullable=True)  # local, forkserver or docker; None uses the default
+    requirements = Column(Text, nullable=True)  # JSON list of pip requirement specifiers from the upload manifest
+    environment_id = Column(String, ForeignKey("plugin_environments.id"), nullable=True)  # For the current backend
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     author = relationship("User")
-    tools = relationship("Tool", back_populates="plugin") 
\ No newline at end of file
+    tools = relationship("Tool", back_populates="plugin")
+
+
+class PluginEnvironment(Base):
+    __tablename__ = "plugin_environments"
+
+    id = Column(String, primary_key=True)  # Hash of the runtime and the requirement set
+    runtime = Column(String)  # docker (an image) or forkserver (a site-packages directory)
+    requirements = Column(Text)  # JSON list of normalized requirement specifiers
+    status = Column(String, index=True, default="pending")  # pending, building, ready, failed, evicted
+    location = Column(String)  # Image tag or directory
+    parent_id = Column(String, nullable=True)  # Environment this one was layered on
+    size_bytes = Column(BigInteger, default=0)
+    error = Column(Text, nullable=True)
+    build_time_ms = Column(Integer, nullable=True)
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
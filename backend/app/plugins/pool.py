@@ -0,0 +1,550 @@
+import logging
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import docker
+
+from ..config import settings
+from .artifacts import stage_artifact
+from .protocol import BLOB_DIR, BlobSpill, ProtocolError, encode_message, read_message
+
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_runner.py")
+PROTOCOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "protocol.py")
+
+STDOUT_STREAM = 1
+STDERR_STREAM = 2
+
+# Every sandbox container is labelled with the process that started it, so
+# containers left behind by a process that died can be found and removed
+SANDBOX_LABEL = "repoai.plugin-sandbox"
+OWNER_LABEL = "repoai.plugin-sandbox.owner"
+
+# Results are spilled to a size-limited tmpfs, which Docker's archive API
+# cannot see, so they are read back by a process started inside the container
+OUTPUT_DIR = "/out"
+READ_RESULT_BLOB = (
+    "import os, shutil, sys\n"
+    "path, limit = sys.argv[1], int(sys.argv[2])\n"
+    "if os.path.getsize(path) > limit:\n"
+    "    os.remove(path)\n"
+    "    sys.exit(3)\n"
+    "with open(path, 'rb') as f:\n"
+    "    os.remove(path)\n"
+    "    shutil.copyfileobj(f, sys.stdout.buffer)\n"
+)
+BLOB_TOO_LARGE = 3
+
+
+class PluginCallError(Exception):
+    """Raised when the plugin itself reported an error (the sandbox is still healthy)."""
+
+    def __init__(self, message: str, stdout: str = "", stderr: str = ""):
+        super().__init__(message)
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class PluginBudgetExceeded(Exception):
+    """Raised when a call ran over its wall-clock or CPU budget; its sandbox is killed."""
+
+
+def sandbox_owner() -> str:
+    """Identifies this process in the labels of the containers it starts."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def remove_stale_containers(client) -> int:
+    """
+    Remove sandbox containers whose owning process on this host has exited.
+
+    Containers started from other hosts sharing the Docker daemon are left
+    alone. Returns the number of containers removed.
+    """
+    hostname = socket.gethostname()
+    removed = 0
+    for container in client.containers.list(all=True, filters={"label": SANDBOX_LABEL}):
+        host, _, pid = container.labels.get(OWNER_LABEL, "").rpartition(":")
+        if host != hostname or not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+            continue  # Still running: the container may be in use
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            continue
+        try:
+            container.remove(force=True)
+            removed += 1
+        except docker.errors.NotFound:
+            pass
+    return removed
+
+
+class ContainerResultBlobs:
+    """Reads results a container spilled to its output tmpfs, then removes them."""
+
+    def __init__(self, container, max_bytes: int):
+        self.container = container
+        self.max_bytes = max_bytes
+
+    def read(self, name: str) -> bytes:
+        if os.path.basename(name) != name:
+            raise ProtocolError(f"Invalid blob name: {name}")
+        path = f"{OUTPUT_DIR}/{BLOB_DIR}/{name}"
+        exit_code, (stdout, stderr) = self.container.exec_run(
+            ["python", "-c", READ_RESULT_BLOB, path, str(self.max_bytes)], demux=True
+        )
+        if exit_code == BLOB_TOO_LARGE:
+            raise ProtocolError(f"Result blob is larger than {self.max_bytes} bytes")
+        if exit_code != 0:
+            detail = (stderr or b"").decode(errors="replace").strip().splitlines()
+            raise ProtocolError(f"Could not read result blob {name}: {detail[-1] if detail else exit_code}")
+        return stdout or b""
+
+
+def build_request(method_name: str, params: Dict[str, Any], **limits) -> Dict[str, Any]:
+    """The request message sent to a sandbox runner for one call."""
+    return {
+        "method": method_name,
+        "params": params,
+        "capture_chars": settings.PLUGIN_OUTPUT_CAPTURE_CHARS,
+        **limits
+    }
+
+
+def unpack_response(response: Dict[str, Any], plugin_filename: str) -> Any:
+    """Return the result of a runner response, or raise the error it reports."""
+    for stream in ("stdout", "stderr"):
+        if response.get(stream):
+            logging.debug(f"Plugin {plugin_filename} {stream}: {response[stream]}")
+
+    if response["status"] == "error":
+        if response.get("budget_exceeded"):
+            raise PluginBudgetExceeded(response["error"])
+        raise PluginCallError(response["error"], response.get("stdout", ""), response.get("stderr", ""))
+    return response["result"]
+
+
+class DockerSandbox:
+    """
+    A long-lived, locked-down container that serves calls for one plugin.
+
+    The plugin's directory is mounted read-only; large binary results come
+    back through a private size-limited tmpfs instead of the attach stream.
+    The container removes itself once it exits.
+    """
+
+    def __init__(self, client, workdir: str, plugin_filename: str, image: Optional[str] = None):
+        self.client = client
+        self.workdir = workdir
+        self.plugin_filename = plugin_filename
+        self.image = image or settings.PLUGIN_SANDBOX_IMAGE  # A dependency environment, if the plugin has one
+        self.container = None
+        self.socket = None
+        self.calls = 0
+        self.last_used = time.monotonic()
+        self._stdout = bytearray()
+        self._deadline: Optional[float] = None
+
+    def start(self) -> None:
+        """Start the container and attach to its stdin/stdout."""
+        self.container = self.client.containers.run(
+            image=self.image,
+            command=["python", "-u", "/app/runner.py", f"/app/{self.plugin_filename}", OUTPUT_DIR],
+            volumes={self.workdir: {"bind": "/app", "mode": "ro"}},
+            # Writable whatever user the container runs as, and never larger than one result
+            tmpfs={OUTPUT_DIR: f"size={settings.PLUGIN_MAX_RESULT_BLOB_MB}m,mode=1777"},
+            labels={SANDBOX_LABEL: "1", OWNER_LABEL: sandbox_owner()},
+            stdin_open=True,
+            detach=True,
+            auto_remove=True,
+            mem_limit=settings.PLUGIN_SANDBOX_MEM_LIMIT,  # Limit memory usage
+            network_mode="none",  # Disable network access
+        )
+        self.socket = self.container.attach_socket(
+            params={"stdin": 1, "stdout": 1, "stderr": 1, "stream": 1}
+        )
+        self.last_used = time.monotonic()
+
+    def call(
+        self,
+        method_name: str,
+        params: Dict[str, Any],
+        wall_seconds: Optional[float] = None,
+        cpu_seconds: Optional[float] = None
+    ) -> Any:
+        """
+        Send one request over the persistent channel and wait for its response.
+
+        The runner enforces ``cpu_seconds`` inside the container; if the
+        whole response has not arrived within ``wall_seconds`` the call is
+        abandoned with :class:`PluginBudgetExceeded` and the caller must
+        discard the sandbox. The budget covers the call as a whole, so a
+        plugin that keeps writing to stderr cannot extend it.
+        """
+        blobs = BlobSpill(self.workdir)
+        frames = encode_message(
+            build_request(
+                method_name, params, cpu_seconds=cpu_seconds, spill_bytes=settings.PLUGIN_BLOB_SPILL_BYTES
+            ),
+            spill=blobs.write,
+            spill_threshold=settings.PLUGIN_BLOB_SPILL_BYTES
+        )
+        sock = self._raw_socket()
+        self._deadline = None if wall_seconds is None else time.monotonic() + wall_seconds
+        try:
+            for frame in frames:
+                sock.settimeout(self._remaining())
+                sock.sendall(frame)
+            results = ContainerResultBlobs(self.container, settings.PLUGIN_MAX_RESULT_BLOB_MB * 1024 * 1024)
+            response = read_message(self._read_exactly, results.read)
+        except socket.timeout:
+            raise PluginBudgetExceeded(f"Plugin exceeded its wall-clock budget of {wall_seconds}s")
+        finally:
+            self._deadline = None
+            sock.settimeout(None)
+            blobs.clear()
+        self.calls += 1
+        self.last_used = time.monotonic()
+        return unpack_response(response, self.plugin_filename)
+
+    def close(self) -> None:
+        """Stop and remove the container."""
+        try:
+            if self.socket is not None:
+                self.socket.close()
+            if self.container is not None:
+                self.container.remove(force=True)
+        except docker.errors.NotFound:
+            pass  # It already exited and removed itself
+        except Exception as e:
+            logging.warning(f"Error removing sandbox container: {str(e)}")
+        finally:
+            self.container = None
+            self.socket = None
+
+    def _raw_socket(self):
+        return getattr(self.socket, "_sock", self.socket)
+
+    def _remaining(self) -> Optional[float]:
+        """Seconds left of the current call's wall-clock budget; raises socket.timeout once it is spent."""
+        if self._deadline is None:
+            return None
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout()
+        return remaining
+
+    def _recv_exactly(self, size: int) -> bytes:
+        sock = self._raw_socket()
+        data = bytearray()
+        while len(data) < size:
+            sock.settimeout(self._remaining())
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise Exception("Sandbox container closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_exactly(self, size: int) -> bytes:
+        """Read stdout frames from the multiplexed attach stream until ``size`` bytes arrive."""
+        while len(self._stdout) < size:
+            stream, length = struct.unpack(">BxxxL", self._recv_exactly(8))
+            data = self._recv_exactly(length)
+            if stream == STDOUT_STREAM:
+                self._stdout += data
+            elif stream == STDERR_STREAM:
+                logging.debug(f"Plugin {self.plugin_filename} stderr: {data.decode(errors='replace')}")
+
+        data = bytes(self._stdout[:size])
+        del self._stdout[:size]
+        return data
+
+
+class SandboxPool:
+    """
+    A bounded pool of warm sandboxes for a single plugin.
+
+    Sandboxes are created on demand up to ``max_size``, recycled after
+    ``max_calls`` calls and evicted after ``idle_timeout`` seconds without use,
+    while keeping at least ``min_size`` of them warm.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int,
+        max_size: int,
+        max_calls: int,
+        idle_timeout: float,
+        acquire_timeout: float
+    ):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.max_calls = max_calls
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[Any] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def call(self, method_name: str, params: Dict[str, Any], **limits) -> Any:
+        """
+        Run a call on a pooled sandbox, replacing the sandbox if it fails.
+
+        A sandbox whose call ran over budget is destroyed, which kills its
+        container along with whatever the plugin was still doing.
+        """
+        sandbox = self.acquire()
+        discard = True
+        try:
+            result = sandbox.call(method_name, params, **limits)
+            discard = False
+            return result
+        except PluginCallError:
+            discard = False
+            raise
+        finally:
+            self.release(sandbox, discard=discard)
+
+    def acquire(self) -> Any:
+        """Take an idle sandbox, starting a new one if the pool has room."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise Exception("Sandbox pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception("Timed out waiting for a free plugin sandbox")
+                self._cond.wait(remaining)
+
+        try:
+            return self._start()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, sandbox: Any, discard: bool = False) -> None:
+        """Return a sandbox to the pool, recycling it if it is broken or worn out."""
+        if discard or self._closed or sandbox.calls >= self.max_calls:
+            self._destroy(sandbox)
+            self._refill()
+            return
+
+        with self._cond:
+            self._idle.append(sandbox)
+            self._cond.notify()
+
+    def prewarm(self) -> None:
+        """Start sandboxes until the pool holds ``min_size`` of them."""
+        self._refill()
+
+    def evict_idle(self) -> None:
+        """Close sandboxes that have been idle too long, down to ``min_size``."""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            for sandbox in list(self._idle):
+                if self._size - len(expired) <= self.min_size:
+                    break
+                if now - sandbox.last_used >= self.idle_timeout:
+                    self._idle.remove(sandbox)
+                    expired.append(sandbox)
+
+        for sandbox in expired:
+            self._destroy(sandbox)
+
+    def close(self) -> None:
+        """Close every idle sandbox; busy ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+
+        for sandbox in idle:
+            self._destroy(sandbox)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle)}
+
+    def _start(self) -> Any:
+        sandbox = self.factory()
+        sandbox.start()
+        return sandbox
+
+    def _destroy(self, sandbox: Any) -> None:
+        sandbox.close()
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _refill(self) -> None:
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                sandbox = self._start()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                logging.error(f"Error starting plugin sandbox: {str(e)}")
+                return
+
+            with self._cond:
+                self._idle.append(sandbox)
+                self._cond.notify()
+
+
+class ContainerPoolManager:
+    """
+    Keeps one warm sandbox pool per plugin and evicts idle sandboxes.
+
+    Sandboxes are Docker containers by default; ``sandbox_factory`` and
+    ``runner_path`` select another backend, such as the forkserver.
+    """
+
+    def __init__(
+        self,
+        sandbox_factory: Optional[Callable[[str, str, Optional[str]], Any]] = None,
+        runner_path: str = RUNNER_PATH
+    ):
+        self._sandbox_factory = sandbox_factory or self._docker_sandbox
+        self._runner_path = runner_path
+        self._client = None
+        # Keyed by plugin file and environment: plugins with identical code share a file
+        self._pools: Dict[Tuple[str, Optional[str]], SandboxPool] = {}
+        self._workdirs: Dict[Tuple[str, Optional[str]], str] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def call(
+        self,
+        plugin_path: str,
+        method_name: str,
+        params: Dict[str, Any],
+        environment: Optional[str] = None,
+        **limits
+    ) -> Any:
+        return self.get_pool(plugin_path, environment).call(method_name, params, **limits)
+
+    def get_pool(self, plugin_path: str, environment: Optional[str] = None) -> SandboxPool:
+        """Get the pool for a plugin, creating it on first use in the given dependency environment."""
+        key = (plugin_path, environment)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._create_pool(plugin_path, environment)
+                self._pools[key] = pool
+                self._start_reaper()
+            return pool
+
+    def prewarm(self, plugin_path: str, environment: Optional[str] = None) -> None:
+        """Start the plugin's minimum number of containers in the background."""
+        pool = self.get_pool(plugin_path, environment)
+        threading.Thread(target=pool.prewarm, daemon=True).start()
+
+    def remove(self, plugin_path: str) -> None:
+        """Shut down a plugin file's pools, e.g. when the plugin is deleted."""
+        with self._lock:
+            keys = [key for key in self._pools if key[0] == plugin_path]
+            pools = [self._pools.pop(key) for key in keys]
+            workdirs = [self._workdirs.pop(key) for key in keys if key in self._workdirs]
+
+        for pool in pools:
+            pool.close()
+        for workdir in workdirs:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def remove_stale_containers(self) -> None:
+        """Remove Docker sandboxes left behind by processes that exited without closing them."""
+        try:
+            removed = remove_stale_containers(self._docker_client())
+        except docker.errors.DockerException as e:
+            logging.debug(f"Docker is not available, no stale sandbox containers to remove: {str(e)}")
+            return
+        except Exception as e:
+            logging.warning(f"Could not remove stale sandbox containers: {str(e)}")
+            return
+        if removed:
+            logging.info(f"Removed {removed} stale sandbox containers")
+
+    def shutdown(self) -> None:
+        """Close every pool and stop the idle reaper."""
+        self._stop.set()
+        for plugin_path in {key[0] for key in list(self._pools)}:
+            self.remove(plugin_path)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {
+            path if environment is None else f"{path}@{environment}": pool.stats()
+            for (path, environment), pool in pools.items()
+        }
+
+    def _create_pool(self, plugin_path: str, environment: Optional[str]) -> SandboxPool:
+        # Stage the verified plugin with its bytecode, the runner and its
+        # protocol once; every sandbox runs from this copy
+        workdir = tempfile.mkdtemp(prefix="repoai-plugin-")
+        try:
+            plugin_filename = stage_artifact(plugin_path, workdir)
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        shutil.copy(self._runner_path, os.path.join(workdir, "runner.py"))
+        shutil.copy(PROTOCOL_PATH, os.path.join(workdir, "protocol.py"))
+        self._workdirs[(plugin_path, environment)] = workdir
+
+        return SandboxPool(
+            factory=lambda: self._sandbox_factory(workdir, plugin_filename, environment),
+            min_size=settings.PLUGIN_POOL_MIN_SIZE,
+            max_size=settings.PLUGIN_POOL_MAX_SIZE,
+            max_calls=settings.PLUGIN_POOL_MAX_CALLS_PER_CONTAINER,
+            idle_timeout=settings.PLUGIN_POOL_IDLE_TIMEOUT_SECONDS,
+            acquire_timeout=settings.PLUGIN_POOL_ACQUIRE_TIMEOUT_SECONDS
+        )
+
+    def _docker_sandbox(self, workdir: str, plugin_filename: str, image: Optional[str]) -> DockerSandbox:
+        return DockerSandbox(self._docker_client(), workdir, plugin_filename, image)
+
+    def _docker_client(self):
+        if self._client is None:
+            self._client = docker.from_env()
+        return self._client
+
+    def _start_reaper(self) -> None:
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap, daemon=True)
+        self._reaper.start()
+
+    def _reap(self) -> None:
+        interval = max(settings.PLUGIN_POOL_IDLE_TIMEOUT_SECONDS / 4, 1)
+        while not self._stop.wait(interval):
+            with self._lock:
+                pools = list(self._pools.values())
+            for pool in pools:
+                pool.evict_idle()
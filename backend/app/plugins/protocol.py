@@ -0,0 +1,260 @@
+"""
+Framed message protocol between the host and the plugin runners.
+
+A message is a run of frames, each a 4-byte big-endian length followed by
+that many bytes. The first frame is a JSON header. Binary values (bytes,
+bytearray, memoryview) are lifted out of it into frames of their own, so
+they cross the channel raw instead of escaped or base64-encoded. Binary
+values above a size threshold skip the channel entirely: the host places
+inputs in the sandbox's blob directory and the runner maps the file into
+memory, and a runner with an output directory writes large results there
+for the host to read. No frame may exceed MAX_FRAME_BYTES.
+
+Plugin output is captured per call and returned in the response, so a
+``print`` inside a plugin can never corrupt the channel.
+
+This file is copied next to the runners as-is, so it must only depend on
+the standard library.
+"""
+import base64
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import uuid
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024  # Larger binary values must go through a blob file
+BLOB_DIR = "blobs"
+
+# Tags for values lifted out of the JSON header. A plain dict that happens
+# to look like a tag is wrapped in DICT_TAG so it decodes unchanged.
+BLOB_TAG = "$blob"
+FILE_TAG = "$file"
+DICT_TAG = "$dict"
+TAGS = (BLOB_TAG, FILE_TAG, DICT_TAG)
+
+
+class ProtocolError(Exception):
+    """Raised when the other end sends something that is not a valid message."""
+
+
+class BlobFile:
+    """A binary input stored in a file, handed to the plugin without reading it into memory."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def encode_message(message, spill=None, spill_threshold=None):
+    """
+    Encode a message into a list of frames ready to be written in order.
+
+    Args:
+        message: A JSON-like value that may contain binary values and BlobFiles
+        spill: Callable storing a binary value or BlobFile in the blob
+            directory and returning its name; without it BlobFiles are rejected
+        spill_threshold: Binary values at least this large are spilled
+
+    Raises:
+        TypeError: If the message holds a value JSON cannot represent
+        ValueError: If a frame would exceed MAX_FRAME_BYTES
+    """
+    attachments = []
+
+    def lift(value):
+        if isinstance(value, BlobFile):
+            if spill is None:
+                raise TypeError("File inputs cannot be sent over this channel")
+            return {FILE_TAG: spill(value)}
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            size = value.nbytes if isinstance(value, memoryview) else len(value)
+            if spill is not None and spill_threshold is not None and size >= spill_threshold:
+                return {FILE_TAG: spill(value)}
+            attachments.append(value)
+            return {BLOB_TAG: len(attachments) - 1}
+        if isinstance(value, dict):
+            lifted = {key: lift(item) for key, item in value.items()}
+            if len(lifted) == 1 and next(iter(lifted)) in TAGS:
+                return {DICT_TAG: lifted}
+            return lifted
+        if isinstance(value, (list, tuple)):
+            return [lift(item) for item in value]
+        return value
+
+    header = json.dumps({"body": lift(message), "attachments": len(attachments)}).encode()
+    if len(header) > MAX_FRAME_BYTES:
+        raise ValueError(f"Message header of {len(header)} bytes is too large")
+    frames = [FRAME_HEADER.pack(len(header)), header]
+    for attachment in attachments:
+        size = attachment.nbytes if isinstance(attachment, memoryview) else len(attachment)
+        if size > MAX_FRAME_BYTES:
+            raise ValueError(f"Binary value of {size} bytes is too large to send inline")
+        frames.append(FRAME_HEADER.pack(size))
+        frames.append(attachment)
+    return frames
+
+
+def read_message(read_exactly, open_file=None):
+    """
+    Read one message.
+
+    Args:
+        read_exactly: Callable returning exactly ``n`` bytes from the channel
+        open_file: Callable turning a spilled blob's name into the value
+            handed to the plugin; without it spilled blobs are rejected
+    """
+    header = json.loads(read_frame(read_exactly))
+    attachments = [read_frame(read_exactly) for _ in range(header["attachments"])]
+
+    def restore(value):
+        if isinstance(value, dict):
+            if len(value) == 1:
+                tag, item = next(iter(value.items()))
+                if tag == BLOB_TAG:
+                    return attachments[item]
+                if tag == FILE_TAG:
+                    if open_file is None:
+                        raise ProtocolError("Unexpected file reference")
+                    return open_file(item)
+                if tag == DICT_TAG:
+                    return {key: restore(inner) for key, inner in item.items()}
+            return {key: restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [restore(item) for item in value]
+        return value
+
+    return restore(header["body"])
+
+
+def read_frame(read_exactly):
+    (size,) = FRAME_HEADER.unpack(read_exactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {size} bytes is too large")
+    return read_exactly(size)
+
+
+def stream_reader(stream):
+    """An exact reader over a binary stream; raises EOFError when it closes mid-message."""
+
+    def read_exactly(size):
+        data = stream.read(size)
+        if data is None or len(data) < size:
+            raise EOFError("Channel closed")
+        return data
+
+    return read_exactly
+
+
+def jsonable(value):
+    """Replace binary values with base64 text so a result can be sent as JSON."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    return value
+
+
+def load_files(value):
+    """Read BlobFile inputs into memory, for plugins running in-process."""
+    if isinstance(value, BlobFile):
+        return value.read()
+    if isinstance(value, dict):
+        return {key: load_files(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [load_files(item) for item in value]
+    return value
+
+
+class BlobSpill:
+    """Host side of a sandbox's blob directory: stages large inputs for one call."""
+
+    def __init__(self, workdir):
+        self.directory = os.path.join(workdir, BLOB_DIR)
+        self.names = []
+
+    def write(self, value):
+        os.makedirs(self.directory, exist_ok=True)
+        name = uuid.uuid4().hex
+        path = os.path.join(self.directory, name)
+        if isinstance(value, BlobFile):
+            try:
+                os.link(value.path, path)
+            except OSError:
+                shutil.copyfile(value.path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(value)
+        self.names.append(name)
+        return name
+
+    def clear(self):
+        for name in self.names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        self.names = []
+
+
+class MappedBlobs:
+    """Runner side of the blob directory: maps spilled inputs read-only."""
+
+    def __init__(self, workdir):
+        self.directory = os.path.join(workdir, BLOB_DIR)
+        self.maps = []
+
+    def open(self, name):
+        if os.path.basename(name) != name:
+            raise ProtocolError(f"Invalid blob name: {name}")
+        with open(os.path.join(self.directory, name), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        self.maps.append((mapped, view))
+        return view
+
+    def close(self):
+        for mapped, view in self.maps:
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                pass  # The plugin kept a slice; the mapping goes when it is collected
+        self.maps = []
+
+
+class OutputCapture(io.TextIOBase):
+    """A text stream that keeps the first ``limit`` characters written to it."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        room = self.limit - self.size
+        if len(text) > room:
+            self.truncated = True
+        if room > 0:
+            kept = text[:room]
+            self.parts.append(kept)
+            self.size += len(kept)
+        return len(text)
+
+    def getvalue(self):
+        value = "".join(self.parts)
+        return value + "\n[output truncated]" if self.truncated else value
@@ -1,16 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Request, Response
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..auth.utils import get_current_active_user, is_admin
 from ..auth.models import User
-from .models import Plugin
-from .executor import plugin_executor
+from .models import Plugin, PluginEnvironment
+from .environments import EnvironmentNotReady, environment_for, environment_store, parse_requirements, request_environment
+from .artifacts import ArtifactMismatch, PluginTooLarge, compile_artifact, remove_artifact, store_upload, verify_artifact
+from .introspection import load_signature, read_signature, validate_plugin_call
+from .executor import EXECUTION_BACKENDS, backend_for, plugin_executor
+from .pool import PluginBudgetExceeded
+from .protocol import BlobFile
+from .calls import SharedInput, call_plugin
+from .scheduler import SchedulerRejected, weight_for
+from ..catalog import catalog, etag_matches
+from ..config import settings
 from ..tools.models import Tool
+from ..tools.registry import entry_method
+from ..tools.service import tool_service
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
+import hashlib
+import json
 import os
+import py_compile
+import tempfile
 import uuid
-import shutil
 
 router = APIRouter()
 
@@ -22,6 +36,48 @@ class PluginResponse(BaseModel):
     is_approved: bool
     is_active: bool
     repository_url: Optional[str] = None
+    sha256: Optional[str] = None
+    max_wall_seconds: Optional[int] = None
+    max_cpu_seconds: Optional[int] = None
+    execution_backend: Optional[str] = None
+    requirements: List[str] = []
+    environment_id: Optional[str] = None
+    
+    @validator("requirements", pre=True)
+    def decode_requirements(cls, value):
+        return json.loads(value) if isinstance(value, str) else value or []
+    
+    class Config:
+        orm_mode = True
+
+class PluginParam(BaseModel):
+    name: str
+    required: bool
+    annotation: Optional[str] = None
+    positional_only: bool = False
+
+class PluginMethod(BaseModel):
+    params: List[PluginParam]
+    var_keyword: bool = False  # Accepts parameters beyond the listed ones
+    doc: Optional[str] = None
+
+class PluginMethodsResponse(BaseModel):
+    plugin_id: str
+    complete: bool  # False if methods may be inherited from base classes not shown here
+    methods: Dict[str, PluginMethod]
+
+class PluginEnvironmentResponse(BaseModel):
+    id: str
+    runtime: str
+    requirements: List[str]
+    status: str
+    error: Optional[str] = None
+    size_bytes: int = 0
+    build_time_ms: Optional[int] = None
+    
+    @validator("requirements", pre=True)
+    def decode_requirements(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
     
     class Config:
         orm_mode = True
@@ -34,17 +90,55 @@ class PluginExecuteRequest(BaseModel):
 class PluginExecuteResponse(BaseModel):
     result: Any
     status: str
+    cache_hit: bool = False
+    coalesced: bool = False  # Shared an identical call that was already running
+    queue_time_ms: int = 0  # Time spent waiting for an execution slot
+    execution_time_ms: int = 0
+
+class PluginBackendRequest(BaseModel):
+    backend: Optional[str] = None  # None restores the default
+
+class PluginBudgetRequest(BaseModel):
+    max_wall_seconds: Optional[int] = None  # None restores the default
+    max_cpu_seconds: Optional[int] = None
+
+def log_plugin_usage(plugin, request: PluginExecuteRequest, outcome: Dict[str, Any], user: User) -> None:
+    """Queue a usage log row for a plugin call, if the plugin is registered as a tool."""
+    tool = next((tool for tool in catalog.get().tools if tool.plugin_id == plugin.id), None)
+    if tool is None:
+        return
+    tool_service.log_usage(
+        tool.name,
+        {"method": request.method_name, "params": request.params},
+        {**outcome, "execution_time_ms": outcome.get("execution_time_ms", 0)},
+        user
+    )
+
+def get_plugin_for_execution(plugin_id: str, db: Session) -> Optional[Plugin]:
+    """
+    Load a plugin to run from the database rather than the catalog snapshot,
+    so revoking approval or deactivating it takes effect on every worker
+    process at once.
+    """
+    return db.query(Plugin).filter(Plugin.id == plugin_id).first()
 
 @router.get("/", response_model=List[PluginResponse])
 async def get_plugins(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a list of all plugins."""
-    plugins = db.query(Plugin).offset(skip).limit(limit).all()
-    return plugins
+    snapshot = catalog.get(db)
+    etag = snapshot.etag("plugins", skip, limit)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return snapshot.plugins[skip:skip + limit]
 
 @router.get("/{plugin_id}", response_model=PluginResponse)
 async def get_plugin(
@@ -53,22 +147,45 @@ async def get_plugin(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get details for a specific plugin."""
-    plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
+    plugin = catalog.get(db).plugins_by_id.get(plugin_id)
     if plugin is None:
         raise HTTPException(status_code=404, detail="Plugin not found")
     return plugin
 
+@router.get("/{plugin_id}/methods", response_model=PluginMethodsResponse)
+async def get_plugin_methods(
+    plugin_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List a plugin's public methods and their parameters, read from its source without running it."""
+    plugin = catalog.get(db).plugins_by_id.get(plugin_id)
+    if plugin is None:
+        raise HTTPException(status_code=404, detail="Plugin not found")
+    if not plugin.signature:
+        raise HTTPException(status_code=404, detail="Plugin has no method index")
+    
+    signature = load_signature(plugin.signature)
+    return {"plugin_id": plugin.id, "complete": signature["complete"], "methods": signature["methods"]}
+
 @router.post("/upload", response_model=PluginResponse, status_code=status.HTTP_201_CREATED)
 async def upload_plugin(
     name: str = Form(...),
     description: str = Form(...),
     version: str = Form(...),
     repository_url: Optional[str] = Form(None),
+    requirements: Optional[str] = Form(None),
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Upload a new plugin."""
+    """
+    Upload a new plugin.
+    
+    ``requirements`` is the plugin's dependency manifest in requirements.txt
+    form (one specifier per line). Its environment is built when the plugin
+    is approved.
+    """
     # Check if plugin with this name already exists
     existing_plugin = db.query(Plugin).filter(Plugin.name == name).first()
     if existing_plugin:
@@ -78,31 +195,139 @@ async def upload_plugin(
     if not file.filename.endswith('.py'):
         raise HTTPException(status_code=400, detail="Only Python files are allowed")
     
-    # Generate a unique filename
-    plugin_id = str(uuid.uuid4())
-    filename = f"{plugin_id}_{file.filename}"
-    file_path = os.path.join(plugin_executor.plugin_dir, filename)
+    try:
+        requirements = parse_requirements(requirements)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Stream the file into content-addressed storage; identical uploads share a file
+    try:
+        file_path, sha256, size = await store_upload(
+            file, plugin_executor.plugin_dir, settings.MAX_PLUGIN_SIZE_MB * 1024 * 1024
+        )
+    except PluginTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Index the methods now so clients can discover them; approval re-checks the source
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            signature = json.dumps(read_signature(f.read()))
+    except (SyntaxError, UnicodeDecodeError, ValueError):
+        signature = None
     
     # Create plugin in database
     db_plugin = Plugin(
-        id=plugin_id,
+        id=str(uuid.uuid4()),
         name=name,
         description=description,
         version=version,
         author_id=current_user.id,
         repository_url=repository_url,
-        file_path=file_path
+        file_path=file_path,
+        sha256=sha256,
+        size_bytes=size,
+        signature=signature,
+        requirements=json.dumps(requirements) if requirements else None
     )
     db.add(db_plugin)
     db.commit()
     db.refresh(db_plugin)
+    catalog.invalidate()
     
     return db_plugin
 
+def prewarm_plugin(plugin) -> None:
+    """Start warm sandboxes for a plugin, unless its environment is still being built."""
+    try:
+        environment = environment_for(plugin)
+    except EnvironmentNotReady:
+        return
+    plugin_executor.prewarm(plugin.file_path, backend_for(plugin), environment)
+
+def release_backend(db: Session, plugin_path: str, backend: str) -> None:
+    """
+    Release a backend's resources for a plugin file once no active plugin uses them.
+    
+    Plugins with identical code share one stored file, and with it the warm
+    sandboxes and loaded module of each backend they run on.
+    """
+    others = db.query(Plugin).filter(Plugin.file_path == plugin_path, Plugin.is_active == True).all()
+    if any(backend_for(other) == backend for other in others):
+        return
+    plugin_executor.unload(plugin_path, backend)
+
+async def run_plugin_call(
+    plugin,
+    request: PluginExecuteRequest,
+    current_user: User,
+    call_params: Optional[Dict[str, Any]] = None,
+    shared_input: Optional[SharedInput] = None
+) -> Dict[str, Any]:
+    """
+    Run a plugin call through the result cache, coalescing and the fair scheduler.
+    
+    ``request.params`` identify the call for caching, coalescing and the
+    usage log; ``call_params`` are what the plugin receives when they differ,
+    e.g. when an uploaded file, ``shared_input``, stands in for one of the
+    parameters.
+    """
+    # Check if plugin is approved and active
+    if not plugin.is_approved:
+        raise HTTPException(status_code=400, detail="Plugin is not approved for use")
+    
+    if not plugin.is_active:
+        raise HTTPException(status_code=400, detail="Plugin is not active")
+    
+    # Reject calls that cannot match the plugin's methods before any executor work
+    try:
+        validate_plugin_call(plugin, request.method_name, request.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        outcome = await call_plugin(
+            plugin,
+            request.method_name,
+            request.params,
+            current_user.id,
+            weight_for(current_user),
+            call_params=call_params,
+            shared_input=shared_input
+        )
+        outcome["status"] = "success"
+        if not outcome.get("cache_hit"):
+            log_plugin_usage(plugin, request, outcome, current_user)
+        return outcome
+    except EnvironmentNotReady as e:
+        # Environments are built on approval; a call never waits for a build
+        if e.status == "failed":
+            raise HTTPException(status_code=500, detail=str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except SchedulerRejected as e:
+        raise HTTPException(
+            status_code=429 if e.queue_full else 503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except PluginBudgetExceeded as e:
+        log_plugin_usage(plugin, request, {"result": {"error": str(e)}, "status": "error"}, current_user)
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        log_plugin_usage(plugin, request, {"result": {"error": str(e)}, "status": "error"}, current_user)
+        raise HTTPException(status_code=500, detail=f"Error executing plugin: {str(e)}")
+
+async def run_plugin_tool(spec, params: Dict[str, Any], db: Session, user: User) -> Dict[str, Any]:
+    """Tool service runner for plugin tools: call the plugin's entry method like ``/execute`` does."""
+    plugin = get_plugin_for_execution(spec.plugin_id, db)
+    if plugin is None:
+        raise ValueError(f"Tool '{spec.name}' not found")
+    
+    request = PluginExecuteRequest(plugin_id=plugin.id, method_name=spec.method_name, params=params)
+    outcome = await run_plugin_call(plugin, request, user)
+    return {"execution_time_ms": 0, **outcome}
+
+tool_service.register_runner("plugin", run_plugin_tool)
+
 @router.post("/execute", response_model=PluginExecuteResponse)
 async def execute_plugin(
     request: PluginExecuteRequest,
@@ -110,28 +335,76 @@ async def execute_plugin(
     current_user: User = Depends(get_current_active_user)
 ):
     """Execute a plugin with the provided parameters."""
-    plugin = db.query(Plugin).filter(Plugin.id == request.plugin_id).first()
+    plugin = get_plugin_for_execution(request.plugin_id, db)
     if plugin is None:
         raise HTTPException(status_code=404, detail="Plugin not found")
     
-    # Check if plugin is approved and active
-    if not plugin.is_approved:
-        raise HTTPException(status_code=400, detail="Plugin is not approved for use")
+    return await run_plugin_call(plugin, request, current_user)
+
+@router.post("/execute/file", response_model=PluginExecuteResponse)
+async def execute_plugin_with_file(
+    plugin_id: str = Form(...),
+    method_name: str = Form(...),
+    params: str = Form("{}"),
+    file_param: str = Form("data"),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Execute a plugin with an uploaded file as one of its parameters.
     
-    if not plugin.is_active:
-        raise HTTPException(status_code=400, detail="Plugin is not active")
+    ``params`` is a JSON object of the other parameters. The file's bytes are
+    passed as ``file_param`` without being encoded into the request; large
+    files reach sandboxed plugins as a memory-mapped buffer.
+    """
+    plugin = get_plugin_for_execution(plugin_id, db)
+    if plugin is None:
+        raise HTTPException(status_code=404, detail="Plugin not found")
     
     try:
-        # Execute the plugin
-        result = plugin_executor.execute(
-            plugin_path=plugin.file_path,
-            method_name=request.method_name,
-            params=request.params,
-            secure=True  # Always use secure execution for user-uploaded plugins
+        call_params = json.loads(params)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="params must be a JSON object")
+    if not isinstance(call_params, dict):
+        raise HTTPException(status_code=400, detail="params must be a JSON object")
+    
+    # Copy the upload to disk in chunks, hashing it so identical calls can share results
+    max_bytes = settings.MAX_PLUGIN_INPUT_MB * 1024 * 1024
+    fd, input_path = tempfile.mkstemp(prefix="repoai-input-")
+    shared_input = SharedInput(input_path)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                data = await file.read(1024 * 1024)
+                if not data:
+                    break
+                size += len(data)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {settings.MAX_PLUGIN_INPUT_MB} MB)"
+                    )
+                digest.update(data)
+                buffer.write(data)
+        
+        request = PluginExecuteRequest(
+            plugin_id=plugin_id,
+            method_name=method_name,
+            params={**call_params, file_param: {"file": file.filename, "size": size, "sha256": digest.hexdigest()}}
         )
-        return {"result": result, "status": "success"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error executing plugin: {str(e)}")
+        return await run_plugin_call(
+            plugin,
+            request,
+            current_user,
+            call_params={**call_params, file_param: BlobFile(input_path)},
+            shared_input=shared_input
+        )
+    finally:
+        # An execution this request started keeps the file until it finishes
+        shared_input.release()
 
 @router.put("/{plugin_id}/approve", response_model=PluginResponse)
 async def approve_plugin(
@@ -139,23 +412,63 @@ async def approve_plugin(
     db: Session = Depends(get_db),
     current_user: User = Depends(is_admin)  # Only admins can approve plugins
 ):
-    """Approve a plugin for use (admin only)."""
+    """
+    Approve a plugin for use (admin only).
+    
+    The plugin is compiled to bytecode, its ``Plugin`` class is indexed and
+    the build of its dependency environment is queued.
+    """
     plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
     if plugin is None:
         raise HTTPException(status_code=404, detail="Plugin not found")
     
+    try:
+        verify_artifact(plugin.file_path)
+        compile_artifact(plugin.file_path)
+        with open(plugin.file_path, encoding="utf-8") as f:
+            plugin.signature = json.dumps(read_signature(f.read()))
+    except (ArtifactMismatch, py_compile.PyCompileError, SyntaxError, UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Plugin cannot be approved: {str(e)}")
+    
     plugin.is_approved = True
+    request_environment(db, plugin)
     db.commit()
     db.refresh(plugin)
+    catalog.invalidate()
+    environment_store.wake()
     return plugin
 
+@router.get("/{plugin_id}/environment", response_model=PluginEnvironmentResponse)
+async def get_plugin_environment(
+    plugin_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the build status of a plugin's dependency environment."""
+    plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
+    if plugin is None:
+        raise HTTPException(status_code=404, detail="Plugin not found")
+    
+    environment = None
+    if plugin.environment_id:
+        environment = db.query(PluginEnvironment).filter(PluginEnvironment.id == plugin.environment_id).first()
+    if environment is None:
+        raise HTTPException(status_code=404, detail="Plugin has no dependency environment")
+    return environment
+
 @router.put("/{plugin_id}/activate", response_model=PluginResponse)
 async def activate_plugin(
     plugin_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(is_admin)  # Only admins can activate plugins
 ):
-    """Activate a plugin (admin only)."""
+    """
+    Activate a plugin (admin only).
+    
+    A plugin with a ``run`` method, or a single method, is also registered
+    as a tool under its name, so it can be called through the tool
+    endpoints without a restart.
+    """
     plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
     if plugin is None:
         raise HTTPException(status_code=404, detail="Plugin not found")
@@ -163,9 +476,86 @@ async def activate_plugin(
     if not plugin.is_approved:
         raise HTTPException(status_code=400, detail="Plugin must be approved before it can be activated")
     
+    has_entry_method = bool(plugin.signature) and entry_method(load_signature(plugin.signature)) is not None
+    if has_entry_method and db.query(Tool).filter(Tool.plugin_id == plugin.id).first() is None:
+        existing = tool_service.registry.get(plugin.name)
+        if db.query(Tool).filter(Tool.name == plugin.name).first() or (existing and existing.plugin_id != plugin.id):
+            raise HTTPException(status_code=400, detail=f"A tool named '{plugin.name}' already exists")
+        db.add(Tool(
+            id=str(uuid.uuid4()),
+            name=plugin.name,
+            description=plugin.description,
+            category="Plugin",
+            is_core=False,
+            plugin_id=plugin.id
+        ))
+    
     plugin.is_active = True
     db.commit()
     db.refresh(plugin)
+    catalog.invalidate()
+    tool_service.sync_plugin_tools(db)
+    
+    # Start warm sandboxes so the first execution does not pay container startup
+    prewarm_plugin(plugin)
+    return plugin
+
+@router.put("/{plugin_id}/backend", response_model=PluginResponse)
+async def set_plugin_backend(
+    plugin_id: str,
+    request: PluginBackendRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_admin)  # Only admins can choose how plugins run
+):
+    """Choose a plugin's execution backend: local, forkserver or docker (admin only)."""
+    plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
+    if plugin is None:
+        raise HTTPException(status_code=404, detail="Plugin not found")
+    
+    if request.backend is not None and request.backend not in EXECUTION_BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Backend must be one of: {', '.join(EXECUTION_BACKENDS)}"
+        )
+    
+    previous_backend = backend_for(plugin)
+    plugin.execution_backend = request.backend
+    if plugin.is_approved:
+        request_environment(db, plugin)  # Each backend has its own kind of environment
+    db.commit()
+    db.refresh(plugin)
+    
+    # Release resources held by the previous backend, unless another plugin still runs on them
+    if backend_for(plugin) != previous_backend:
+        release_backend(db, plugin.file_path, previous_backend)
+    catalog.invalidate()
+    environment_store.wake()
+    
+    if plugin.is_active:
+        prewarm_plugin(plugin)
+    return plugin
+
+@router.put("/{plugin_id}/budget", response_model=PluginResponse)
+async def set_plugin_budget(
+    plugin_id: str,
+    request: PluginBudgetRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_admin)  # Only admins can change budgets
+):
+    """Set a plugin's per-call wall-clock and CPU budgets (admin only)."""
+    plugin = db.query(Plugin).filter(Plugin.id == plugin_id).first()
+    if plugin is None:
+        raise HTTPException(status_code=404, detail="Plugin not found")
+    
+    for value in (request.max_wall_seconds, request.max_cpu_seconds):
+        if value is not None and value <= 0:
+            raise HTTPException(status_code=400, detail="Budgets must be positive")
+    
+    plugin.max_wall_seconds = request.max_wall_seconds
+    plugin.max_cpu_seconds = request.max_cpu_seconds
+    db.commit()
+    db.refresh(plugin)
+    catalog.invalidate()
     return plugin
 
 @router.delete("/{plugin_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -186,12 +576,18 @@ async def delete_plugin(
     # Delete associated tools
     db.query(Tool).filter(Tool.plugin_id == plugin_id).delete()
     
-    # Delete the plugin file
-    if os.path.exists(plugin.file_path):
-        os.remove(plugin.file_path)
-    
-    # Delete the plugin from the database
+    # Delete the plugin from the database, and its file unless another plugin has identical code
+    file_path = plugin.file_path
+    backend = backend_for(plugin)
     db.delete(plugin)
     db.commit()
+    if db.query(Plugin).filter(Plugin.file_path == file_path).first() is None:
+        plugin_executor.unload(file_path)
+        remove_artifact(file_path)
+    else:
+        # Shut down its sandboxes unless another plugin still runs on them
+        release_backend(db, file_path, backend)
+    catalog.invalidate()
+    tool_service.sync_plugin_tools(db)  # Unload its tool from the registry
     
     return None 
\ No newline at end of file
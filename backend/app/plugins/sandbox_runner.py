@@ -0,0 +1,144 @@
+"""
+Long-lived plugin runner used inside pooled sandbox containers.
+
+The runner loads the plugin once, then reads framed request messages from
+stdin and writes one framed response per request to stdout (see
+protocol.py). Whatever the plugin prints is captured and returned in the
+response; fd 1 itself is pointed at stderr, so not even a raw write can
+reach the channel. Binary results of at least the request's
+``spill_bytes`` are written to the output directory given as the second
+argument instead of the channel. This file is copied into the container next to protocol.py, so
+it must only depend on the standard library.
+"""
+import importlib.util
+import math
+import os
+import resource
+import signal
+import sys
+
+from protocol import BlobSpill, MappedBlobs, OutputCapture, encode_message, read_message, stream_reader
+
+
+class CpuBudgetExceeded(Exception):
+    pass
+
+
+def on_cpu_budget(signum, frame):
+    raise CpuBudgetExceeded()
+
+
+def call_with_cpu_budget(fn, params, cpu_seconds):
+    """
+    Call ``fn(**params)`` with at most ``cpu_seconds`` of CPU time.
+
+    A profiling timer interrupts the call with CpuBudgetExceeded. In case the
+    plugin swallows that exception, RLIMIT_CPU is set just past the budget as
+    a backstop: the kernel then kills the runner and its container.
+    """
+    if not cpu_seconds:
+        return fn(**params)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (math.ceil(used + cpu_seconds) + 2, hard))
+    signal.setitimer(signal.ITIMER_PROF, cpu_seconds)
+    try:
+        return fn(**params)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def load_plugin(plugin_path):
+    spec = importlib.util.spec_from_file_location("plugin_module", plugin_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Could not load plugin from {plugin_path}")
+
+    plugin_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plugin_module)
+    return plugin_module.Plugin()
+
+
+def call_captured(plugin, request):
+    """Run one request, capturing what the plugin prints; returns the response."""
+    stdout = OutputCapture(request.get("capture_chars", 0))
+    stderr = OutputCapture(request.get("capture_chars", 0))
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        method = getattr(plugin, request["method"])
+        result = call_with_cpu_budget(method, request["params"], request.get("cpu_seconds"))
+        response = {"status": "success", "result": result}
+    except CpuBudgetExceeded:
+        response = {
+            "status": "error",
+            "error": f"Plugin exceeded its CPU budget of {request.get('cpu_seconds')}s",
+            "budget_exceeded": True
+        }
+    except Exception as e:
+        response = {"status": "error", "error": str(e)}
+    finally:
+        sys.stdout, sys.stderr = sys.__stderr__, sys.__stderr__
+
+    response["stdout"] = stdout.getvalue()
+    response["stderr"] = stderr.getvalue()
+    return response
+
+
+def send_response(channel, response, outputs, spill_bytes):
+    spill = outputs.write if outputs is not None else None
+    try:
+        frames = encode_message(response, spill=spill, spill_threshold=spill_bytes)
+    except (TypeError, ValueError, OSError) as e:
+        if outputs is not None:
+            outputs.clear()  # An output directory that filled up holds partial results
+        frames = encode_message({"status": "error", "error": f"Could not encode result: {e}"})
+    else:
+        if outputs is not None:
+            outputs.names = []  # The host removes spilled results once it has read them
+    for frame in frames:
+        channel.write(frame)
+    channel.flush()
+
+
+def main():
+    plugin_path = sys.argv[1]
+    blobs = MappedBlobs(os.path.dirname(os.path.abspath(__file__)))
+    outputs = BlobSpill(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    # Keep a private duplicate of stdout for responses and point fd 1 at
+    # stderr, so nothing the plugin writes, even with os.write(1, ...),
+    # can corrupt the channel
+    sys.stdout.flush()
+    channel = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    read_exactly = stream_reader(sys.stdin.buffer)
+    sys.stdout = sys.stderr
+
+    signal.signal(signal.SIGPROF, on_cpu_budget)
+
+    plugin = None
+    load_error = None
+    try:
+        plugin = load_plugin(plugin_path)
+    except Exception as e:
+        load_error = f"Could not initialize plugin: {str(e)}"
+
+    while True:
+        try:
+            request = read_message(read_exactly, blobs.open)
+        except EOFError:
+            break
+
+        if load_error:
+            response = {"status": "error", "error": load_error}
+        else:
+            response = call_captured(plugin, request)
+
+        send_response(channel, response, outputs, request.get("spill_bytes"))
+        blobs.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from ..config import settings
+from ..execution import io_executor
+
+
+class SchedulerRejected(Exception):
+    """Raised when a call cannot be queued, or waited too long for a slot."""
+
+    def __init__(self, message: str, retry_after: int = 1, queue_full: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.queue_full = queue_full
+
+
+class _UserQueue:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        self.active = 0
+        self.usage = 0.0  # Execution seconds received, divided by weight
+
+    def idle(self) -> bool:
+        return not self.pending and self.active == 0
+
+
+def budgets_for(plugin: Any) -> Dict[str, float]:
+    """Wall-clock and CPU budgets for one call of a plugin, falling back to the defaults."""
+    return {
+        "wall_seconds": getattr(plugin, "max_wall_seconds", None) or settings.PLUGIN_DEFAULT_WALL_SECONDS,
+        "cpu_seconds": getattr(plugin, "max_cpu_seconds", None) or settings.PLUGIN_DEFAULT_CPU_SECONDS,
+    }
+
+
+def weight_for(user: Any) -> float:
+    return settings.PLUGIN_ADMIN_WEIGHT if getattr(user, "is_admin", False) else settings.PLUGIN_USER_WEIGHT
+
+
+class PluginScheduler:
+    """
+    Admission control and weighted fair queuing for plugin calls.
+
+    At most ``max_concurrent`` calls run at once, and at most
+    ``max_per_user`` for any single user. When a slot frees up it goes to the
+    waiting user who has received the least execution time relative to
+    their weight, so one user's backlog cannot starve everyone else. A user
+    who was idle rejoins at the current minimum instead of cashing in
+    credit saved while away.
+
+    All bookkeeping happens on the event loop, so no locks are needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_per_user: int,
+        max_queued_per_user: int,
+        queue_timeout: float
+    ):
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_per_user = max(max_per_user, 1)
+        self.max_queued_per_user = max_queued_per_user
+        self.queue_timeout = queue_timeout
+
+        self._users: Dict[str, _UserQueue] = {}
+        self._active = 0
+        self._clock = 0.0  # Usage of the user most recently given a slot
+        self._sequence = itertools.count()
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    async def run(
+        self,
+        user_id: str,
+        weight: float,
+        fn: Callable[..., Any],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, int, int]:
+        """
+        Wait for a slot, then run ``fn(*args, **kwargs)`` in the I/O pool.
+
+        Returns:
+            ``(result, queue_time_ms, execution_time_ms)``
+
+        Raises:
+            SchedulerRejected: If the user's queue is full or no slot
+                became free within ``queue_timeout`` seconds
+        """
+        return await self.run_async(user_id, weight, io_executor.run, fn, *args, **kwargs)
+
+    async def run_async(
+        self,
+        user_id: str,
+        weight: float,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Tuple[Any, int, int]:
+        """
+        Wait for a slot, then await ``fn(*args, **kwargs)`` while holding it.
+
+        Lets each caller be admitted on its own account before sharing an
+        execution with others, e.g. through a :class:`SingleFlight`.
+
+        Returns:
+            ``(result, queue_time_ms, execution_time_ms)``
+
+        Raises:
+            SchedulerRejected: As for :meth:`run`
+        """
+        queued_at = time.monotonic()
+        await self._acquire(user_id, weight)
+        started_at = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        finally:
+            self._release(user_id, time.monotonic() - started_at)
+
+        queue_time = int((started_at - queued_at) * 1000)
+        execution_time = int((time.monotonic() - started_at) * 1000)
+        return result, queue_time, execution_time
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "queued": sum(len(user.pending) for user in self._users.values()),
+            "users": len(self._users),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
+    async def _acquire(self, user_id: str, weight: float) -> None:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserQueue(weight)
+        user.weight = weight
+        if user.idle():
+            user.usage = max(user.usage, self._clock)
+
+        if len(user.pending) >= self.max_queued_per_user:
+            self._rejected += 1
+            self._forget_if_idle(user_id)
+            raise SchedulerRejected("Too many queued plugin calls", queue_full=True)
+
+        if self._active < self.max_concurrent and user.active < self.max_per_user and not user.pending:
+            self._grant(user)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        user.pending.append((next(self._sequence), waiter))
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we gave up; hand it back
+                self._release(user_id, 0.0)
+            else:
+                waiter.cancel()
+                self._discard(user, waiter)
+                self._forget_if_idle(user_id)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._timed_out += 1
+            raise SchedulerRejected("Timed out waiting for a plugin execution slot")
+
+    def _grant(self, user: _UserQueue) -> None:
+        user.active += 1
+        self._active += 1
+        self._clock = max(self._clock, user.usage)
+
+    def _release(self, user_id: str, seconds: float) -> None:
+        user = self._users[user_id]
+        user.active -= 1
+        user.usage += seconds / max(user.weight, 1e-6)
+        self._active -= 1
+        self._completed += 1
+        self._dispatch()
+        self._forget_if_idle(user_id)
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrent:
+            eligible = [
+                user for user in self._users.values()
+                if user.pending and user.active < self.max_per_user
+            ]
+            if not eligible:
+                return
+            # Least service per unit of weight first; FIFO between equals
+            user = min(eligible, key=lambda candidate: (candidate.usage, candidate.pending[0][0]))
+            _, waiter = user.pending.popleft()
+            if waiter.done():
+                continue
+            self._grant(user)
+            waiter.set_result(None)
+
+    def _discard(self, user: _UserQueue, waiter: asyncio.Future) -> None:
+        for entry in user.pending:
+            if entry[1] is waiter:
+                user.pending.remove(entry)
+                return
+
+    def _forget_if_idle(self, user_id: str) -> None:
+        # Idle users below the clock carry no state worth keeping
+        user = self._users.get(user_id)
+        if user is not None and user.idle() and user.usage <= self._clock:
+            del self._users[user_id]
+
+
+# Create singleton instance
+plugin_scheduler = PluginScheduler(
+    max_concurrent=settings.PLUGIN_MAX_CONCURRENT,
+    max_per_user=settings.PLUGIN_MAX_CONCURRENT_PER_USER,
+    max_queued_per_user=settings.PLUGIN_MAX_QUEUED_PER_USER,
+    queue_timeout=settings.PLUGIN_QUEUE_TIMEOUT_SECONDS
+)
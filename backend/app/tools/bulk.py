@@ -0,0 +1,444 @@
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..leases import Leases
+from .models import BulkJob
+from .service import tool_service
+from .usage_log import usage_log_writer
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ("ndjson", "csv")
+
+# (input offset after the record, record id, text, parse error)
+Record = Tuple[int, Any, Optional[str], Optional[str]]
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Guess the input format from an uploaded file's extension."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if extension == ".csv":
+        return "csv"
+    return None
+
+
+class _TrackedLines:
+    """
+    Iterates decoded lines of a binary file while tracking the byte offset consumed.
+
+    A UTF-8 byte order mark at the start of the file is dropped, so it does
+    not end up in the first CSV column name or in front of the first JSON
+    record.
+    """
+
+    def __init__(self, handle: io.BufferedReader, offset: int):
+        self.handle = handle
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self.handle:
+            encoding = "utf-8-sig" if self.offset == 0 else "utf-8"
+            self.offset += len(raw)
+            yield raw.decode(encoding, errors="replace")
+
+
+def read_csv_header(path: str) -> Tuple[List[str], int]:
+    """Return the header row of a CSV file and the byte offset where records start."""
+    with open(path, "rb") as handle:
+        lines = _TrackedLines(handle, 0)
+        header = next(csv.reader(lines), [])
+        return [column.strip() for column in header], lines.offset
+
+
+def read_records(path: str, input_format: str, text_field: str, offset: int = 0) -> Iterator[Record]:
+    """
+    Stream records from an NDJSON or CSV file starting at a byte offset.
+
+    The file is read line by line, so memory use does not depend on its
+    size. Each record carries the offset just past it, which is what gets
+    committed once its result is written and where a resumed job restarts.
+    Records that cannot be parsed are yielded with an error instead of text.
+    """
+    if input_format == "csv":
+        header, data_start = read_csv_header(path)
+        if text_field not in header:
+            raise ValueError(f"CSV header has no '{text_field}' column")
+        text_index = header.index(text_field)
+        id_index = header.index("id") if "id" in header else None
+        offset = max(offset, data_start)
+
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        lines = _TrackedLines(handle, offset)
+
+        if input_format == "csv":
+            for row in csv.reader(lines):
+                if not row:
+                    continue
+                record_id = row[id_index] if id_index is not None and id_index < len(row) else None
+                if text_index >= len(row):
+                    yield lines.offset, record_id, None, f"Missing '{text_field}' column"
+                else:
+                    yield lines.offset, record_id, row[text_index], None
+            return
+
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                yield lines.offset, None, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(value, str):
+                yield lines.offset, None, value, None
+            elif isinstance(value, dict) and isinstance(value.get(text_field), str):
+                yield lines.offset, value.get("id"), value[text_field], None
+            else:
+                record_id = value.get("id") if isinstance(value, dict) else None
+                yield lines.offset, record_id, None, f"Missing '{text_field}' string field"
+
+
+class JobTakenOver(Exception):
+    """Raised when another process has claimed a job this process was running."""
+
+
+def run_bulk_batch(tool_name: str, params: Dict[str, Any], texts: List[str]) -> List[Dict[str, Any]]:
+    """Process-pool entry point: run one tool over a batch of texts."""
+    return tool_service.run_many([
+        {"tool_name": tool_name, "params": {**params, "text": text}} for text in texts
+    ])
+
+
+class BulkJobRunner:
+    """
+    Runs bulk scoring jobs from files on disk in a background thread.
+
+    Records are read from the input file in order and sent to a process
+    pool in batches, with a bounded number of batches in flight. Results are
+    appended to the output file in input order; after each batch the output
+    is flushed and the job's input and output offsets are committed
+    together. A job that stops mid-way, whether from a restart or a crash,
+    continues from the last committed offset with the output truncated to
+    match, so no record is written twice.
+
+    Jobs are claimed through the database, so several API processes can
+    share the queue; running jobs whose heartbeat goes stale are taken over.
+    Heartbeats come from a timer thread rather than batch commits, so a slow
+    batch does not let another process take over a job that is still
+    running. A job that was taken over anyway stops before writing again.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        workers: int,
+        max_running: int,
+        poll_interval: float,
+        stale_after: float
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(batch_size, 1)
+        self.workers = max(workers, 1)
+        self.max_running = max(max_running, 1)
+        self.poll_interval = poll_interval
+        self.leases = Leases(session_factory, BulkJob, stale_after)
+        self.worker_id = self.leases.worker_id
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._running: Dict[str, threading.Thread] = {}
+        self._cancelled: Set[str] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._completed = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="repoai-bulk-jobs", daemon=True)
+            self._thread.start()
+            self._heartbeat_thread = threading.Thread(
+                target=self.leases.keep_alive,
+                args=(lambda: list(self._running), self._stop),
+                name="repoai-bulk-heartbeat",
+                daemon=True
+            )
+            self._heartbeat_thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming jobs; running jobs are re-queued at their last committed offset."""
+        self._stop.set()
+        self._wake.set()
+        for thread in (self._thread, self._heartbeat_thread):
+            if thread is not None:
+                thread.join(timeout)
+        for thread in list(self._running.values()):
+            thread.join(timeout)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def wake(self) -> None:
+        """Look for new jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def cancel(self, job_id: str) -> None:
+        """Ask a job running in this process to stop after its current batch."""
+        self._cancelled.add(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "completed": self._completed,
+            "failed": self._failed,
+        }
+
+    def _poll_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for job_id in self._claim_jobs():
+                    thread = threading.Thread(
+                        target=self._run_job, args=(job_id,), name=f"repoai-bulk-{job_id[:8]}", daemon=True
+                    )
+                    self._running[job_id] = thread
+                    thread.start()
+            except Exception:
+                logger.exception("Failed to claim bulk jobs")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim_jobs(self) -> List[str]:
+        free = self.max_running - len(self._running)
+        if free <= 0:
+            return []
+
+        db = self.session_factory()
+        try:
+            return self.leases.claim(db, free, [BulkJob.created_at])
+        finally:
+            db.close()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _run_job(self, job_id: str) -> None:
+        db = self.session_factory()
+        try:
+            job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+            if job.started_at is None:
+                job.started_at = datetime.utcnow()
+                db.commit()
+            self._process(db, job)
+        except JobTakenOver:
+            logger.warning("Bulk job %s was taken over by another process", job_id)
+            db.rollback()
+        except Exception as e:
+            logger.exception("Bulk job %s failed", job_id)
+            db.rollback()
+            job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+            if job is not None:
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = datetime.utcnow()
+                db.commit()
+                self._log_usage(job)
+            self._failed += 1
+        finally:
+            db.close()
+            self._running.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            self._wake.set()  # A slot is free
+
+    def _process(self, db: Session, job: BulkJob) -> None:
+        params = json.loads(job.params or "{}")
+        pool = self._get_pool()
+        inflight: Deque[Tuple[Future, List[Record], int]] = deque()
+        record_number = job.records_processed + job.records_failed
+        last_commit = time.monotonic()
+
+        with open(job.output_path, "ab") as output:
+            # Drop output written after the last commit; those records are redone
+            output.truncate(job.output_offset)
+
+            batch: List[Record] = []
+            for record in read_records(job.input_path, job.input_format, job.text_field, job.input_offset):
+                batch.append(record)
+                if len(batch) < self.batch_size:
+                    continue
+                inflight.append(self._submit(pool, job, params, batch))
+                batch = []
+
+                while len(inflight) >= 2 * self.workers:
+                    record_number, last_commit = self._commit(db, job, inflight.popleft(), output, record_number, last_commit)
+                if self._should_stop(job):
+                    break
+            else:
+                if batch:
+                    inflight.append(self._submit(pool, job, params, batch))
+
+            while inflight and not self._should_stop(job):
+                record_number, last_commit = self._commit(db, job, inflight.popleft(), output, record_number, last_commit)
+
+        for future, _, _ in inflight:
+            future.cancel()
+
+        if self._is_cancelled(job):
+            values = {"status": "cancelled"}
+        elif self._stop.is_set():
+            self._update(db, job, {"status": "queued"})  # Picked up again from the committed offset
+            return
+        else:
+            values = {"status": "completed", "input_offset": job.input_size}
+        self._update(db, job, {**values, "finished_at": datetime.utcnow()})
+        if values["status"] == "completed":
+            self._completed += 1
+        self._log_usage(job)
+
+    def _should_stop(self, job: BulkJob) -> bool:
+        return self._stop.is_set() or self._is_cancelled(job)
+
+    def _is_cancelled(self, job: BulkJob) -> bool:
+        # The row is reloaded after each commit, so a cancel from another process shows up here too
+        return job.id in self._cancelled or job.status == "cancelled"
+
+    def _submit(
+        self,
+        pool: ProcessPoolExecutor,
+        job: BulkJob,
+        params: Dict[str, Any],
+        batch: List[Record]
+    ) -> Tuple[Future, List[Record], int]:
+        texts = [text for _, _, text, error in batch if error is None]
+        return pool.submit(run_bulk_batch, job.tool_name, params, texts), batch, batch[-1][0]
+
+    def _commit(
+        self,
+        db: Session,
+        job: BulkJob,
+        entry: Tuple[Future, List[Record], int],
+        output: io.BufferedWriter,
+        record_number: int,
+        last_commit: float
+    ) -> Tuple[int, float]:
+        future, batch, end_offset = entry
+        outcomes = iter(future.result())
+        if job.worker_id != self.worker_id:
+            # Reloaded after the last commit; the new owner truncates and redoes this batch
+            raise JobTakenOver(job.id)
+
+        lines = []
+        processed = failed = 0
+        for _, record_id, _, error in batch:
+            if error is None:
+                outcome = next(outcomes)
+                line = {"record": record_number, "id": record_id, "status": outcome["status"], "result": outcome["result"]}
+            else:
+                line = {"record": record_number, "id": record_id, "status": "error", "result": {"error": error}}
+            if line["status"] == "success":
+                processed += 1
+            else:
+                failed += 1
+            lines.append(json.dumps(line, default=str))
+            record_number += 1
+
+        output.write(("\n".join(lines) + "\n").encode())
+        output.flush()
+        os.fsync(output.fileno())
+
+        now = time.monotonic()
+        self._update(db, job, {
+            "input_offset": end_offset,
+            "output_offset": output.tell(),
+            "records_processed": BulkJob.records_processed + processed,
+            "records_failed": BulkJob.records_failed + failed,
+            "processing_ms": BulkJob.processing_ms + int((now - last_commit) * 1000),
+            "heartbeat_at": datetime.utcnow(),
+        })
+        return record_number, now
+
+    def _update(self, db: Session, job: BulkJob, values: Dict[str, Any]) -> None:
+        """
+        Write to a job's row only while this process still holds its lease.
+
+        The ownership check and the write are one conditional UPDATE, so a
+        process that lost the job between reading and writing the row can
+        never overwrite the new owner's progress.
+
+        Raises:
+            JobTakenOver: If another process has claimed the job
+        """
+        updated = db.query(BulkJob).filter(
+            BulkJob.id == job.id, BulkJob.worker_id == self.worker_id
+        ).update(values, synchronize_session=False)
+        if not updated:
+            db.rollback()
+            raise JobTakenOver(job.id)
+        db.commit()  # Expires the job, so the next read sees a cancel or takeover
+
+    def _log_usage(self, job: BulkJob) -> None:
+        # One usage row per job rather than per record
+        usage_log_writer.submit({
+            "tool_name": job.tool_name,
+            "user_id": job.user_id,
+            "input_data": json.dumps({"bulk_job_id": job.id, "params": json.loads(job.params or "{}")}),
+            "output_data": json.dumps({
+                "records_processed": job.records_processed,
+                "records_failed": job.records_failed,
+                "error": job.error,
+            }),
+            "execution_time_ms": job.processing_ms,
+            "status": "success" if job.status == "completed" else "error",
+            "cache_hit": False
+        })
+
+
+def job_progress(job: BulkJob) -> Dict[str, Any]:
+    """Progress, throughput and error counts for a job's API response."""
+    records = (job.records_processed or 0) + (job.records_failed or 0)
+    seconds = (job.processing_ms or 0) / 1000
+    return {
+        "records": records,
+        "records_processed": job.records_processed or 0,
+        "records_failed": job.records_failed or 0,
+        "bytes_processed": job.input_offset or 0,
+        "bytes_total": job.input_size or 0,
+        "percent": round(100 * (job.input_offset or 0) / job.input_size, 2) if job.input_size else 100.0,
+        "records_per_second": round(records / seconds, 1) if seconds else 0.0,
+    }
+
+
+# Create singleton instance
+bulk_job_runner = BulkJobRunner(
+    session_factory=SessionLocal,
+    batch_size=settings.BULK_JOB_BATCH_SIZE,
+    workers=settings.BULK_JOB_WORKERS,
+    max_running=settings.BULK_JOB_MAX_RUNNING,
+    poll_interval=settings.BULK_JOB_POLL_INTERVAL_SECONDS,
+    stale_after=settings.BULK_JOB_STALE_SECONDS
+)
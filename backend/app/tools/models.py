@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, Boolean, Integer, BigInteger, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -29,7 +29,39 @@ class ToolUsageLog(Base):
     output_data = Column(Text)
     execution_time_ms = Column(Integer)
     status = Column(String)  # success, error, etc.
+    cache_hit = Column(Boolean, default=False)  # Served from the result cache
+    coalesced = Column(Boolean, default=False)  # Shared an identical concurrent execution
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     tool = relationship("Tool", back_populates="usage_logs")
-    user = relationship("User") 
\ No newline at end of file
+    user = relationship("User") 
+
+class BulkJob(Base):
+    __tablename__ = "bulk_jobs"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"))
+    tool_name = Column(String, index=True)
+    params = Column(Text)  # JSON-encoded tool parameters shared by every record
+    input_format = Column(String)  # ndjson or csv
+    text_field = Column(String, default="text")
+    input_path = Column(String)
+    output_path = Column(String)
+    input_size = Column(BigInteger, default=0)
+    status = Column(String, index=True, default="queued")  # queued, running, completed, failed, cancelled
+    error = Column(Text, nullable=True)
+    
+    # Progress, committed together after each batch's results are on disk
+    input_offset = Column(BigInteger, default=0)  # Bytes of input fully processed
+    output_offset = Column(BigInteger, default=0)  # Bytes of output written for those records
+    records_processed = Column(Integer, default=0)
+    records_failed = Column(Integer, default=0)
+    processing_ms = Column(BigInteger, default=0)
+    
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    user = relationship("User")
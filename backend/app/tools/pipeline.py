@@ -0,0 +1,253 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..auth.models import User
+from ..config import settings
+from ..execution import cpu_executor
+from .registry import ToolSpec
+from .service import run_core_tool, run_document_tools, tool_service
+
+PIPELINE_INPUT = "input"  # Source name of the pipeline's own text
+
+
+def plan_pipeline(steps: List[Dict[str, Any]]) -> List[str]:
+    """
+    Check that pipeline steps form a DAG and order them.
+
+    Each step's ``inputs`` map parameter names to ``"input"`` (the pipeline
+    text) or to the id of the step whose result fills the parameter.
+
+    Returns:
+        Step ids in an order where every step comes after the steps it reads
+
+    Raises:
+        ValueError: If ids are missing or repeated, a step reads an unknown
+            step, or the steps form a cycle
+    """
+    if not steps:
+        raise ValueError("Pipeline has no steps")
+    if len(steps) > settings.PIPELINE_MAX_STEPS:
+        raise ValueError(f"Pipeline too large (max {settings.PIPELINE_MAX_STEPS} steps)")
+
+    dependencies: Dict[str, set] = {}
+    for step in steps:
+        step_id = step["id"]
+        if not step_id or step_id == PIPELINE_INPUT:
+            raise ValueError(f"Invalid step id '{step_id}'")
+        if step_id in dependencies:
+            raise ValueError(f"Duplicate step id '{step_id}'")
+        dependencies[step_id] = set(step.get("inputs", {}).values()) - {PIPELINE_INPUT}
+
+    for step_id, sources in dependencies.items():
+        for source in sources:
+            if source not in dependencies:
+                raise ValueError(f"Step '{step_id}' reads unknown step '{source}'")
+
+    # Kahn's algorithm, keeping request order among ready steps
+    order: List[str] = []
+    remaining = {step_id: set(sources) for step_id, sources in dependencies.items()}
+    while remaining:
+        ready = [step_id for step_id, sources in remaining.items() if not sources]
+        if not ready:
+            raise ValueError(f"Pipeline steps form a cycle: {', '.join(sorted(remaining))}")
+        for step_id in ready:
+            del remaining[step_id]
+            order.append(step_id)
+        for sources in remaining.values():
+            sources.difference_update(ready)
+    return order
+
+
+def text_source(step: Dict[str, Any]) -> Optional[str]:
+    """Where a step's ``text`` comes from: a step id, the pipeline input, or None if given literally."""
+    inputs = step.get("inputs", {})
+    if "text" in inputs:
+        return inputs["text"]
+    return None if "text" in step.get("params", {}) else PIPELINE_INPUT
+
+
+class PipelineRun:
+    """
+    One execution of a pipeline.
+
+    Every step starts as soon as the steps it reads have finished, so
+    independent steps run concurrently. Core steps that become ready to read
+    the same text together run as one worker task, which preprocesses the
+    text once and keeps the document in the worker; steps after a failed
+    step are skipped.
+    """
+
+    def __init__(self, text: str, steps: List[Dict[str, Any]], specs: Dict[str, ToolSpec]):
+        self.text = text
+        self.steps = steps
+        self.specs = specs
+        self.start_time = time.monotonic()
+        self.finished = {step["id"]: asyncio.Event() for step in steps}
+        self.outcomes: Dict[str, Dict[str, Any]] = {}
+        self.params: Dict[str, Dict[str, Any]] = {}  # Parameters each step ran with
+        self.preprocessing_ms: Dict[str, int] = {}
+        # Document steps waiting to be sent to a worker, per text source
+        self._batches: Dict[str, List[Tuple[ToolSpec, Dict[str, Any], asyncio.Future]]] = {}
+        self._batch_tasks: set = set()
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.start_time) * 1000)
+
+    async def run_on_document(
+        self,
+        source: str,
+        text: str,
+        spec: ToolSpec,
+        other_params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Run a document step along with the other steps reading ``source`` now.
+
+        Steps woken by the same finished source reach here in the same event
+        loop pass; the batch is sent once they all have, so the text is
+        preprocessed once in the worker and the document never leaves it.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(source)
+        if batch is None:
+            batch = self._batches[source] = []
+            loop.call_soon(self._send_batch, source, text)
+        future = loop.create_future()
+        batch.append((spec, other_params, future))
+        return await future
+
+    def _send_batch(self, source: str, text: str) -> None:
+        task = asyncio.ensure_future(self._run_batch(source, text, self._batches.pop(source)))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(
+        self,
+        source: str,
+        text: str,
+        batch: List[Tuple[ToolSpec, Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        features = sorted(set().union(*(spec.document_features for spec, _, _ in batch)))
+        calls = [{"tool_name": spec.name, "params": other_params} for spec, other_params, _ in batch]
+        try:
+            result = await cpu_executor.run(run_document_tools, text, features, calls)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.preprocessing_ms[source] = self.preprocessing_ms.get(source, 0) + result["preprocessing_ms"]
+        for (_, _, future), outcome in zip(batch, result["outcomes"]):
+            if not future.done():
+                future.set_result(outcome)
+
+    async def run_step(self, step: Dict[str, Any], db: Session, user: Optional[User]) -> None:
+        step_id, spec = step["id"], self.specs[step["id"]]
+        inputs = step.get("inputs", {})
+        try:
+            for source in set(inputs.values()) - {PIPELINE_INPUT}:
+                await self.finished[source].wait()
+            failed = [
+                source for source in inputs.values()
+                if source != PIPELINE_INPUT and self.outcomes[source]["status"] != "success"
+            ]
+            if failed:
+                self.outcomes[step_id] = {
+                    "result": {"error": f"Skipped: step '{failed[0]}' did not succeed"},
+                    "execution_time_ms": 0,
+                    "status": "skipped"
+                }
+                return
+
+            started_ms = self.elapsed_ms()
+            params = dict(step.get("params", {}))
+            for name, source in inputs.items():
+                params[name] = self.text if source == PIPELINE_INPUT else self.outcomes[source]["result"]
+            params.setdefault("text", self.text)
+            self.params[step_id] = params
+            try:
+                outcome = await self._execute(step, spec, params, db, user)
+            except Exception as e:
+                outcome = {
+                    "result": {"error": getattr(e, "detail", None) or str(e)},
+                    "execution_time_ms": 0,
+                    "status": "error"
+                }
+            self.outcomes[step_id] = {**outcome, "started_ms": started_ms, "finished_ms": self.elapsed_ms()}
+        finally:
+            self.finished[step_id].set()
+
+    async def _execute(
+        self,
+        step: Dict[str, Any],
+        spec: ToolSpec,
+        params: Dict[str, Any],
+        db: Session,
+        user: Optional[User]
+    ) -> Dict[str, Any]:
+        spec.validate(params)
+        if spec.executor != "process":
+            # Plugin tools go through their own runner, which logs their usage
+            return await tool_service.runners[spec.executor](spec, params, db, user)
+
+        source = text_source(step)
+        if spec.run_document is None or source is None:
+            return await cpu_executor.run(run_core_tool, spec.name, params)
+
+        other_params = {name: value for name, value in params.items() if name != "text"}
+        return await self.run_on_document(source, params["text"], spec, other_params)
+
+
+async def run_pipeline(
+    text: str,
+    steps: List[Dict[str, Any]],
+    db: Session,
+    user: Optional[User] = None
+) -> Dict[str, Any]:
+    """
+    Run a DAG of tool steps over one text.
+
+    Args:
+        text: The pipeline input; steps read it as ``text`` unless their
+            params or inputs say otherwise
+        steps: ``{"id", "tool_name", "params", "inputs"}`` dictionaries
+        db: Database session
+        user: Current user (optional)
+
+    Returns:
+        Overall status, one outcome per step in request order (with start
+        and finish offsets in milliseconds), preprocessing time per shared
+        text and the total time
+
+    Raises:
+        ValueError: If the steps do not form a valid DAG of known tools
+    """
+    plan_pipeline(steps)
+    specs = {step["id"]: tool_service.get_tool(step["tool_name"], db) for step in steps}
+
+    run = PipelineRun(text, steps, specs)
+    await asyncio.gather(*(run.run_step(step, db, user) for step in steps))
+
+    # Core steps that ran are logged together in one bulk write
+    core_steps = [
+        step for step in steps
+        if specs[step["id"]].executor == "process" and step["id"] in run.params
+    ]
+    if db and core_steps:
+        tool_service.log_usage_many(
+            [{"tool_name": step["tool_name"], "params": run.params[step["id"]]} for step in core_steps],
+            [run.outcomes[step["id"]] for step in core_steps],
+            user
+        )
+
+    results = [{"id": step["id"], "tool_name": step["tool_name"], **run.outcomes[step["id"]]} for step in steps]
+    return {
+        "status": "success" if all(result["status"] == "success" for result in results) else "error",
+        "steps": results,
+        "preprocessing_ms": run.preprocessing_ms,
+        "total_time_ms": run.elapsed_ms()
+    }
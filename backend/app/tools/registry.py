@@ -0,0 +1,258 @@
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..plugins.environments import environment_for
+from ..plugins.executor import backend_for, plugin_executor
+from ..plugins.introspection import load_signature
+from ..plugins.scheduler import budgets_for
+
+COST_CLASSES = ("light", "heavy")
+
+# Where a tool prefers to run: the CPU process pool, or the plugin scheduler and its sandboxes
+EXECUTORS = ("process", "plugin")
+
+# JSON schema types for the builtin annotations the plugin index records
+JSON_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+    "list": "array",
+    "dict": "object",
+}
+
+SCHEMA_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+
+class ToolSpec:
+    """
+    A registered tool: the callable that runs it, the parameters it accepts
+    and hints on how it should be executed.
+
+    Args:
+        name: Tool name used by the execute endpoints
+        run: Callable taking the parameter dict and returning the result
+        input_schema: JSON schema (object type) for the parameters
+        cost: ``light`` or ``heavy``; heavy calls in a batch get a worker each
+        cacheable: Whether results are deterministic for the same parameters
+        batchable: Whether ``run_batch`` can run many calls at once
+        executor: One of ``EXECUTORS``
+        run_batch: Callable taking a list of parameter dicts, returning one result each
+        version: Bump when output for the same input changes
+        plugin_id: The plugin behind the tool, for plugin tools
+        method_name: The plugin method the tool calls, for plugin tools
+        run_document: Callable taking a preprocessed ``Document`` of the
+            ``text`` parameter and the other parameters; lets pipeline steps
+            over the same text share preprocessing
+        document_features: Document features ``run_document`` uses
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Any],
+        input_schema: Dict[str, Any],
+        cost: str = "light",
+        cacheable: bool = False,
+        batchable: bool = False,
+        executor: str = "process",
+        run_batch: Optional[Callable[[List[Dict[str, Any]]], List[Any]]] = None,
+        version: str = "0",
+        plugin_id: Optional[str] = None,
+        method_name: Optional[str] = None,
+        run_document: Optional[Callable[[Any, Dict[str, Any]], Any]] = None,
+        document_features: Tuple[str, ...] = ()
+    ):
+        if cost not in COST_CLASSES:
+            raise ValueError(f"Cost class must be one of: {', '.join(COST_CLASSES)}")
+        if executor not in EXECUTORS:
+            raise ValueError(f"Executor must be one of: {', '.join(EXECUTORS)}")
+        if batchable and run_batch is None:
+            raise ValueError(f"Batchable tool '{name}' needs a batch callable")
+
+        self.name = name
+        self.run = run
+        self.input_schema = input_schema
+        self.cost = cost
+        self.cacheable = cacheable
+        self.batchable = batchable
+        self.executor = executor
+        self.run_batch = run_batch
+        self.version = version
+        self.plugin_id = plugin_id
+        self.method_name = method_name
+        self.run_document = run_document
+        self.document_features = document_features
+
+    def validate(self, params: Dict[str, Any]) -> None:
+        """
+        Check parameters against the input schema.
+
+        Only ``required``, ``additionalProperties`` and property ``type``
+        are checked.
+
+        Raises:
+            ValueError: Describing the first problem found
+        """
+        properties = self.input_schema.get("properties", {})
+        for name in self.input_schema.get("required", ()):
+            if name not in params:
+                raise ValueError(f"Missing required parameter '{name}' for tool '{self.name}'")
+
+        for name, value in params.items():
+            schema = properties.get(name)
+            if schema is None:
+                if not self.input_schema.get("additionalProperties", True):
+                    raise ValueError(f"Unknown parameter '{name}' for tool '{self.name}'")
+                continue
+            expected = SCHEMA_TYPES.get(schema.get("type"))
+            if expected is None or value is None:
+                continue
+            # JSON booleans are not numbers
+            if not isinstance(value, expected) or (isinstance(value, bool) and bool not in expected):
+                raise ValueError(f"Parameter '{name}' of tool '{self.name}' must be of type {schema['type']}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "input_schema": self.input_schema,
+            "cost": self.cost,
+            "cacheable": self.cacheable,
+            "batchable": self.batchable,
+            "executor": self.executor,
+            "version": self.version,
+            "plugin_id": self.plugin_id,
+        }
+
+
+class ToolRegistry:
+    """
+    Name-indexed registry of core and plugin tools.
+
+    Writes replace the whole index under a lock, so lookups are a single
+    lock-free dict read.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, ToolSpec] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: ToolSpec) -> None:
+        with self._lock:
+            if spec.name in self._tools:
+                raise ValueError(f"Tool '{spec.name}' is already registered")
+            self._tools = {**self._tools, spec.name: spec}
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            if name in self._tools:
+                self._tools = {key: spec for key, spec in self._tools.items() if key != name}
+
+    def replace_plugin_tools(self, specs: List[ToolSpec]) -> None:
+        """Swap in a new set of plugin tools; tools whose names are taken by core tools are skipped."""
+        with self._lock:
+            tools = {name: spec for name, spec in self._tools.items() if spec.plugin_id is None}
+            for spec in specs:
+                tools.setdefault(spec.name, spec)
+            self._tools = tools
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def require(self, name: str) -> ToolSpec:
+        """
+        Look up a tool.
+
+        Raises:
+            ValueError: If no tool has that name
+        """
+        spec = self._tools.get(name)
+        if spec is None:
+            raise ValueError(f"Tool '{name}' not found")
+        return spec
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def specs(self) -> List[ToolSpec]:
+        return list(self._tools.values())
+
+
+def entry_method(signature: Dict[str, Any]) -> Optional[str]:
+    """The method a plugin tool calls: ``run`` if the plugin has one, else its only method."""
+    methods = signature["methods"]
+    if "run" in methods:
+        return "run"
+    if len(methods) == 1 and signature.get("complete", True):
+        return next(iter(methods))
+    return None
+
+
+def method_schema(method: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a JSON schema for a method from its entry in a plugin's signature index."""
+    properties = {}
+    for param in method["params"]:
+        json_type = JSON_TYPES.get(param.get("annotation"))
+        properties[param["name"]] = {"type": json_type} if json_type else {}
+    schema = {
+        "type": "object",
+        "properties": properties,
+        "additionalProperties": method["var_keyword"],
+    }
+    required = [param["name"] for param in method["params"] if param["required"]]
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def run_plugin_method(plugin: Any, method_name: str, params: Dict[str, Any]) -> Any:
+    """Call a plugin method on the plugin's backend, in its environment and within its budgets."""
+    return plugin_executor.execute(
+        plugin_path=plugin.file_path,
+        method_name=method_name,
+        params=params,
+        backend=backend_for(plugin),
+        environment=environment_for(plugin),
+        **budgets_for(plugin)
+    )
+
+
+def plugin_tool_spec(name: str, plugin: Any) -> Optional[ToolSpec]:
+    """
+    Describe an activated plugin as a tool, or return None if it has no
+    method index or no unambiguous entry method.
+    """
+    if not plugin.signature:
+        return None
+    signature = load_signature(plugin.signature)
+    method_name = entry_method(signature)
+    if method_name is None:
+        return None
+
+    try:
+        cacheable = plugin_executor.is_cacheable(plugin.file_path, method_name)
+    except (OSError, SyntaxError, ValueError):
+        cacheable = False
+
+    return ToolSpec(
+        name=name,
+        run=partial(run_plugin_method, plugin, method_name),
+        input_schema=method_schema(signature["methods"][method_name]),
+        cost="heavy",
+        cacheable=cacheable,
+        executor="plugin",
+        version=plugin.version,
+        plugin_id=plugin.id,
+        method_name=method_name
+    )
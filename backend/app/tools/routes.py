@@ -1,10 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import codecs
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, File, UploadFile, Form
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..auth.utils import get_current_active_user, is_admin
 from ..auth.models import User
-from .models import Tool
+from .models import Tool, BulkJob
+from .bulk import INPUT_FORMATS, bulk_job_runner, detect_format, job_progress, read_csv_header
+from .pipeline import run_pipeline
 from .service import tool_service
+from .streaming import open_tool_stream
+from ..execution import cpu_executor
+from ..config import settings
+from ..catalog import catalog, etag_matches
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
@@ -20,6 +34,16 @@ class ToolResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class ToolSpecResponse(BaseModel):
+    name: str
+    input_schema: Dict[str, Any]
+    cost: str
+    cacheable: bool
+    batchable: bool
+    executor: str
+    version: str
+    plugin_id: Optional[str] = None
+
 class ToolExecuteRequest(BaseModel):
     tool_name: str
     params: Dict[str, Any]
@@ -28,17 +52,245 @@ class ToolExecuteResponse(BaseModel):
     result: Any
     execution_time_ms: int
     status: str
+    cache_hit: bool = False
+    coalesced: bool = False
+
+class ToolBatchRequest(BaseModel):
+    items: List[ToolExecuteRequest]
+
+class ToolBatchResponse(BaseModel):
+    results: List[ToolExecuteResponse]
+
+class PipelineStepRequest(BaseModel):
+    id: str
+    tool_name: str
+    params: Dict[str, Any] = {}
+    inputs: Dict[str, str] = {}  # Parameter name -> "input" or the id of the step whose result fills it
+
+class PipelineRequest(BaseModel):
+    text: str
+    steps: List[PipelineStepRequest]
+
+class PipelineStepResponse(BaseModel):
+    id: str
+    tool_name: str
+    result: Any
+    status: str  # success, error or skipped
+    execution_time_ms: int
+    queue_time_ms: int = 0
+    started_ms: Optional[int] = None  # Offsets from the start of the pipeline
+    finished_ms: Optional[int] = None
+    cache_hit: bool = False
+    coalesced: bool = False
+
+class PipelineResponse(BaseModel):
+    status: str
+    steps: List[PipelineStepResponse]
+    preprocessing_ms: Dict[str, int]  # Per shared text ("input" or a step id), summed over worker tasks
+    total_time_ms: int
+
+class BulkJobResponse(BaseModel):
+    id: str
+    tool_name: str
+    params: Dict[str, Any]
+    input_format: str
+    text_field: str
+    status: str
+    error: Optional[str]
+    progress: Dict[str, Any]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+def bulk_job_response(job: BulkJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "tool_name": job.tool_name,
+        "params": json.loads(job.params or "{}"),
+        "input_format": job.input_format,
+        "text_field": job.text_field,
+        "status": job.status,
+        "error": job.error,
+        "progress": job_progress(job),
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+def get_own_bulk_job(job_id: str, db: Session, current_user: User) -> BulkJob:
+    job = db.query(BulkJob).filter(BulkJob.id == job_id).first()
+    if job is None or (job.user_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    Streaming response that is produced while the request body is still being read.
+    
+    Starlette's StreamingResponse listens for disconnects on ``receive``,
+    which would swallow the body messages the generator is consuming; a
+    disconnect surfaces as ``ClientDisconnect`` from ``request.stream()``.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
 
 @router.get("/", response_model=List[ToolResponse])
 async def get_tools(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a list of all available tools."""
-    tools = db.query(Tool).offset(skip).limit(limit).all()
-    return tools
+    snapshot = catalog.get(db)
+    etag = snapshot.etag("tools", skip, limit)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return snapshot.tools[skip:skip + limit]
+
+@router.get("/registry", response_model=List[ToolSpecResponse])
+async def get_tool_registry(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List executable tools, core and plugin, with their input schemas and execution hints."""
+    tool_service.sync_plugin_tools(db)
+    return [spec.describe() for spec in tool_service.registry.specs()]
+
+# Bulk job routes are registered before /{tool_id} so "jobs" is not taken as a tool id
+
+@router.post("/jobs", response_model=BulkJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_bulk_job(
+    tool_name: str = Form(...),
+    input_format: Optional[str] = Form(None),
+    text_field: str = Form("text"),
+    max_length: Optional[int] = Form(None),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Submit an NDJSON or CSV file to be scored by a tool, one record at a time.
+    
+    NDJSON lines are objects with a ``text_field`` key (or plain strings);
+    CSV files need a header row with a ``text_field`` column. An ``id``
+    field or column is copied to the output. The job runs in the background;
+    poll it for progress and download the NDJSON output when it completes.
+    """
+    try:
+        spec = tool_service.get_tool(tool_name, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if spec.executor != "process":
+        raise HTTPException(status_code=400, detail=f"Tool '{tool_name}' cannot run as a bulk job")
+    
+    input_format = input_format or detect_format(file.filename)
+    if input_format not in INPUT_FORMATS:
+        raise HTTPException(status_code=400, detail="Input must be an NDJSON (.ndjson, .jsonl) or CSV (.csv) file")
+    
+    params = {"max_length": max_length} if max_length is not None else {}
+    job_id = str(uuid.uuid4())
+    os.makedirs(settings.BULK_JOB_DIR, exist_ok=True)
+    input_path = os.path.join(settings.BULK_JOB_DIR, f"{job_id}.input.{input_format}")
+    output_path = os.path.join(settings.BULK_JOB_DIR, f"{job_id}.output.ndjson")
+    
+    # Copy the upload to disk in chunks; it is never held in memory
+    max_bytes = settings.MAX_BULK_UPLOAD_MB * 1024 * 1024
+    size = 0
+    try:
+        with open(input_path, "wb") as buffer:
+            while True:
+                data = await file.read(1024 * 1024)
+                if not data:
+                    break
+                size += len(data)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (max {settings.MAX_BULK_UPLOAD_MB} MB)"
+                    )
+                buffer.write(data)
+        
+        if input_format == "csv" and text_field not in read_csv_header(input_path)[0]:
+            raise HTTPException(status_code=400, detail=f"CSV header has no '{text_field}' column")
+    except HTTPException:
+        os.remove(input_path)
+        raise
+    
+    open(output_path, "wb").close()
+    job = BulkJob(
+        id=job_id,
+        user_id=current_user.id,
+        tool_name=tool_name,
+        params=json.dumps(params),
+        input_format=input_format,
+        text_field=text_field,
+        input_path=input_path,
+        output_path=output_path,
+        input_size=size
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    bulk_job_runner.wake()
+    
+    return bulk_job_response(job)
+
+@router.get("/jobs", response_model=List[BulkJobResponse])
+async def get_bulk_jobs(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the current user's bulk jobs, newest first."""
+    jobs = db.query(BulkJob).filter(BulkJob.user_id == current_user.id) \
+        .order_by(BulkJob.created_at.desc()).offset(skip).limit(limit).all()
+    return [bulk_job_response(job) for job in jobs]
+
+@router.get("/jobs/{job_id}", response_model=BulkJobResponse)
+async def get_bulk_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a bulk job's status, progress, throughput and error counts."""
+    return bulk_job_response(get_own_bulk_job(job_id, db, current_user))
+
+@router.get("/jobs/{job_id}/output")
+async def get_bulk_job_output(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a completed job's results as NDJSON, one line per input record."""
+    job = get_own_bulk_job(job_id, db, current_user)
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return FileResponse(job.output_path, media_type="application/x-ndjson", filename=f"{job.id}.ndjson")
+
+@router.post("/jobs/{job_id}/cancel", response_model=BulkJobResponse)
+async def cancel_bulk_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Cancel a queued or running job; a running job stops after its current batch."""
+    job = get_own_bulk_job(job_id, db, current_user)
+    if job.status in ("queued", "running"):
+        job.status = "cancelled"
+        if job.finished_at is None:
+            job.finished_at = datetime.utcnow()
+        db.commit()
+        bulk_job_runner.cancel(job.id)
+    return bulk_job_response(job)
 
 @router.get("/{tool_id}", response_model=ToolResponse)
 async def get_tool(
@@ -47,7 +299,7 @@ async def get_tool(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get details for a specific tool."""
-    tool = db.query(Tool).filter(Tool.id == tool_id).first()
+    tool = catalog.get(db).tools_by_id.get(tool_id)
     if tool is None:
         raise HTTPException(status_code=404, detail="Tool not found")
     return tool
@@ -58,20 +310,143 @@ async def execute_tool(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Execute a tool with the provided parameters."""
+    """Execute a core or plugin tool with the provided parameters."""
     try:
-        result = tool_service.execute_tool(
+        result = await tool_service.execute_tool_async(
             tool_name=request.tool_name,
             params=request.params,
             db=db,
             user=current_user
         )
         return result
+    except HTTPException:
+        raise  # Plugin tools report scheduler, budget and environment errors themselves
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error executing tool: {str(e)}")
 
+@router.post("/execute/batch", response_model=ToolBatchResponse)
+async def execute_tool_batch(
+    request: ToolBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Execute many tool calls in one request; results are returned in order."""
+    if len(request.items) > settings.TOOL_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch too large (max {settings.TOOL_BATCH_MAX_ITEMS} items)"
+        )
+    
+    try:
+        results = await tool_service.execute_many_async(
+            items=[item.dict() for item in request.items],
+            db=db,
+            user=current_user
+        )
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error executing batch: {str(e)}")
+
+@router.post("/execute/pipeline", response_model=PipelineResponse)
+async def execute_tool_pipeline(
+    request: PipelineRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Run a DAG of tool steps over one text.
+    
+    Steps read the pipeline text as ``text`` unless ``inputs`` map a
+    parameter to another step's result. Independent steps run concurrently,
+    and core tools reading the same text run together in one worker task
+    with one preprocessing pass.
+    """
+    try:
+        return await run_pipeline(
+            text=request.text,
+            steps=[step.dict() for step in request.steps],
+            db=db,
+            user=current_user
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error executing pipeline: {str(e)}")
+
+@router.post("/execute/stream")
+async def execute_tool_stream(
+    request: Request,
+    tool_name: str,
+    max_length: int = 100,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Execute a tool over a raw (optionally chunked) UTF-8 text upload.
+    
+    The body is fed to the tool incrementally, so memory stays bounded
+    regardless of input size. Partial results are streamed back as NDJSON,
+    or as server-sent events when the client accepts ``text/event-stream``;
+    the last message carries the final result.
+    """
+    try:
+        consumer = open_tool_stream(tool_name, {"max_length": max_length})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    
+    def encode(message: Dict[str, Any]) -> str:
+        line = json.dumps(message, default=str)
+        return f"data: {line}\n\n" if use_sse else f"{line}\n"
+    
+    async def step(text: str, final: bool = False) -> Any:
+        # Tokenising and scoring run in a worker process; only the bounded
+        # bookkeeping of the consumer's running state stays on the event loop
+        analysis = await cpu_executor.run(consumer.analyze, *consumer.take(text, final))
+        return consumer.merge(analysis, final)
+    
+    async def run():
+        start_time = time.time()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending: List[str] = []
+        pending_chars = 0
+        received = 0
+        try:
+            async for data in request.stream():
+                received += len(data)
+                text = decoder.decode(data)
+                pending.append(text)
+                pending_chars += len(text)
+                if pending_chars < settings.STREAM_READ_CHUNK_CHARS:
+                    continue
+                partial = await step("".join(pending))
+                pending, pending_chars = [], 0
+                if partial is not None:
+                    yield encode({"status": "partial", "result": partial, "bytes_received": received})
+            
+            pending.append(decoder.decode(b"", final=True))
+            result = await step("".join(pending), final=True)
+            outcome = {"result": result, "status": "success"}
+        except ClientDisconnect:
+            outcome = {"result": "Error: client disconnected", "status": "error"}
+        except Exception as e:
+            outcome = {"result": f"Error: {str(e)}", "status": "error"}
+        
+        outcome["execution_time_ms"] = int((time.time() - start_time) * 1000)
+        tool_service.log_usage(
+            tool_name,
+            {"max_length": max_length, "bytes": received, "streamed": True},
+            outcome,
+            current_user
+        )
+        if not await request.is_disconnected():
+            yield encode({**outcome, "bytes_received": received})
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return UploadStreamingResponse(run(), media_type=media_type)
+
 @router.get("/available", response_model=List[str])
 async def get_available_tools(current_user: User = Depends(get_current_active_user)):
     """Get a list of available tool names."""
@@ -94,4 +469,6 @@ async def delete_tool(
         
     db.delete(tool)
     db.commit()
+    catalog.invalidate()
+    tool_service.sync_plugin_tools(db)  # Unload it from the registry
     return None 
\ No newline at end of file
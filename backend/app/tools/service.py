@@ -1,20 +1,95 @@
+import asyncio
+import threading
 import time
-from typing import Dict, Any, List, Optional
+from array import array
+from collections import defaultdict
+from functools import cached_property
+from itertools import chain, repeat
+from typing import Awaitable, Callable, Dict, Any, Iterable, List, Optional
 import re
+import numpy as np
 from sqlalchemy.orm import Session
-from .models import Tool, ToolUsageLog
+from .cache import ResultCache, is_tool_cacheable, result_cache
+from .registry import ToolRegistry, ToolSpec, plugin_tool_spec
+from .usage_log import usage_log_writer
 from ..auth.models import User
+from ..catalog import catalog
+from ..config import settings
+from ..execution import cpu_executor, tool_flight
 
 # This would typically use libraries like transformers, spacy, etc.
 # Simplified implementations for demonstration
 
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def log_preview(value: Any, limit: Optional[int] = None) -> str:
+    """
+    Render a value for the usage log without copying large inputs in full.
+    
+    Long strings, including string values of a dict, are cut to ``limit``
+    characters before the value is converted with ``str``.
+    """
+    limit = settings.USAGE_LOG_MAX_FIELD_CHARS if limit is None else limit
+    
+    def shorten(item: Any) -> Any:
+        if isinstance(item, str) and len(item) > limit:
+            return f"{item[:limit]}... ({len(item)} chars)"
+        return item
+    
+    if isinstance(value, dict):
+        value = {key: shorten(item) for key, item in value.items()}
+    text = str(shorten(value))
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+class Document:
+    """
+    A text preprocessed once for several tools.
+    
+    Each feature (sentences, per-sentence lowercase words, lowercase
+    whitespace tokens) is computed on first use and travels with the
+    document when it is sent to a worker process.
+    """
+    
+    FEATURES = ("sentences", "sentence_words", "tokens")
+    
+    def __init__(self, text: str):
+        self.text = text
+    
+    @cached_property
+    def sentences(self) -> List[str]:
+        return SENTENCE_BOUNDARY.split(self.text)
+    
+    @cached_property
+    def sentence_words(self) -> List[List[str]]:
+        return [WORD_PATTERN.findall(sentence.lower()) for sentence in self.sentences]
+    
+    @cached_property
+    def tokens(self) -> List[str]:
+        return self.text.lower().split()
+    
+    def prepare(self, features: Iterable[str]) -> "Document":
+        """Compute the given features now; returns the document."""
+        for feature in features:
+            getattr(self, feature)
+        return self
+
+
 class TextSummarizer:
     """Summarizes text using extractive summarization."""
     
+    version = "2.0"  # Bump when output for the same input changes
+    
     def summarize(self, text: str, max_length: int = 100) -> str:
         """
         Summarize the input text.
         
+        Sentences are scored with TF-IDF over a sparse sentence x term
+        matrix and the highest-scoring ones that fit in ``max_length`` are
+        returned in their original order.
+        
         Args:
             text: The text to summarize
             max_length: Maximum length of the summary in characters
@@ -22,23 +97,212 @@ class TextSummarizer:
         Returns:
             A summary of the text
         """
-        # In a real implementation, this would use a pre-trained model
-        # Simple example just returns the first few sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        summary = ""
+        return self.summarize_document(Document(text), max_length)
+    
+    def summarize_document(self, document: Document, max_length: int = 100) -> str:
+        """Summarize a preprocessed document; see :meth:`summarize`."""
+        sentences = document.sentences
+        if sum(map(len, sentences)) + len(sentences) - 1 <= max_length:
+            # Everything fits; no need to score
+            return " ".join(sentences).strip()
         
-        for sentence in sentences:
-            if len(summary) + len(sentence) <= max_length:
-                summary += sentence + " "
-            else:
+        scores = self.score_sentences(sentences, document.sentence_words)
+        return self.select(sentences, scores, max_length)
+    
+    def score_sentences(self, sentences: List[str], sentence_words: Optional[List[List[str]]] = None) -> np.ndarray:
+        """
+        Score sentences by the TF-IDF weight of their terms.
+        
+        Each sentence is tokenized once into integer term ids and the
+        sentence x term matrix is kept as sparse (sentence, term) pairs, so
+        cost grows linearly with the number of tokens.
+        
+        Args:
+            sentences: The sentences of one document
+            sentence_words: The lowercase words of each sentence, if already known
+            
+        Returns:
+            One score per sentence
+        """
+        if sentence_words is None:
+            sentence_words = [WORD_PATTERN.findall(sentence.lower()) for sentence in sentences]
+        vocabulary: defaultdict = defaultdict()
+        vocabulary.default_factory = vocabulary.__len__  # New terms get the next id
+        term_id = vocabulary.__getitem__
+        
+        pair_terms = array("q")  # Distinct terms of each sentence, sentence after sentence
+        distinct_counts = array("q")
+        token_counts = array("q")
+        for words in sentence_words:
+            distinct = dict.fromkeys(words)  # Ordered, so term ids are deterministic
+            pair_terms.extend(map(term_id, distinct))
+            distinct_counts.append(len(distinct))
+            token_counts.append(len(words))
+        
+        sentence_count = len(sentences)
+        if not pair_terms:
+            return np.zeros(sentence_count)
+        
+        terms = np.frombuffer(pair_terms, dtype=np.int64)
+        rows = np.repeat(np.arange(sentence_count), np.frombuffer(distinct_counts, dtype=np.int64))
+        
+        # Term weight: share of sentences using the term times its inverse sentence frequency
+        document_frequency = np.bincount(terms, minlength=len(vocabulary))
+        idf = np.log((1 + sentence_count) / (1 + document_frequency)) + 1
+        term_weights = document_frequency / sentence_count * idf
+        
+        totals = np.bincount(rows, weights=term_weights[terms], minlength=sentence_count)
+        return totals / np.maximum(np.frombuffer(token_counts, dtype=np.int64), 1)
+    
+    def select(self, sentences: List[str], scores: np.ndarray, max_length: int) -> str:
+        """
+        Pick the best-scoring sentences that fit in ``max_length`` characters.
+        
+        Ties go to the earlier sentence, and the chosen sentences are joined
+        in document order.
+        """
+        order = np.lexsort((np.arange(len(scores)), -scores))
+        shortest = min(map(len, sentences))
+        
+        chosen = []
+        used = -1  # No separator before the first sentence
+        for index in order.tolist():
+            needed = len(sentences[index]) + 1
+            if used + needed <= max_length:
+                chosen.append(index)
+                used += needed
+            if max_length - used <= shortest:
                 break
-                
-        return summary.strip()
+        
+        chosen.sort()
+        return " ".join(sentences[index] for index in chosen).strip()
+    
+    def summarize_parallel(self, text: str, max_length: int = 100, chunk_size: int = 1024 * 1024) -> str:
+        """
+        Summarize a large text with map-reduce over chunks, in this process.
+        
+        The text is cut at sentence boundaries into chunks of about
+        ``chunk_size`` characters, each chunk is summarized independently and
+        the joined partial summaries are summarized once more. The service
+        spreads the map step over ``cpu_executor`` instead (see
+        :meth:`ToolService.summarize_parallel_async`); chunking is the same
+        either way, so both give the same output.
+        
+        Args:
+            text: The text to summarize
+            max_length: Maximum length of the summary in characters
+            chunk_size: Target chunk size in characters
+            
+        Returns:
+            A summary of the text
+        """
+        chunks = self.split_chunks(text, chunk_size)
+        if len(chunks) <= 1:
+            return self.summarize(text, max_length)
+        return self.combine([self.summarize(chunk, max_length) for chunk in chunks], max_length)
+    
+    def combine(self, partials: List[str], max_length: int) -> str:
+        """The reduce step of map-reduce summarization: summarize the partial summaries."""
+        return self.summarize(" ".join(partial for partial in partials if partial), max_length)
+    
+    def split_chunks(self, text: str, chunk_size: int) -> List[str]:
+        """Cut text into chunks of about ``chunk_size`` characters at sentence boundaries."""
+        if len(text) <= chunk_size:
+            return [text]
+        
+        chunks = []
+        current: List[str] = []
+        current_length = 0
+        for sentence in SENTENCE_BOUNDARY.split(text):
+            if current and current_length + len(sentence) > chunk_size:
+                chunks.append(" ".join(current))
+                current, current_length = [], 0
+            current.append(sentence)
+            current_length += len(sentence) + 1
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+
+def is_parallel_summary(params: Dict[str, Any]) -> bool:
+    return params.get("mode") == "parallel" or bool(params.get("parallel"))
+
+
+def split_summary_chunks(text: str, chunk_size: int) -> List[str]:
+    """Process-pool entry point for the chunking step of map-reduce summarization."""
+    return TextSummarizer().split_chunks(text, chunk_size)
+
+
+def summarize_chunks(chunks: List[str], max_length: int) -> List[str]:
+    """Process-pool entry point for the map step of map-reduce summarization."""
+    summarizer = TextSummarizer()
+    return [summarizer.summarize(chunk, max_length) for chunk in chunks]
+
+
+def combine_summaries(partials: List[str], max_length: int) -> str:
+    """Process-pool entry point for the reduce step of map-reduce summarization."""
+    return TextSummarizer().combine(partials, max_length)
+
+
+class SentimentLexicon:
+    """
+    A sentiment lexicon compiled into a hashed vocabulary and a weight vector.
+    
+    Token ids index into ``weights`` (id 0 is reserved for unknown tokens), so
+    a batch of documents becomes a flat id array that NumPy can score at once.
+    """
+    
+    def __init__(self, positive_words: List[str], negative_words: List[str]):
+        self.vocabulary: Dict[str, int] = {}
+        weights = [0]
+        for words, weight in ((positive_words, 1), (negative_words, -1)):
+            for word in words:
+                if word not in self.vocabulary:
+                    self.vocabulary[word] = len(weights)
+                    weights.append(weight)
+        self.weights = np.array(weights, dtype=np.int8)
+    
+    def count(self, texts: List[str]):
+        """
+        Count positive, negative and total tokens for each text.
+        
+        Returns:
+            Three int64 arrays (positive, negative, total), one entry per text
+        """
+        return self.count_tokens([text.lower().split() for text in texts])
+    
+    def count_tokens(self, token_lists: List[List[str]]):
+        """Like :meth:`count`, for texts already split into lowercase tokens."""
+        totals = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        
+        # Sparse doc x token representation: one (doc, weight) pair per known token
+        lookup = self.vocabulary.get
+        token_ids = np.fromiter(
+            map(lookup, chain.from_iterable(token_lists), repeat(0)),
+            dtype=np.int32,
+            count=int(totals.sum())
+        )
+        doc_index = np.repeat(np.arange(len(token_lists)), totals)
+        known = token_ids != 0
+        doc_index, token_weights = doc_index[known], self.weights[token_ids[known]]
+        
+        positive = np.bincount(doc_index[token_weights > 0], minlength=len(token_lists))
+        negative = np.bincount(doc_index[token_weights < 0], minlength=len(token_lists))
+        return positive, negative, totals
 
 
 class SentimentAnalyzer:
     """Analyzes sentiment of text."""
     
+    version = "1.0"  # Bump when output for the same input changes
+    
+    # In a real implementation, this would use a pre-trained model
+    # Simple example that counts positive and negative words
+    lexicon = SentimentLexicon(
+        positive_words=["good", "great", "excellent", "happy", "positive", "wonderful", "best", "love"],
+        negative_words=["bad", "terrible", "awful", "sad", "negative", "worst", "hate", "poor"]
+    )
+    
     def analyze(self, text: str) -> Dict[str, Any]:
         """
         Analyze sentiment of the input text.
@@ -49,48 +313,359 @@ class SentimentAnalyzer:
         Returns:
             Dictionary with sentiment scores
         """
-        # In a real implementation, this would use a pre-trained model
-        # Simple example that counts positive and negative words
-        positive_words = ["good", "great", "excellent", "happy", "positive", "wonderful", "best", "love"]
-        negative_words = ["bad", "terrible", "awful", "sad", "negative", "worst", "hate", "poor"]
+        return self.analyze_batch([text])[0]
+    
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze sentiment of many texts in one call.
         
-        words = text.lower().split()
-        positive_count = sum(1 for word in words if word in positive_words)
-        negative_count = sum(1 for word in words if word in negative_words)
+        Args:
+            texts: The texts to analyze
+            
+        Returns:
+            One result dictionary per text, in input order
+        """
+        if not texts:
+            return []
         
-        total = len(words)
-        score = (positive_count - negative_count) / total if total > 0 else 0
+        positive, negative, totals = self.lexicon.count(texts)
+        return self.results_from_counts(positive, negative, totals)
+    
+    def analyze_document(self, document: Document) -> Dict[str, Any]:
+        """Analyze sentiment of a preprocessed document; see :meth:`analyze`."""
+        positive, negative, totals = self.lexicon.count_tokens([document.tokens])
+        return self.results_from_counts(positive, negative, totals)[0]
+    
+    def results_from_counts(self, positive: np.ndarray, negative: np.ndarray, totals: np.ndarray) -> List[Dict[str, Any]]:
+        """Build result dictionaries from per-text positive, negative and total token counts."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(totals > 0, (positive - negative) / np.maximum(totals, 1), 0.0)
         
         # Map score to sentiment category
-        if score > 0.05:
-            sentiment = "positive"
-        elif score < -0.05:
-            sentiment = "negative"
-        else:
-            sentiment = "neutral"
-            
-        return {
-            "sentiment": sentiment,
-            "score": score,
-            "positive_words": positive_count,
-            "negative_words": negative_count,
-            "confidence": abs(score) * 2  # Simple confidence metric
-        }
+        labels = np.where(scores > 0.05, "positive", np.where(scores < -0.05, "negative", "neutral"))
+        
+        results = []
+        for sentiment, score, positive_count, negative_count, total in zip(
+            labels.tolist(), scores.tolist(), positive.tolist(), negative.tolist(), totals.tolist()
+        ):
+            if total == 0:
+                score = 0
+            results.append({
+                "sentiment": sentiment,
+                "score": score,
+                "positive_words": positive_count,
+                "negative_words": negative_count,
+                "confidence": abs(score) * 2  # Simple confidence metric
+            })
+        return results
+
+
+SUMMARIZER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "text": {"type": "string"},
+        "max_length": {"type": "integer"},
+        "mode": {"type": "string"},  # "parallel" for map-reduce summarization
+        "parallel": {"type": "boolean"},
+        "chunk_size": {"type": "integer"},
+        "workers": {"type": "integer"},
+    },
+}
+
+SENTIMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "text": {"type": "string"},
+    },
+}
 
 
 class ToolService:
     """Service to manage and execute AI tools."""
     
     def __init__(self):
-        # Register core tools
-        self.tools = {
-            "text_summarizer": TextSummarizer(),
-            "sentiment_analyzer": SentimentAnalyzer()
+        self.summarizer = TextSummarizer()
+        self.sentiment_analyzer = SentimentAnalyzer()
+        
+        # Register core tools; plugin tools are loaded from the catalog
+        self.registry = ToolRegistry()
+        self.registry.register(ToolSpec(
+            name="text_summarizer",
+            run=self._summarize,
+            input_schema=SUMMARIZER_SCHEMA,
+            cost="heavy",
+            cacheable=True,
+            version=TextSummarizer.version,
+            run_document=self._summarize_document,
+            document_features=("sentences", "sentence_words")
+        ))
+        self.registry.register(ToolSpec(
+            name="sentiment_analyzer",
+            run=self._analyze_sentiment,
+            input_schema=SENTIMENT_SCHEMA,
+            cacheable=True,
+            batchable=True,
+            run_batch=self._analyze_sentiment_batch,
+            version=SentimentAnalyzer.version,
+            run_document=self._analyze_sentiment_document,
+            document_features=("tokens",)
+        ))
+        
+        # Async runner per preferred executor; the plugin module adds the plugin runner
+        self.runners: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+            "process": self._run_in_process_pool
         }
+        self._catalog_version: Optional[str] = None
+        self._sync_lock = threading.Lock()
+    
+    def _summarize(self, params: Dict[str, Any]) -> str:
+        if is_parallel_summary(params):
+            # Already in a pool worker, which must not start processes of its own
+            return self.summarizer.summarize_parallel(
+                text=params.get("text", ""),
+                max_length=params.get("max_length", 100),
+                chunk_size=params.get("chunk_size", settings.SUMMARIZER_CHUNK_SIZE)
+            )
+        return self.summarizer.summarize(
+            text=params.get("text", ""),
+            max_length=params.get("max_length", 100)
+        )
+    
+    def _summarize_document(self, document: Document, params: Dict[str, Any]) -> str:
+        if is_parallel_summary(params):
+            return self._summarize({**params, "text": document.text})
+        return self.summarizer.summarize_document(document, params.get("max_length", 100))
+    
+    def _analyze_sentiment(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.sentiment_analyzer.analyze(text=params.get("text", ""))
+    
+    def _analyze_sentiment_batch(self, params_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.sentiment_analyzer.analyze_batch([str(params.get("text", "")) for params in params_list])
+    
+    def _analyze_sentiment_document(self, document: Document, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.sentiment_analyzer.analyze_document(document)
+    
+    def register_runner(self, executor: str, runner: Callable[..., Awaitable[Dict[str, Any]]]) -> None:
+        """
+        Set the async runner for tools preferring ``executor``.
+        
+        Runners are called as ``runner(spec, params, db, user)``, return an
+        outcome dictionary and log their own usage.
+        """
+        self.runners[executor] = runner
+    
+    def sync_plugin_tools(self, db: Optional[Session] = None) -> None:
+        """
+        Bring plugin tools in line with the catalog.
+        
+        Tools of active, approved plugins are loaded and tools of deleted or
+        deactivated plugins dropped, without a restart. The registry is only
+        rebuilt when the catalog's content changed.
+        """
+        snapshot = catalog.get(db)
+        if snapshot.version == self._catalog_version:
+            return
+        
+        with self._sync_lock:
+            if snapshot.version == self._catalog_version:
+                return
+            specs = []
+            for tool in snapshot.tools:
+                plugin = snapshot.plugins_by_id.get(tool.plugin_id) if tool.plugin_id else None
+                if plugin is None or not (plugin.is_approved and plugin.is_active):
+                    continue
+                spec = plugin_tool_spec(tool.name, plugin)
+                if spec is not None:
+                    specs.append(spec)
+            self.registry.replace_plugin_tools(specs)
+            self._catalog_version = snapshot.version
+    
+    def get_tool(self, tool_name: str, db: Optional[Session] = None) -> ToolSpec:
+        """
+        Look up a core or plugin tool.
+        
+        Raises:
+            ValueError: If no tool has that name
+        """
+        self.sync_plugin_tools(db)
+        return self.registry.require(tool_name)
     
     def get_available_tools(self) -> List[str]:
         """Get a list of available tool names."""
-        return list(self.tools.keys())
+        self.sync_plugin_tools()
+        return self.registry.names()
+    
+    def run_tool(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a tool without touching the database.
+        
+        Args:
+            tool_name: Name of the tool to execute
+            params: Parameters to pass to the tool
+            
+        Returns:
+            Result, status and execution time of the tool run
+        """
+        spec = self.registry.require(tool_name)
+        start_time = time.time()
+        
+        try:
+            spec.validate(params)
+            result = spec.run(params)
+            status = "success"
+            
+        except Exception as e:
+            result = {"error": str(e)}
+            status = "error"
+            
+        execution_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
+        
+        return {
+            "result": result,
+            "execution_time_ms": execution_time,
+            "status": status
+        }
+    
+    def run_document_tool(self, tool_name: str, params: Dict[str, Any], document: Document) -> Dict[str, Any]:
+        """
+        Run a tool over a preprocessed document of its ``text`` parameter.
+        
+        ``params`` are the other parameters, already validated.
+        
+        Returns:
+            Result, status and execution time of the tool run
+        """
+        spec = self.registry.require(tool_name)
+        start_time = time.time()
+        
+        try:
+            result = spec.run_document(document, params)
+            status = "success"
+        except Exception as e:
+            result = {"error": str(e)}
+            status = "error"
+        
+        return {
+            "result": result,
+            "execution_time_ms": int((time.time() - start_time) * 1000),
+            "status": status
+        }
+    
+    def log_usage(
+        self,
+        tool_name: str,
+        params: Dict[str, Any],
+        outcome: Dict[str, Any],
+        user: Optional[User] = None
+    ) -> None:
+        """Queue a tool run for the background usage-log writer."""
+        usage_log_writer.submit(self._usage_row(tool_name, params, outcome, user))
+    
+    def run_many(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run many tool calls, batching calls to tools that support it.
+        
+        Args:
+            items: List of ``{"tool_name": ..., "params": ...}`` dictionaries
+            
+        Returns:
+            One outcome per item, in input order
+        """
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        
+        # Group calls per batchable tool so each tool sees the whole batch at once
+        batches: Dict[str, List[int]] = defaultdict(list)
+        for index, item in enumerate(items):
+            spec = self.registry.get(item["tool_name"])
+            if spec is None:
+                outcomes[index] = {
+                    "result": {"error": f"Tool '{item['tool_name']}' not found"},
+                    "execution_time_ms": 0,
+                    "status": "error"
+                }
+            elif spec.batchable:
+                try:
+                    spec.validate(item["params"])
+                    batches[spec.name].append(index)
+                except ValueError as e:
+                    outcomes[index] = {"result": {"error": str(e)}, "execution_time_ms": 0, "status": "error"}
+            else:
+                outcomes[index] = self.run_tool(item["tool_name"], item["params"])
+        
+        for tool_name, indexes in batches.items():
+            start_time = time.time()
+            try:
+                results = self.registry.require(tool_name).run_batch([items[index]["params"] for index in indexes])
+                status = "success"
+            except Exception as e:
+                results = [{"error": str(e)}] * len(indexes)
+                status = "error"
+            
+            # Spread the batch time across its items
+            execution_time = int((time.time() - start_time) * 1000 / len(indexes))
+            for index, result in zip(indexes, results):
+                outcomes[index] = {
+                    "result": result,
+                    "execution_time_ms": execution_time,
+                    "status": status
+                }
+        
+        return outcomes
+    
+    def log_usage_many(
+        self,
+        items: List[Dict[str, Any]],
+        outcomes: List[Dict[str, Any]],
+        user: Optional[User] = None
+    ) -> None:
+        """Queue many tool runs; they are written together in bulk inserts."""
+        usage_log_writer.submit_many([
+            self._usage_row(item["tool_name"], item["params"], outcome, user)
+            for item, outcome in zip(items, outcomes)
+        ])
+    
+    def _usage_row(
+        self,
+        tool_name: str,
+        params: Dict[str, Any],
+        outcome: Dict[str, Any],
+        user: Optional[User] = None
+    ) -> Dict[str, Any]:
+        return {
+            "tool_name": tool_name,
+            "user_id": user.id if user else None,
+            "input_data": log_preview(params),
+            "output_data": log_preview(outcome["result"]),
+            "execution_time_ms": outcome["execution_time_ms"],
+            "status": outcome["status"],
+            "cache_hit": outcome.get("cache_hit", False),
+            "coalesced": outcome.get("coalesced", False)
+        }
+    
+    def _cache_key(self, spec: ToolSpec, params: Dict[str, Any]) -> Optional[str]:
+        """Build the result-cache key for a call, or None if the tool is not cached."""
+        if not spec.cacheable or not is_tool_cacheable(spec.name):
+            return None
+        return ResultCache.make_key(spec.name, spec.version, params)
+    
+    def _cached_outcome(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        start_time = time.time()
+        hit, result = result_cache.get(cache_key)
+        if not hit:
+            return None
+        return {
+            "result": result,
+            "execution_time_ms": int((time.time() - start_time) * 1000),
+            "status": "success",
+            "cache_hit": True
+        }
+    
+    def _store_outcome(self, cache_key: Optional[str], outcome: Dict[str, Any]) -> None:
+        # Only successful results are cached; errors are retried on the next call
+        if cache_key is not None and outcome["status"] == "success":
+            result_cache.put(cache_key, outcome["result"])
     
     def execute_tool(
         self, 
@@ -111,55 +686,207 @@ class ToolService:
         Returns:
             Result of the tool execution
         """
-        if tool_name not in self.tools:
-            raise ValueError(f"Tool '{tool_name}' not found")
-            
-        tool = self.tools[tool_name]
-        start_time = time.time()
+        cache_key = self._cache_key(self.registry.require(tool_name), params)
+        outcome = self._cached_outcome(cache_key)
+        if outcome is None:
+            outcome = self.run_tool(tool_name, params)
+            self._store_outcome(cache_key, outcome)
+        
+        # Log the tool usage if we have a database session
+        if db and tool_name:
+            self.log_usage(tool_name, params, outcome, user)
+        
+        return outcome
+    
+    async def execute_tool_async(
+        self,
+        tool_name: str,
+        params: Dict[str, Any],
+        db: Session,
+        user: Optional[User] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a core or plugin tool without blocking the event loop.
+        
+        The call is validated against the tool's input schema, then handed
+        to the runner for the executor the tool prefers.
+        
+        Raises:
+            ValueError: If the tool does not exist or the parameters do not match its schema
+        """
+        spec = self.get_tool(tool_name, db)
+        spec.validate(params)
+        return await self.runners[spec.executor](spec, params, db, user)
+    
+    async def _run_in_process_pool(
+        self,
+        spec: ToolSpec,
+        params: Dict[str, Any],
+        db: Session,
+        user: Optional[User] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a core tool in the CPU process pool.
+        
+        The usage log is queued for the background writer so it is not part
+        of request latency.
+        """
+        cache_key = self._cache_key(spec, params)
+        outcome = self._cached_outcome(cache_key)
+        if outcome is None:
+            # Identical calls already in flight share that run; each caller gets its own copy
+            flight_key = cache_key or ResultCache.make_key(spec.name, spec.version, params)
+            outcome, coalesced = await tool_flight.run(flight_key, self._run_and_store, spec.name, params, cache_key)
+            outcome = {**outcome, "coalesced": coalesced}
         
+        if db:
+            self.log_usage(spec.name, params, outcome, user)
+        
+        return outcome
+    
+    async def _run_and_store(
+        self,
+        tool_name: str,
+        params: Dict[str, Any],
+        cache_key: Optional[str]
+    ) -> Dict[str, Any]:
+        if tool_name == "text_summarizer" and is_parallel_summary(params):
+            outcome = await self.summarize_parallel_async(params)
+        else:
+            outcome = await cpu_executor.run(run_core_tool, tool_name, params)
+        self._store_outcome(cache_key, outcome)
+        return outcome
+    
+    async def summarize_parallel_async(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a map-reduce summary with its map step spread over ``cpu_executor``.
+        
+        Chunking, each run of chunks and the final reduce are separate pool
+        tasks, so a large summary uses up to ``workers`` of the pool's
+        processes without any worker starting processes of its own.
+        
+        Returns:
+            Result, status and execution time, as :meth:`run_tool` does
+        """
+        start_time = time.time()
         try:
-            # Execute the appropriate method based on the tool
-            if tool_name == "text_summarizer":
-                result = tool.summarize(
-                    text=params.get("text", ""),
-                    max_length=params.get("max_length", 100)
-                )
-            elif tool_name == "sentiment_analyzer":
-                result = tool.analyze(text=params.get("text", ""))
+            self.registry.require("text_summarizer").validate(params)
+            text, max_length = params.get("text", ""), params.get("max_length", 100)
+            chunks = await cpu_executor.run(
+                split_summary_chunks, text, params.get("chunk_size", settings.SUMMARIZER_CHUNK_SIZE)
+            )
+            if len(chunks) <= 1:
+                (result,) = await cpu_executor.run(summarize_chunks, [text], max_length)
             else:
-                # Generic case for plugins
-                result = tool.run(**params)
-                
+                workers = params.get("workers", settings.SUMMARIZER_MAX_WORKERS)
+                workers = max(1, min(workers, settings.SUMMARIZER_MAX_WORKERS, settings.CPU_EXECUTOR_WORKERS, len(chunks)))
+                # One task per worker, each over a contiguous run of chunks
+                size = -(-len(chunks) // workers)
+                groups = await asyncio.gather(*(
+                    cpu_executor.run(summarize_chunks, chunks[start:start + size], max_length)
+                    for start in range(0, len(chunks), size)
+                ))
+                result = await cpu_executor.run(combine_summaries, list(chain.from_iterable(groups)), max_length)
             status = "success"
-            
         except Exception as e:
             result = {"error": str(e)}
             status = "error"
-            
-        execution_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
-        
-        # Log the tool usage if we have a database session
-        if db and tool_name:
-            # Get tool from database
-            db_tool = db.query(Tool).filter(Tool.name == tool_name).first()
-            
-            if db_tool:
-                log = ToolUsageLog(
-                    tool_id=db_tool.id,
-                    user_id=user.id if user else None,
-                    input_data=str(params),
-                    output_data=str(result),
-                    execution_time_ms=execution_time,
-                    status=status
-                )
-                db.add(log)
-                db.commit()
         
         return {
             "result": result,
-            "execution_time_ms": execution_time,
+            "execution_time_ms": int((time.time() - start_time) * 1000),
             "status": status
         }
+    
+    async def execute_many_async(
+        self,
+        items: List[Dict[str, Any]],
+        db: Session,
+        user: Optional[User] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a batch of tool calls without blocking the event loop.
+        
+        Core tool calls run in the CPU process pool: light calls in chunks,
+        heavy calls one per task so they spread across workers. Plugin tool
+        calls go through their own runner concurrently. Results come back in
+        input order.
+        """
+        self.sync_plugin_tools(db)
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        
+        light, heavy, delegated = [], [], []
+        for index, item in enumerate(items):
+            spec = self.registry.get(item["tool_name"])
+            if spec is None or spec.executor == "process":
+                # Unknown tools are reported by run_many
+                (heavy if spec is not None and spec.cost == "heavy" else light).append(index)
+            else:
+                delegated.append(index)
+        
+        chunk_size = max(settings.TOOL_BATCH_CHUNK_SIZE, 1)
+        chunks = [[index] for index in heavy] + [light[i:i + chunk_size] for i in range(0, len(light), chunk_size)]
+        
+        async def run_chunk(chunk: List[int]) -> None:
+            chunk_outcomes = await cpu_executor.run(run_core_tools, [items[index] for index in chunk])
+            for index, outcome in zip(chunk, chunk_outcomes):
+                outcomes[index] = outcome
+        
+        async def run_delegated(index: int) -> None:
+            spec = self.registry.require(items[index]["tool_name"])
+            try:
+                spec.validate(items[index]["params"])
+                outcomes[index] = await self.runners[spec.executor](spec, items[index]["params"], db, user)
+            except Exception as e:
+                outcomes[index] = {
+                    "result": {"error": getattr(e, "detail", None) or str(e)},
+                    "execution_time_ms": 0,
+                    "status": "error"
+                }
+        
+        await asyncio.gather(*(run_chunk(chunk) for chunk in chunks), *(run_delegated(index) for index in delegated))
+        
+        # Delegated runners log their own usage
+        local = sorted(light + heavy)
+        if db and local:
+            self.log_usage_many([items[index] for index in local], [outcomes[index] for index in local], user)
+        
+        return outcomes
+
+
+def run_core_tool(tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point: run a tool on this process's service instance."""
+    return tool_service.run_tool(tool_name, params)
+
+
+def run_core_tools(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Process-pool entry point: run a batch of tool calls on this process's service instance."""
+    return tool_service.run_many(items)
+
+
+def run_document_tools(text: str, features: List[str], calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Process-pool entry point: preprocess a text once and run tools over it.
+
+    The document stays in this process, so only the text and the results
+    cross the process boundary.
+
+    Args:
+        text: Text to preprocess
+        features: Document features the tools need
+        calls: ``{"tool_name": ..., "params": ...}`` dictionaries, with
+            ``params`` holding everything but ``text``
+
+    Returns:
+        Preprocessing time and one outcome per call, in order
+    """
+    start_time = time.time()
+    document = Document(text).prepare(features)
+    preprocessing_ms = int((time.time() - start_time) * 1000)
+    return {
+        "preprocessing_ms": preprocessing_ms,
+        "outcomes": [tool_service.run_document_tool(call["tool_name"], call["params"], document) for call in calls]
+    }
 
 
 # Create singleton instance
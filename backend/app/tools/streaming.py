@@ -0,0 +1,234 @@
+import abc
+import heapq
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+from .service import SENTENCE_BOUNDARY, WORD_PATTERN, SentimentAnalyzer, tool_service
+
+LAST_WORD = re.compile(r"\S*\Z")
+
+
+def count_sentiment(texts: List[str]) -> Tuple[int, int, int]:
+    """Process-pool entry point: positive, negative and total tokens over some texts."""
+    texts = [text for text in texts if text]
+    if not texts:
+        return 0, 0, 0
+    positive, negative, totals = tool_service.sentiment_analyzer.lexicon.count(texts)
+    return int(positive.sum()), int(negative.sum()), int(totals.sum())
+
+
+def split_sentences(
+    text: str,
+    final: bool,
+    max_pending: int,
+    max_length: int
+) -> Tuple[List[Tuple[Optional[str], List[str], int]], str]:
+    """
+    Process-pool entry point: split streamed text into sentences and their terms.
+
+    Returns:
+        ``(sentence, distinct terms, token count)`` for each complete
+        sentence, with the sentence left out if it is too long to be part of
+        a summary, and the text to hold back for the next piece
+    """
+    sentences = SENTENCE_BOUNDARY.split(text)
+    carry = ""
+    if not final:
+        # The last sentence may continue in the next piece, so hold it back
+        carry = sentences.pop()
+        if len(carry) > max_pending:
+            sentences.append(carry)
+            carry = ""
+
+    analyzed = []
+    for sentence in sentences:
+        words = WORD_PATTERN.findall(sentence.lower())
+        analyzed.append((sentence if len(sentence) <= max_length else None, list(dict.fromkeys(words)), len(words)))
+    return analyzed, carry
+
+
+class StreamConsumer(abc.ABC):
+    """
+    Incremental tool execution over text that arrives in pieces.
+
+    Each piece goes through three steps. ``take`` returns the arguments for
+    ``analyze``, holding back what may continue in the next piece;
+    ``analyze`` is a module-level function doing the CPU-bound work without
+    touching the consumer, so it can run in a worker process; ``merge``
+    folds its result into the running state and returns a partial result.
+    ``feed`` and ``finish`` run all three in the calling thread. Only a
+    bounded amount of state is kept, so memory does not grow with the size
+    of the input.
+    """
+
+    analyze: Callable[..., Any]
+
+    @abc.abstractmethod
+    def take(self, text: str, final: bool = False) -> Tuple[Any, ...]:
+        """Hand over the next piece of text; returns the arguments for ``analyze``."""
+
+    @abc.abstractmethod
+    def merge(self, analysis: Any, final: bool = False) -> Any:
+        """Fold an analysis into the running state; returns a partial or, if final, the final result."""
+
+    def feed(self, text: str) -> Optional[Dict[str, Any]]:
+        """Consume the next piece of text; returns a partial result or None."""
+        return self.merge(self.analyze(*self.take(text)))
+
+    def finish(self, text: str = "") -> Any:
+        """Consume the last piece of text and return the final result."""
+        return self.merge(self.analyze(*self.take(text, final=True)), final=True)
+
+
+class SentimentStream(StreamConsumer):
+    """Keeps running sentiment totals over a stream of text."""
+
+    analyze = staticmethod(count_sentiment)
+
+    def __init__(self, analyzer: SentimentAnalyzer, max_pending: int):
+        self.analyzer = analyzer
+        self.max_pending = max(max_pending, 1)
+        self.positive = 0
+        self.negative = 0
+        self.total = 0
+        self._carry = ""
+
+    def take(self, text: str, final: bool = False) -> Tuple[List[str]]:
+        if final:
+            texts = [self._carry + text]
+            self._carry = ""
+            return (texts,)
+
+        # A word may be split across pieces; hold back everything after the
+        # last whitespace, looking only at the new piece
+        texts = []
+        cut = LAST_WORD.search(text).start()
+        if cut > 0:
+            texts.append(self._carry + text[:cut])
+            self._carry = text[cut:]
+        else:
+            self._carry += text
+        if len(self._carry) > self.max_pending:
+            # No lexicon word is this long; count it as is rather than buffer it
+            texts.append(self._carry)
+            self._carry = ""
+        return (texts,)
+
+    def merge(self, analysis: Tuple[int, int, int], final: bool = False) -> Dict[str, Any]:
+        positive, negative, total = analysis
+        self.positive += positive
+        self.negative += negative
+        self.total += total
+        return self.analyzer.results_from_counts(
+            np.array([self.positive]), np.array([self.negative]), np.array([self.total])
+        )[0]
+
+
+class SummaryStream(StreamConsumer):
+    """
+    Keeps a rolling extractive summary over a stream of text.
+
+    Term sentence-frequencies are updated as sentences arrive, and only the
+    best ``max_candidates`` sentences that could fit in the summary are kept.
+    Candidates are rescored against the latest statistics whenever the pool
+    overflows, using the same TF-IDF weighting as ``TextSummarizer``.
+
+    Text without a sentence break is held back up to ``max_pending``
+    characters, then taken as a sentence of its own. The term table keeps
+    the ``max_terms`` most frequent terms once it doubles past that size;
+    a dropped term counts as seen once if it is met again.
+    """
+
+    analyze = staticmethod(split_sentences)
+
+    def __init__(self, max_length: int, max_candidates: int, max_pending: int, max_terms: int):
+        self.max_length = max_length
+        self.max_candidates = max(max_candidates, 1)
+        self.max_pending = max(max_pending, 1)
+        self.max_terms = max(max_terms, 1)
+        self.sentence_count = 0
+        self.document_frequency: Dict[str, int] = {}
+        self._candidates: List[Tuple[int, str, List[str], int]] = []  # (index, sentence, terms, tokens)
+        self._carry = ""
+
+    def take(self, text: str, final: bool = False) -> Tuple[str, bool, int, int]:
+        # The held-back sentence comes back from the analysis
+        text, self._carry = self._carry + text, ""
+        return text, final, self.max_pending, self.max_length
+
+    def merge(self, analysis: Tuple[List[Tuple[Optional[str], List[str], int]], str], final: bool = False) -> Any:
+        sentences, self._carry = analysis
+        for sentence, terms, token_count in sentences:
+            self._add(sentence, terms, token_count)
+        if final:
+            return self._summary()
+        return {"summary": self._summary(), "sentences": self.sentence_count}
+
+    def _add(self, sentence: Optional[str], terms: List[str], token_count: int) -> None:
+        for term in terms:
+            self.document_frequency[term] = self.document_frequency.get(term, 0) + 1
+        if len(self.document_frequency) > 2 * self.max_terms:
+            self.document_frequency = dict(heapq.nlargest(
+                self.max_terms, self.document_frequency.items(), key=lambda item: item[1]
+            ))
+
+        index = self.sentence_count
+        self.sentence_count += 1
+        if sentence is None:
+            return  # Can never be part of the summary
+
+        self._candidates.append((index, sentence, terms, token_count))
+        if len(self._candidates) > 2 * self.max_candidates:
+            self._candidates = self._ranked()[:self.max_candidates]
+
+    def _score(self, terms: List[str], token_count: int) -> float:
+        count = self.sentence_count
+        total = 0.0
+        for term in terms:
+            frequency = self.document_frequency.get(term, 1)
+            total += frequency / count * (math.log((1 + count) / (1 + frequency)) + 1)
+        return total / max(token_count, 1)
+
+    def _ranked(self) -> List[Tuple[int, str, List[str], int]]:
+        # Best score first, earlier sentence first on ties
+        return heapq.nsmallest(
+            len(self._candidates),
+            self._candidates,
+            key=lambda candidate: (-self._score(candidate[2], candidate[3]), candidate[0])
+        )
+
+    def _summary(self) -> str:
+        chosen = []
+        used = -1  # No separator before the first sentence
+        for candidate in self._ranked():
+            needed = len(candidate[1]) + 1
+            if used + needed <= self.max_length:
+                chosen.append(candidate)
+                used += needed
+
+        chosen.sort(key=lambda candidate: candidate[0])
+        return " ".join(candidate[1] for candidate in chosen).strip()
+
+
+def open_tool_stream(tool_name: str, params: Dict[str, Any]) -> StreamConsumer:
+    """
+    Create an incremental consumer for a streamable tool.
+
+    Raises:
+        ValueError: If the tool does not exist or cannot run incrementally
+    """
+    tool_service.get_tool(tool_name)
+    if tool_name == "sentiment_analyzer":
+        return SentimentStream(tool_service.sentiment_analyzer, max_pending=settings.STREAM_MAX_PENDING_CHARS)
+    if tool_name == "text_summarizer":
+        return SummaryStream(
+            max_length=int(params.get("max_length", 100)),
+            max_candidates=settings.STREAM_SUMMARY_CANDIDATES,
+            max_pending=settings.STREAM_MAX_PENDING_CHARS,
+            max_terms=settings.STREAM_SUMMARY_MAX_TERMS
+        )
+    raise ValueError(f"Tool '{tool_name}' does not support streaming")
@@ -0,0 +1,190 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..catalog import catalog
+from ..config import settings
+from ..database import SessionLocal
+from .models import ToolUsageLog
+
+
+class UsageLogWriter:
+    """
+    Buffers tool usage log rows and writes them in bulk from a background thread.
+
+    Rows are queued in a bounded in-memory queue and flushed when
+    ``batch_size`` rows are pending or ``flush_interval`` seconds have passed.
+    When the queue is full new rows are dropped and counted instead of
+    blocking the request that produced them. Rows whose tool cannot be found
+    in the catalog are counted as unresolved and logged.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_queue_size: int,
+        batch_size: int,
+        flush_interval: float
+    ):
+        self.session_factory = session_factory
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._written = 0
+        self._dropped = 0
+        self._unresolved = 0
+        self._failed = 0
+        self._flushes = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue one usage log row.
+
+        Rows carry ``tool_name`` instead of ``tool_id``. The name is resolved
+        against the catalog here, while the tool is known to exist; a tool
+        the catalog snapshot does not have yet, e.g. one added by another
+        process, is looked up again against a fresh snapshot when the row
+        is written.
+
+        Returns:
+            False if the row was dropped because the queue is full
+        """
+        self._ensure_started()
+        tool = catalog.get().tools_by_name.get(row["tool_name"])
+        if tool is not None:
+            row = {**row, "tool_id": tool.id}
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+    def submit_many(self, rows: List[Dict[str, Any]]) -> int:
+        """Queue many rows; returns how many were accepted."""
+        return sum(1 for row in rows if self.submit(row))
+
+    def start(self) -> None:
+        self._ensure_started()
+
+    def stop(self) -> None:
+        """Stop the writer thread and flush everything still queued."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=max(self.flush_interval * 4, 5))
+        self._thread = None
+        self._write(self._drain())
+        self._stop.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self._written,
+                "dropped": self._dropped,
+                "unresolved": self._unresolved,
+                "failed": self._failed,
+                "flushes": self._flushes,
+            }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="usage-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        pending: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stop.is_set():
+            try:
+                pending.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                pass
+
+            if len(pending) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(pending)
+                pending = []
+                deadline = time.monotonic() + self.flush_interval
+
+        self._write(pending)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+
+        db = self.session_factory()
+        pending = len(rows)
+        try:
+            records = self._resolve(rows)
+            pending = len(records)
+            if records:
+                db.execute(insert(ToolUsageLog), records)
+                db.commit()
+            with self._lock:
+                self._written += len(records)
+                self._flushes += 1
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                self._failed += pending
+            logging.error(f"Error writing {pending} tool usage logs: {str(e)}")
+        finally:
+            db.close()
+
+    def _resolve(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn queued rows into records, counting and logging those whose tool is unknown."""
+        records = []
+        unresolved = []
+        tool_ids = None
+        for row in rows:
+            tool_id = row.get("tool_id")
+            if tool_id is None:
+                if tool_ids is None:
+                    # Not found when it was queued: the snapshot may predate the tool
+                    catalog.invalidate()
+                    tool_ids = catalog.tool_ids_by_name()
+                tool_id = tool_ids.get(row["tool_name"])
+            if tool_id is None:
+                unresolved.append(row["tool_name"])
+            else:
+                records.append({**{k: v for k, v in row.items() if k != "tool_name"}, "tool_id": tool_id})
+
+        if unresolved:
+            with self._lock:
+                self._unresolved += len(unresolved)
+            logging.warning(
+                f"Dropped {len(unresolved)} tool usage logs for tools not in the catalog: "
+                f"{', '.join(sorted(set(unresolved)))}"
+            )
+        return records
+
+
+# Create singleton instance
+usage_log_writer = UsageLogWriter(
+    session_factory=SessionLocal,
+    max_queue_size=settings.USAGE_LOG_QUEUE_SIZE,
+    batch_size=settings.USAGE_LOG_BATCH_SIZE,
+    flush_interval=settings.USAGE_LOG_FLUSH_INTERVAL_SECONDS
+)
@@ -0,0 +1,104 @@
+"""
+Benchmark login latency and its effect on unrelated endpoints.
+
+Runs against a live server, e.g.:
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/bench_login.py --url http://localhost:8000 --concurrency 32
+
+It measures /health latency at rest, then fires a burst of concurrent logins
+while probing /health in parallel, and reports p50/p99 for both.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def report(name, samples, failures=0):
+    print(
+        f"{name:<24} n={len(samples):<6} "
+        f"p50={percentile(samples, 50):8.1f}ms p99={percentile(samples, 99):8.1f}ms "
+        f"max={max(samples) if samples else float('nan'):8.1f}ms failures={failures}"
+    )
+
+
+async def timed(client, method, path, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    return (time.perf_counter() - start) * 1000, response
+
+
+async def probe_health(client, stop, samples):
+    while not stop.is_set():
+        elapsed, _ = await timed(client, "GET", "/health")
+        samples.append(elapsed)
+        await asyncio.sleep(0.01)
+
+
+async def login_worker(client, credentials, count, samples, failures):
+    for _ in range(count):
+        elapsed, response = await timed(client, "POST", "/api/auth/login", data=credentials)
+        if response.status_code == 200:
+            samples.append(elapsed)
+        else:
+            failures.append(response.status_code)
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        username = f"bench_{uuid.uuid4().hex[:8]}"
+        credentials = {"username": username, "password": "bench-password"}
+        response = await client.post(
+            "/api/auth/register",
+            json={"username": username, "email": f"{username}@example.com", "password": "bench-password"}
+        )
+        response.raise_for_status()
+
+        # Baseline: /health with no login traffic
+        idle_samples = []
+        for _ in range(args.health_samples):
+            elapsed, _ = await timed(client, "GET", "/health")
+            idle_samples.append(elapsed)
+
+        # Burst: concurrent logins while /health is probed in the background
+        login_samples, login_failures, busy_samples = [], [], []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_health(client, stop, busy_samples))
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            login_worker(client, credentials, args.logins_per_worker, login_samples, login_failures)
+            for _ in range(args.concurrency)
+        ))
+        duration = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    report("/health (idle)", idle_samples)
+    report("/health (during logins)", busy_samples)
+    report("/api/auth/login", login_samples, len(login_failures))
+    if login_samples:
+        print(f"login throughput: {len(login_samples) / duration:.1f}/s "
+              f"(mean {statistics.mean(login_samples):.1f}ms)")
+    if login_failures:
+        print(f"rejected logins by status: { {s: login_failures.count(s) for s in set(login_failures)} }")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--logins-per-worker", type=int, default=4)
+    parser.add_argument("--health-samples", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""
+Benchmark batch sentiment scoring throughput on a single core.
+
+    python benchmarks/bench_sentiment.py --texts 200000
+
+Compares SentimentAnalyzer.analyze_batch with calling analyze per text and
+checks that both produce identical results.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tools.service import SentimentAnalyzer  # noqa: E402
+
+WORDS = (
+    "the a movie service was is very not really quite food staff place "
+    "good great excellent happy love best bad terrible awful sad hate poor worst"
+).split()
+
+
+def make_texts(count, min_words, max_words, seed):
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+        for _ in range(count)
+    ]
+
+
+def measure(fn, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = fn(texts)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main(args):
+    analyzer = SentimentAnalyzer()
+    texts = make_texts(args.texts, args.min_words, args.max_words, args.seed)
+
+    batch_time, batch_results = measure(analyzer.analyze_batch, texts, args.repeat)
+    single_time, single_results = measure(lambda items: [analyzer.analyze(t) for t in items], texts, 1)
+
+    print(f"texts: {len(texts)} ({args.min_words}-{args.max_words} words each)")
+    print(f"analyze_batch: {batch_time:.3f}s  {len(texts) / batch_time:,.0f} texts/s")
+    print(f"analyze loop:  {single_time:.3f}s  {len(texts) / single_time:,.0f} texts/s")
+    print(f"results identical: {batch_results == single_results}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=200000)
+    parser.add_argument("--min-words", type=int, default=3)
+    parser.add_argument("--max-words", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
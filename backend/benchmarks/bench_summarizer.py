@@ -0,0 +1,61 @@
+"""
+Benchmark the extractive summarizer on documents from 1 KB to 50 MB.
+
+    python benchmarks/bench_summarizer.py
+    python benchmarks/bench_summarizer.py --sizes 1K 1M 50M --max-length 500
+
+Prints time and throughput per size so the scaling curve can be checked
+(throughput should stay roughly flat as documents grow).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tools.service import TextSummarizer  # noqa: E402
+
+UNITS = {"K": 1024, "M": 1024 * 1024}
+
+
+def parse_size(value):
+    value = value.upper()
+    if value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+    return int(value)
+
+
+def make_document(size, vocabulary_size, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]  # Zipf-like word frequencies
+    sentences, length = [], 0
+    while length < size:
+        words = rng.choices(vocabulary, weights=weights, k=rng.randint(6, 28))
+        sentence = " ".join(words).capitalize() + rng.choice(".!?")
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[:size]
+
+
+def main(args):
+    summarizer = TextSummarizer()
+    print(f"{'size':>8} {'chars':>12} {'seconds':>9} {'MB/s':>8} {'summary':>8}")
+    for label in args.sizes:
+        document = make_document(parse_size(label), args.vocabulary, args.seed)
+        start = time.perf_counter()
+        summary = summarizer.summarize(document, max_length=args.max_length)
+        elapsed = time.perf_counter() - start
+        megabytes = len(document) / UNITS["M"]
+        print(f"{label:>8} {len(document):>12,} {elapsed:>9.3f} {megabytes / elapsed:>8.2f} {len(summary):>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1K", "10K", "100K", "1M", "10M", "50M"])
+    parser.add_argument("--max-length", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
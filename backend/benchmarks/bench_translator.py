@@ -0,0 +1,117 @@
+"""
+Benchmark the translator plugin's compiled phrase tables on a large lexicon.
+
+    python benchmarks/bench_translator.py --phrases 200000 --texts 20000
+
+Builds a synthetic lexicon of 1-4 word phrases, compiles it into per-pair
+phrase tables, and compares longest-match translation against probing a
+flat phrase dict with every n-gram length at each position. Also compares
+translate_batch over several target languages with one translate call per
+text and language, and checks that all approaches agree.
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+PLUGIN_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "plugins",
+    "text_translator.py"
+)
+TARGETS = ["es", "fr", "de", "it"]
+
+
+def load_translator():
+    spec = importlib.util.spec_from_file_location("text_translator", PLUGIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return list({"".join(rng.choice(letters) for _ in range(rng.randint(3, 8))) for _ in range(size)})
+
+
+def make_lexicon(count, vocabulary, max_words, rng):
+    phrases = {}
+    while len(phrases) < count:
+        phrase = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, max_words)))
+        phrases[phrase] = {target: f"{target}:{phrase.replace(' ', '_')}" for target in TARGETS}
+    return {"en": phrases}
+
+
+def make_texts(count, vocabulary, min_words, max_words, rng):
+    return [
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randint(min_words, max_words)))
+        for _ in range(count)
+    ]
+
+
+def ngram_translate(phrases, max_words, tokens):
+    """Baseline: probe a flat phrase dict with every n-gram length, longest first."""
+    output = []
+    position, count = 0, len(tokens)
+    while position < count:
+        for length in range(min(max_words, count - position), 0, -1):
+            translation = phrases.get(" ".join(tokens[position:position + length]))
+            if translation is not None:
+                output.append(translation)
+                position += length
+                break
+        else:
+            output.append(f"[{tokens[position]}]")
+            position += 1
+    return " ".join(output)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    translator = load_translator()
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    lexicon = make_lexicon(args.phrases, vocabulary, args.max_phrase_words, rng)
+    texts = make_texts(args.texts, vocabulary, args.min_words, args.max_words, rng)
+    token_lists = [text.lower().split() for text in texts]
+
+    compile_time, tables = timed(lambda: translator.compile_lexicon(lexicon))
+    table = tables[("en", "es")]
+    print(f"lexicon: {table.size:,} phrases x {len(TARGETS)} targets, compiled in {compile_time:.2f}s")
+    print(f"texts: {len(texts):,} ({args.min_words}-{args.max_words} words each)")
+
+    flat = {phrase: targets["es"] for phrase, targets in lexicon["en"].items()}
+    trie_time, trie_results = timed(lambda: [table.translate_tokens(tokens) for tokens in token_lists])
+    ngram_time, ngram_results = timed(lambda: [ngram_translate(flat, args.max_phrase_words, tokens) for tokens in token_lists])
+    print(f"phrase table: {trie_time:.3f}s  {len(texts) / trie_time:,.0f} texts/s")
+    print(f"n-gram probe: {ngram_time:.3f}s  {len(texts) / ngram_time:,.0f} texts/s")
+    print(f"results identical: {trie_results == ngram_results}")
+
+    plugin = translator.Plugin()
+    plugin.phrase_tables = tables
+    batch_time, batch = timed(lambda: plugin.translate_batch(texts, "en", TARGETS))
+    single_time, singles = timed(lambda: [
+        [plugin.translate(text, "en", target)["translated_text"] for target in TARGETS] for text in texts
+    ])
+    batch_texts = [[result["translations"][target] for target in TARGETS] for result in batch["results"]]
+    print(f"translate_batch ({len(TARGETS)} targets): {batch_time:.3f}s  {len(texts) / batch_time:,.0f} texts/s")
+    print(f"translate loop  ({len(TARGETS)} targets): {single_time:.3f}s  {len(texts) / single_time:,.0f} texts/s")
+    print(f"results identical: {batch_texts == singles}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, default=200000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--max-phrase-words", type=int, default=4)
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--min-words", type=int, default=5)
+    parser.add_argument("--max-words", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
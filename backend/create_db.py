@@ -1,12 +1,17 @@
-from app.database import Base, engine, SessionLocal
+import os
+from alembic import command
+from alembic.config import Config
+from app.database import SessionLocal
 from app.auth.models import User
 from app.auth.utils import get_password_hash
 from app.tools.models import Tool
 from app.plugins.models import Plugin
 
-# Create database tables
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+# Create or upgrade database tables
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    command.upgrade(Config(ALEMBIC_INI), "head")
     print("Database tables created.")
 
 # Add demo user
@@ -0,0 +1,39 @@
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.database import Base
+from app.auth.models import User
+from app.tools.models import Tool, ToolUsageLog, BulkJob
+from app.plugins.models import Plugin, PluginEnvironment
+from app.jobs.models import Job
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+config.set_main_option("sqlalchemy.url", settings.sqlalchemy_database_url)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_online():
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+    with connectable.connect() as connection:
+        # SQLite cannot alter constraints in place; batch mode rebuilds the table instead
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+# Migrations inspect the live schema, so there is no offline (--sql) mode
+run_migrations_online()
@@ -0,0 +1,88 @@
+"""Baseline schema: users, tools, usage logs and plugins
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created with ``Base.metadata.create_all`` before migrations
+existed already hold some or all of these tables, so each table is only
+created if it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("email", sa.String()),
+            sa.Column("username", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("is_admin", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "plugins" not in tables:
+        op.create_table(
+            "plugins",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.Text()),
+            sa.Column("version", sa.String()),
+            sa.Column("author_id", sa.String(), sa.ForeignKey("users.id")),
+            sa.Column("repository_url", sa.String(), nullable=True),
+            sa.Column("is_approved", sa.Boolean()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("file_path", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_plugins_name", "plugins", ["name"], unique=True)
+
+    if "tools" not in tables:
+        op.create_table(
+            "tools",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.Text()),
+            sa.Column("category", sa.String()),
+            sa.Column("is_core", sa.Boolean()),
+            sa.Column("plugin_id", sa.String(), sa.ForeignKey("plugins.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_tools_name", "tools", ["name"], unique=True)
+        op.create_index("ix_tools_category", "tools", ["category"])
+
+    if "tool_usage_logs" not in tables:
+        op.create_table(
+            "tool_usage_logs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("tool_id", sa.String(), sa.ForeignKey("tools.id")),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id")),
+            sa.Column("input_data", sa.Text()),
+            sa.Column("output_data", sa.Text()),
+            sa.Column("execution_time_ms", sa.Integer()),
+            sa.Column("status", sa.String()),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+
+def downgrade():
+    op.drop_table("tool_usage_logs")
+    op.drop_table("tools")
+    op.drop_table("plugins")
+    op.drop_table("users")
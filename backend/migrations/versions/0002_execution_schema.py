@@ -0,0 +1,144 @@
+"""Execution schema: usage log flags, plugin execution settings, jobs and environments
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Adds the usage log's cache_hit and coalesced flags, the plugin columns for
+artifacts, method index, budgets, backend, requirements and environment,
+and the plugin_environments, bulk_jobs and jobs tables. Tables and columns
+that ``create_all`` already added are left alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+USAGE_LOG_COLUMNS = [
+    sa.Column("cache_hit", sa.Boolean(), nullable=True),
+    sa.Column("coalesced", sa.Boolean(), nullable=True),
+]
+
+PLUGIN_COLUMNS = [
+    sa.Column("sha256", sa.String(), nullable=True),
+    sa.Column("size_bytes", sa.Integer(), nullable=True),
+    sa.Column("signature", sa.Text(), nullable=True),
+    sa.Column("max_wall_seconds", sa.Integer(), nullable=True),
+    sa.Column("max_cpu_seconds", sa.Integer(), nullable=True),
+    sa.Column("execution_backend", sa.String(), nullable=True),
+    sa.Column("requirements", sa.Text(), nullable=True),
+    sa.Column("environment_id", sa.String(), nullable=True),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "plugin_environments" not in tables:
+        op.create_table(
+            "plugin_environments",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("runtime", sa.String()),
+            sa.Column("requirements", sa.Text()),
+            sa.Column("status", sa.String()),
+            sa.Column("location", sa.String()),
+            sa.Column("parent_id", sa.String(), nullable=True),
+            sa.Column("size_bytes", sa.BigInteger()),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("build_time_ms", sa.Integer(), nullable=True),
+            sa.Column("worker_id", sa.String(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_plugin_environments_status", "plugin_environments", ["status"])
+
+    existing = {column["name"] for column in inspector.get_columns("tool_usage_logs")}
+    with op.batch_alter_table("tool_usage_logs") as batch:
+        for column in USAGE_LOG_COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column)
+
+    existing = {column["name"] for column in inspector.get_columns("plugins")}
+    with op.batch_alter_table("plugins") as batch:
+        for column in PLUGIN_COLUMNS:
+            if column.name not in existing:
+                batch.add_column(column)
+        if "environment_id" not in existing:
+            batch.create_foreign_key(
+                "fk_plugins_environment_id", "plugin_environments", ["environment_id"], ["id"]
+            )
+        if "sha256" not in existing:
+            batch.create_index("ix_plugins_sha256", ["sha256"])
+
+    if "bulk_jobs" not in tables:
+        op.create_table(
+            "bulk_jobs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id")),
+            sa.Column("tool_name", sa.String()),
+            sa.Column("params", sa.Text()),
+            sa.Column("input_format", sa.String()),
+            sa.Column("text_field", sa.String()),
+            sa.Column("input_path", sa.String()),
+            sa.Column("output_path", sa.String()),
+            sa.Column("input_size", sa.BigInteger()),
+            sa.Column("status", sa.String()),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("input_offset", sa.BigInteger()),
+            sa.Column("output_offset", sa.BigInteger()),
+            sa.Column("records_processed", sa.Integer()),
+            sa.Column("records_failed", sa.Integer()),
+            sa.Column("processing_ms", sa.BigInteger()),
+            sa.Column("worker_id", sa.String(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_bulk_jobs_tool_name", "bulk_jobs", ["tool_name"])
+        op.create_index("ix_bulk_jobs_status", "bulk_jobs", ["status"])
+
+    if "jobs" not in tables:
+        op.create_table(
+            "jobs",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.String(), sa.ForeignKey("users.id")),
+            sa.Column("kind", sa.String()),
+            sa.Column("target", sa.String()),
+            sa.Column("method_name", sa.String(), nullable=True),
+            sa.Column("params", sa.Text()),
+            sa.Column("priority", sa.Integer()),
+            sa.Column("timeout_seconds", sa.Integer()),
+            sa.Column("status", sa.String()),
+            sa.Column("result", sa.Text(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("attempts", sa.Integer()),
+            sa.Column("execution_time_ms", sa.Integer(), nullable=True),
+            sa.Column("worker_id", sa.String(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_jobs_priority", "jobs", ["priority"])
+        op.create_index("ix_jobs_status", "jobs", ["status"])
+        op.create_index("ix_jobs_created_at", "jobs", ["created_at"])
+
+
+def downgrade():
+    op.drop_table("jobs")
+    op.drop_table("bulk_jobs")
+    with op.batch_alter_table("plugins") as batch:
+        batch.drop_constraint("fk_plugins_environment_id", type_="foreignkey")
+        batch.drop_index("ix_plugins_sha256")
+        for column in reversed(PLUGIN_COLUMNS):
+            batch.drop_column(column.name)
+    with op.batch_alter_table("tool_usage_logs") as batch:
+        for column in reversed(USAGE_LOG_COLUMNS):
+            batch.drop_column(column.name)
+    op.drop_table("plugin_environments")
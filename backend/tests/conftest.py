@@ -0,0 +1,24 @@
+"""Shared fixtures: a throwaway SQLite database with every table."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import models as auth_models  # noqa: F401 - registers the tables
+from app.catalog import catalog
+from app.database import Base
+from app.jobs import models as job_models  # noqa: F401
+from app.plugins import models as plugin_models  # noqa: F401
+from app.tools import models as tool_models  # noqa: F401
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    """A session factory bound to a fresh database; the catalog reads from it too."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(catalog, "session_factory", factory)
+    catalog.invalidate()
+    yield factory
+    catalog.invalidate()
+    engine.dispose()
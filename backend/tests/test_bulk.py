@@ -0,0 +1,65 @@
+"""Bulk jobs only write progress while they hold the lease, and read files with a BOM."""
+import json
+
+import pytest
+
+from app.tools.bulk import BulkJobRunner, JobTakenOver, read_csv_header, read_records
+from app.tools.models import BulkJob
+
+BOM = b"\xef\xbb\xbf"
+
+
+def make_runner(session_factory) -> BulkJobRunner:
+    return BulkJobRunner(session_factory, batch_size=10, workers=1, max_running=1, poll_interval=1, stale_after=30)
+
+
+def test_progress_is_written_while_the_lease_is_held(session_factory):
+    runner = make_runner(session_factory)
+    db = session_factory()
+    db.add(BulkJob(id="b1", tool_name="sentiment_analyzer", status="running", worker_id=runner.worker_id))
+    db.commit()
+    job = db.get(BulkJob, "b1")
+
+    runner._update(db, job, {"input_offset": 100, "records_processed": BulkJob.records_processed + 3})
+
+    assert job.input_offset == 100
+    assert job.records_processed == 3
+
+
+def test_progress_is_not_written_after_a_takeover(session_factory):
+    runner = make_runner(session_factory)
+    db = session_factory()
+    db.add(BulkJob(id="b1", tool_name="sentiment_analyzer", status="running", worker_id=runner.worker_id))
+    db.commit()
+    job = db.get(BulkJob, "b1")  # This process's copy, read before the takeover
+
+    other = session_factory()
+    other.query(BulkJob).filter(BulkJob.id == "b1").update({"worker_id": "new-owner", "input_offset": 500})
+    other.commit()
+
+    with pytest.raises(JobTakenOver):
+        runner._update(db, job, {"input_offset": 100, "status": "completed"})
+
+    other.expire_all()
+    row = other.get(BulkJob, "b1")
+    assert (row.worker_id, row.input_offset, row.status) == ("new-owner", 500, "running")
+
+
+def test_csv_header_with_bom(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_bytes(BOM + b"id,text\n1,good\n2,bad\n")
+
+    header, _ = read_csv_header(str(path))
+    records = list(read_records(str(path), "csv", "text"))
+
+    assert header == ["id", "text"]
+    assert [(record_id, text) for _, record_id, text, _ in records] == [("1", "good"), ("2", "bad")]
+
+
+def test_ndjson_with_bom(tmp_path):
+    path = tmp_path / "input.ndjson"
+    path.write_bytes(BOM + json.dumps({"id": 1, "text": "good"}).encode() + b"\n")
+
+    records = list(read_records(str(path), "ndjson", "text"))
+
+    assert [(record_id, text, error) for _, record_id, text, error in records] == [(1, "good", None)]
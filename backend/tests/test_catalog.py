@@ -0,0 +1,73 @@
+"""Catalog listings carry an ETag and answer a matching If-None-Match with 304."""
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.utils import get_current_active_user
+from app.catalog import catalog
+from app.database import get_db
+from app.plugins import routes as plugin_routes
+from app.tools import routes as tool_routes
+from app.tools.models import Tool
+
+
+@pytest.fixture
+def client(session_factory):
+    app = FastAPI()
+    app.include_router(tool_routes.router, prefix="/api/tools")
+    app.include_router(plugin_routes.router, prefix="/api/plugins")
+
+    def get_test_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id="u1", is_admin=False, is_active=True)
+    return TestClient(app)
+
+
+def add_tool(session_factory, name: str) -> None:
+    db = session_factory()
+    db.add(Tool(name=name, description=name, category="text", is_core=True))
+    db.commit()
+    db.close()
+
+
+@pytest.mark.parametrize("path", ["/api/tools/", "/api/plugins/"])
+def test_matching_etag_is_not_modified(client, path):
+    first = client.get(path)
+    etag = first.headers["ETag"]
+
+    again = client.get(path, headers={"If-None-Match": etag})
+    other = client.get(path, headers={"If-None-Match": 'W/"stale", ' + etag})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+    assert other.status_code == 304
+
+
+def test_etag_changes_when_the_catalog_changes(client, session_factory):
+    add_tool(session_factory, "sentiment_analyzer")
+    etag = client.get("/api/tools/").headers["ETag"]
+
+    add_tool(session_factory, "text_summarizer")
+    catalog.invalidate()  # As every write route does
+    response = client.get("/api/tools/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [tool["name"] for tool in response.json()] == ["sentiment_analyzer", "text_summarizer"]
+
+
+def test_etag_depends_on_the_page(client, session_factory):
+    add_tool(session_factory, "sentiment_analyzer")
+    etag = client.get("/api/tools/?limit=1").headers["ETag"]
+
+    assert client.get("/api/tools/?limit=2", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,143 @@
+"""
+Isolation guarantees of the forkserver sandbox backend.
+
+These start a real runner, so they are skipped where the kernel or the
+Python installation does not allow the runner to isolate itself.
+"""
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import textwrap
+
+import pytest
+
+from app.plugins.forkserver import RUNNER_PATH, ForkServerSandbox
+from app.plugins.pool import PROTOCOL_PATH, PluginBudgetExceeded, PluginCallError
+
+PLUGIN_SOURCE = textwrap.dedent('''
+    import ctypes
+    import os
+    import time
+
+    libc = ctypes.CDLL(None, use_errno=True)
+
+
+    class Plugin:
+        def identity(self):
+            try:
+                os.setuid(0)
+                regained_root = True
+            except OSError:
+                regained_root = False
+            return {"uid": os.getuid(), "pid": os.getpid(), "regained_root": regained_root}
+
+        def signal(self, pid):
+            os.kill(pid, 9)
+
+        def syscall(self, number):
+            return [libc.syscall(number, 0, 0, 0, 0, 0), ctypes.get_errno()]
+
+        def fork_bomb(self, limit):
+            started = 0
+            try:
+                while started < limit:
+                    if os.fork() == 0:
+                        time.sleep(60)
+                        os._exit(0)
+                    started += 1
+            except OSError:
+                pass
+            return started
+
+        def detach(self):
+            if os.fork() == 0:
+                os.setsid()
+                time.sleep(60)
+                os._exit(0)
+
+        def hang(self):
+            self.detach()
+            time.sleep(60)
+''')
+
+# name_to_handle_at, open_by_handle_at, init_module, finit_module, kexec_load,
+# process_vm_writev, setns, bpf, io_uring_setup, kill, socket and execve on x86_64
+X86_64_DENIED = [303, 304, 175, 313, 246, 311, 308, 321, 425, 62, 41, 59]
+
+
+@pytest.fixture
+def sandbox():
+    workdir = tempfile.mkdtemp(prefix="repoai-plugin-")
+    shutil.copy(RUNNER_PATH, os.path.join(workdir, "runner.py"))
+    shutil.copy(PROTOCOL_PATH, os.path.join(workdir, "protocol.py"))
+    with open(os.path.join(workdir, "probe.py"), "w") as f:
+        f.write(PLUGIN_SOURCE)
+
+    sandbox = ForkServerSandbox(workdir, "probe.py")
+    sandbox.start()
+    try:
+        try:
+            sandbox.call("identity", {}, wall_seconds=10)
+        except PluginCallError as e:
+            pytest.skip(f"Forkserver isolation unavailable: {e}")
+        yield sandbox
+    finally:
+        sandbox.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def sandbox_processes(sandbox):
+    """Host pids of every process running from the sandbox's directory."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                if sandbox.workdir.encode() in f.read():
+                    pids.append(int(entry))
+        except (OSError, ValueError):
+            continue
+    return pids
+
+
+def test_plugin_runs_unprivileged_in_own_pid_namespace(sandbox):
+    identity = sandbox.call("identity", {}, wall_seconds=10)
+    assert identity["uid"] != 0
+    assert not identity["regained_root"]
+    # The runner is the namespace's init and the call its child
+    assert identity["pid"] < 10
+
+
+def test_plugin_cannot_signal_process_outside_sandbox(sandbox):
+    victim = subprocess.Popen(["sleep", "30"])
+    try:
+        with pytest.raises(PluginCallError):
+            sandbox.call("signal", {"pid": victim.pid}, wall_seconds=10)
+        assert victim.poll() is None
+    finally:
+        victim.kill()
+        victim.wait()
+
+
+@pytest.mark.skipif(platform.machine() != "x86_64", reason="syscall numbers are for x86_64")
+def test_dangerous_syscalls_are_denied(sandbox):
+    for number in X86_64_DENIED:
+        result, error = sandbox.call("syscall", {"number": number}, wall_seconds=10)
+        assert (result, error) == (-1, 1), f"syscall {number} was not denied"
+
+
+def test_process_count_is_bounded_and_reaped(sandbox):
+    started = sandbox.call("fork_bomb", {"limit": 10000}, wall_seconds=30)
+    assert started < 200
+    # Only the runner and its waiting parent are left
+    assert len(sandbox_processes(sandbox)) == 2
+
+
+def test_detached_processes_do_not_outlive_their_call(sandbox):
+    sandbox.call("detach", {}, wall_seconds=10)
+    assert len(sandbox_processes(sandbox)) == 2
+
+    with pytest.raises(PluginBudgetExceeded):
+        sandbox.call("hang", {}, wall_seconds=1)
+    assert len(sandbox_processes(sandbox)) == 2
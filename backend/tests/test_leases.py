@@ -0,0 +1,71 @@
+"""Job and bulk job rows are claimed by one process at a time and taken over once stale."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.jobs.models import Job
+from app.leases import Leases
+from app.tools.models import BulkJob
+
+MODELS = [
+    pytest.param(lambda **columns: Job(kind="tool", target="sentiment_analyzer", **columns), Job, id="job"),
+    pytest.param(lambda **columns: BulkJob(tool_name="sentiment_analyzer", **columns), BulkJob, id="bulk"),
+]
+
+
+@pytest.mark.parametrize("make, model", MODELS)
+def test_queued_row_is_claimed_by_one_process(session_factory, make, model):
+    db = session_factory()
+    db.add(make(id="j1", status="queued"))
+    db.commit()
+    first = Leases(session_factory, model, stale_after=30)
+    second = Leases(session_factory, model, stale_after=30)
+
+    assert first.claim(db, 10, [model.created_at]) == ["j1"]
+    assert second.claim(db, 10, [model.created_at]) == []
+
+    db.expire_all()
+    row = db.get(model, "j1")
+    assert row.status == "running"
+    assert row.worker_id == first.worker_id
+
+
+@pytest.mark.parametrize("make, model", MODELS)
+def test_live_lease_is_not_taken_over(session_factory, make, model):
+    first = Leases(session_factory, model, stale_after=30)
+    second = Leases(session_factory, model, stale_after=30)
+    db = session_factory()
+    db.add(make(id="j1", status="running", worker_id=first.worker_id, heartbeat_at=datetime.utcnow()))
+    db.commit()
+
+    assert second.claim(db, 10, [model.created_at]) == []
+
+
+@pytest.mark.parametrize("make, model", MODELS)
+def test_stale_lease_is_taken_over_and_old_owner_loses_it(session_factory, make, model):
+    first = Leases(session_factory, model, stale_after=30)
+    second = Leases(session_factory, model, stale_after=30)
+    db = session_factory()
+    stale = datetime.utcnow() - timedelta(seconds=60)
+    db.add(make(id="j1", status="running", worker_id=first.worker_id, heartbeat_at=stale))
+    db.commit()
+
+    assert second.claim(db, 10, [model.created_at]) == ["j1"]
+
+    # The old owner's heartbeat no longer touches the row
+    first.renew(db, ["j1"])
+    db.expire_all()
+    row = db.get(model, "j1")
+    assert row.worker_id == second.worker_id
+    assert db.query(model).filter(first.owned(["j1"])).count() == 0
+    assert db.query(model).filter(second.owned(["j1"])).count() == 1
+
+
+def test_claim_honours_extra_conditions(session_factory):
+    db = session_factory()
+    db.add(Job(id="tool", kind="tool", target="sentiment_analyzer", status="queued"))
+    db.add(Job(id="plugin", kind="plugin", target="p1", status="queued"))
+    db.commit()
+    leases = Leases(session_factory, Job, stale_after=30)
+
+    assert leases.claim(db, 10, [Job.created_at], where=[Job.kind == "plugin"]) == ["plugin"]
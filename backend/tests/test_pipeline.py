@@ -0,0 +1,69 @@
+"""Pipelines run as a DAG: steps after the steps they read, cycles rejected, failures skipped."""
+import asyncio
+
+import pytest
+
+from app.tools.pipeline import plan_pipeline, run_pipeline
+
+TEXT = "The service was great. The food was awful. Overall a good evening and a great movie afterwards."
+
+
+def step(step_id, tool_name="sentiment_analyzer", params=None, **inputs):
+    return {"id": step_id, "tool_name": tool_name, "params": params or {}, "inputs": inputs}
+
+
+def test_steps_are_ordered_after_what_they_read():
+    steps = [
+        step("score", text="summary"),
+        step("summary", "text_summarizer", text="input"),
+        step("raw"),
+    ]
+
+    order = plan_pipeline(steps)
+
+    assert order.index("summary") < order.index("score")
+    assert order == ["summary", "raw", "score"]  # Request order among steps that are ready together
+
+
+@pytest.mark.parametrize("steps, message", [
+    ([step("a", text="b"), step("b", text="a")], "cycle"),
+    ([step("a", text="a")], "cycle"),
+    ([step("a", text="missing")], "unknown step"),
+    ([step("a"), step("a")], "Duplicate"),
+    ([step("input")], "Invalid step id"),
+    ([], "no steps"),
+])
+def test_invalid_pipelines_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        plan_pipeline(steps)
+
+
+def test_dependent_step_starts_after_its_source_finishes(session_factory):
+    steps = [
+        step("score", text="summary"),
+        step("summary", "text_summarizer", params={"max_length": 40}),
+    ]
+
+    outcome = asyncio.run(run_pipeline(TEXT, steps, None))
+
+    summary, score = outcome["steps"][1], outcome["steps"][0]
+    assert outcome["status"] == "success"
+    assert score["started_ms"] >= summary["finished_ms"]
+
+
+def test_failure_skips_every_step_downstream(session_factory):
+    steps = [
+        step("bad", "text_summarizer", params={"max_length": "long"}),
+        step("after", text="bad"),
+        step("after_after", "text_summarizer", text="after"),
+        step("independent"),
+    ]
+
+    outcome = asyncio.run(run_pipeline(TEXT, steps, None))
+
+    statuses = {result["id"]: result["status"] for result in outcome["steps"]}
+    assert outcome["status"] == "error"
+    assert statuses == {"bad": "error", "after": "skipped", "after_after": "skipped", "independent": "success"}
+    skipped = {result["id"]: result["result"]["error"] for result in outcome["steps"] if result["status"] == "skipped"}
+    assert "'bad'" in skipped["after"]
+    assert "'after'" in skipped["after_after"]
@@ -0,0 +1,86 @@
+"""Cached plugin results are never served for a plugin that has changed."""
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.plugins.calls import call_plugin
+from app.plugins.executor import plugin_executor
+from app.tools.cache import result_cache
+
+SOURCE = '''
+RUNS = []
+
+class Plugin:
+    {policy}
+
+    def run(self):
+        RUNS.append(1)
+        return {{"version": {version}, "runs": len(RUNS)}}
+'''
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+    result_cache.clear()
+    path = str(tmp_path / "counter.py")
+    write_plugin(path, version=1)
+    yield SimpleNamespace(
+        id="p1",
+        version="1",
+        file_path=path,
+        execution_backend="local",
+        environment_id=None,
+        max_wall_seconds=None,
+        max_cpu_seconds=None
+    )
+    plugin_executor.unload(path)
+    result_cache.clear()
+
+
+def write_plugin(path: str, version: int, cacheable: bool = True) -> None:
+    with open(path, "w") as f:
+        f.write(SOURCE.format(policy="cacheable = True" if cacheable else "pass", version=version))
+    # Make sure the change is seen even within one mtime tick
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9 * version))
+
+
+def call(plugin):
+    return asyncio.run(call_plugin(plugin, "run", {}, "u1", 1.0))
+
+
+def test_repeated_call_is_served_from_cache(plugin):
+    first = call(plugin)
+    second = call(plugin)
+
+    assert first["result"] == {"version": 1, "runs": 1}
+    assert "cache_hit" not in first
+    assert second == {"result": {"version": 1, "runs": 1}, "cache_hit": True}
+
+
+def test_new_plugin_version_is_not_served_from_cache(plugin):
+    call(plugin)
+
+    write_plugin(plugin.file_path, version=2)
+    plugin.version = "2"
+    outcome = call(plugin)
+
+    assert "cache_hit" not in outcome
+    assert outcome["result"]["version"] == 2
+
+
+def test_withdrawn_cache_policy_is_honoured(plugin):
+    call(plugin)
+
+    write_plugin(plugin.file_path, version=3, cacheable=False)
+    plugin.version = "3"
+    first = call(plugin)
+    second = call(plugin)
+
+    assert "cache_hit" not in first
+    assert "cache_hit" not in second
+    assert second["result"]["runs"] == first["result"]["runs"] + 1
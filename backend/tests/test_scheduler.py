@@ -0,0 +1,125 @@
+"""The plugin scheduler shares slots fairly by weight and caps what each user can queue."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.plugins import routes
+from app.plugins.scheduler import PluginScheduler, SchedulerRejected
+
+
+async def nap(seconds: float, starts: list, user: str) -> None:
+    starts.append(user)
+    await asyncio.sleep(seconds)
+
+
+def run_backlogs(scheduler: PluginScheduler, backlogs, seconds: float) -> list:
+    """Queue each ``(user, weight, calls)`` backlog in order and return the order calls started in."""
+    starts = []
+
+    async def main():
+        tasks = []
+        for user, weight, calls in backlogs:
+            tasks += [asyncio.ensure_future(scheduler.run_async(user, weight, nap, seconds, starts, user)) for _ in range(calls)]
+            await asyncio.sleep(0)  # Let this backlog queue before the next one arrives
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return starts
+
+
+def test_backlogged_user_does_not_starve_another():
+    scheduler = PluginScheduler(max_concurrent=1, max_per_user=1, max_queued_per_user=100, queue_timeout=10)
+
+    starts = run_backlogs(scheduler, [("a", 1.0, 6), ("b", 1.0, 2)], seconds=0.02)
+
+    # First come, first served would run both of b's calls last
+    assert starts[0] == "a"
+    assert max(index for index, user in enumerate(starts) if user == "b") <= 3
+
+
+def test_slots_are_shared_in_proportion_to_weight():
+    scheduler = PluginScheduler(max_concurrent=1, max_per_user=1, max_queued_per_user=100, queue_timeout=10)
+
+    starts = run_backlogs(scheduler, [("a", 1.0, 8), ("b", 3.0, 8)], seconds=0.03)
+
+    assert starts[:8].count("b") >= 5
+
+
+def test_per_user_cap_leaves_slots_for_others():
+    scheduler = PluginScheduler(max_concurrent=3, max_per_user=2, max_queued_per_user=100, queue_timeout=10)
+    running = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def work(user):
+        running[user] += 1
+        peak[user] = max(peak[user], running[user])
+        await asyncio.sleep(0.02)
+        running[user] -= 1
+
+    async def main():
+        calls = [scheduler.run_async("a", 1.0, work, "a") for _ in range(5)]
+        calls += [scheduler.run_async("b", 1.0, work, "b") for _ in range(2)]
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+    assert peak == {"a": 2, "b": 1}
+
+
+def test_full_queue_is_rejected_for_that_user_only():
+    scheduler = PluginScheduler(max_concurrent=4, max_per_user=1, max_queued_per_user=1, queue_timeout=10)
+
+    async def main():
+        release = asyncio.Event()
+        running = asyncio.ensure_future(scheduler.run_async("a", 1.0, release.wait))
+        queued = asyncio.ensure_future(scheduler.run_async("a", 1.0, release.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerRejected) as rejected:
+            await scheduler.run_async("a", 1.0, release.wait)
+        assert rejected.value.queue_full
+
+        await asyncio.wait_for(scheduler.run_async("b", 1.0, asyncio.sleep, 0), 1)
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_queue_timeout_is_rejected_without_queue_full():
+    scheduler = PluginScheduler(max_concurrent=1, max_per_user=1, max_queued_per_user=10, queue_timeout=0.05)
+
+    async def main():
+        release = asyncio.Event()
+        running = asyncio.ensure_future(scheduler.run_async("a", 1.0, release.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(SchedulerRejected) as rejected:
+            await scheduler.run_async("b", 1.0, asyncio.sleep, 0)
+        assert not rejected.value.queue_full
+
+        release.set()
+        await running
+
+    asyncio.run(main())
+    assert scheduler.stats()["timed_out"] == 1
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.parametrize("queue_full, status_code", [(True, 429), (False, 503)])
+def test_rejections_map_to_status_codes(monkeypatch, queue_full, status_code):
+    async def rejected(*args, **kwargs):
+        raise SchedulerRejected("Too many queued plugin calls", retry_after=7, queue_full=queue_full)
+
+    monkeypatch.setattr(routes, "call_plugin", rejected)
+    plugin = SimpleNamespace(id="p1", is_approved=True, is_active=True, signature=None)
+    request = routes.PluginExecuteRequest(plugin_id="p1", method_name="run", params={})
+    user = SimpleNamespace(id="u1", is_admin=False)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(routes.run_plugin_call(plugin, request, user))
+
+    assert error.value.status_code == status_code
+    assert error.value.headers["Retry-After"] == "7"
@@ -0,0 +1,72 @@
+"""Identical concurrent calls share one run, its result and its error."""
+import asyncio
+
+import pytest
+
+from app.execution import SingleFlight
+
+
+def test_identical_calls_share_one_run():
+    flight = SingleFlight("test")
+    runs = []
+
+    async def work(value):
+        runs.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(
+            flight.run("k", work, 1), flight.run("k", work, 1), flight.run("other", work, 5)
+        )
+
+    results = asyncio.run(main())
+
+    assert results == [(2, False), (2, True), (10, False)]
+    assert runs == [1, 5]
+    assert flight.stats() == {"in_flight": 0, "executions": 2, "coalesced": 1}
+
+
+def test_error_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight("test")
+    runs = 0
+
+    async def fail():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        results = await asyncio.gather(*(flight.run("k", fail) for _ in range(3)), return_exceptions=True)
+        assert [type(result) for result in results] == [ValueError] * 3
+        assert all(str(result) == "boom" for result in results)
+        assert runs == 1
+
+        # A failed run is forgotten, so the next call runs again
+        with pytest.raises(ValueError):
+            await flight.run("k", fail)
+        assert runs == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run("k", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await follower == ("done", True)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+"""Map-reduce summarization gives the same output however its map step runs."""
+import asyncio
+import random
+
+import pytest
+
+from app.config import settings
+from app.tools.service import TextSummarizer, tool_service
+
+WORDS = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda sigma tau omega".split()
+
+
+def make_text(sentences: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8])
+def test_parallel_summary_matches_serial(monkeypatch, workers):
+    monkeypatch.setattr(settings, "CPU_EXECUTOR_WORKERS", 8)
+    text = make_text(2000)
+    params = {"text": text, "max_length": 300, "mode": "parallel", "chunk_size": 4000, "workers": workers}
+
+    serial = TextSummarizer().summarize_parallel(text, max_length=300, chunk_size=4000)
+    outcome = asyncio.run(tool_service.summarize_parallel_async(params))
+
+    assert outcome["status"] == "success"
+    assert outcome["result"] == serial
+    assert len(TextSummarizer().split_chunks(text, 4000)) > workers
+
+
+def test_parallel_summary_of_single_chunk_is_plain_summary():
+    text = make_text(20)
+    params = {"text": text, "max_length": 120, "parallel": True}
+
+    outcome = asyncio.run(tool_service.summarize_parallel_async(params))
+
+    assert outcome["result"] == TextSummarizer().summarize(text, max_length=120)
+
+
+def test_parallel_summary_reports_invalid_params():
+    outcome = asyncio.run(tool_service.summarize_parallel_async({"text": "x", "max_length": "long", "parallel": True}))
+
+    assert outcome["status"] == "error"
@@ -1,102 +1,215 @@
+from typing import Dict, List, Optional, Tuple
+
+LANGUAGES = {
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "ru": "Russian",
+    "zh": "Chinese",
+    "ja": "Japanese",
+    "ko": "Korean",
+}
+
+# Simple translation dictionary (for demo purposes only): source language ->
+# phrase -> target language -> translation. A real implementation would use
+# a proper translation service.
+TRANSLATIONS = {
+    "en": {
+        "hello": {
+            "es": "hola",
+            "fr": "bonjour",
+            "de": "hallo",
+            "it": "ciao",
+            "pt": "olá",
+            "ru": "привет",
+            "zh": "你好",
+            "ja": "こんにちは",
+            "ko": "안녕하세요",
+        },
+        "goodbye": {
+            "es": "adiós",
+            "fr": "au revoir",
+            "de": "auf wiedersehen",
+            "it": "arrivederci",
+            "pt": "adeus",
+            "ru": "до свидания",
+            "zh": "再见",
+            "ja": "さようなら",
+            "ko": "안녕히 가세요",
+        },
+        "thank you": {
+            "es": "gracias",
+            "fr": "merci",
+            "de": "danke",
+            "it": "grazie",
+            "pt": "obrigado",
+            "ru": "спасибо",
+            "zh": "谢谢",
+            "ja": "ありがとう",
+            "ko": "감사합니다",
+        },
+    },
+}
+
+PHRASE_END = ""  # Trie key holding the translation of the phrase ending at a node; never a token
+
+
+class PhraseTable:
+    """
+    One language pair's lexicon compiled into a word-level trie.
+
+    Phrases are matched on lowercase whitespace tokens, longest phrase first,
+    so "thank you" wins over a translation of "thank" alone. Matching costs
+    at most one dict lookup per token of the longest phrase starting at each
+    position, independent of the lexicon size.
+    """
+
+    def __init__(self, phrases: Dict[str, str]):
+        self.root: dict = {}
+        self.size = 0
+        for phrase, translation in phrases.items():
+            tokens = phrase.lower().split()
+            if not tokens:
+                continue
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            if PHRASE_END not in node:
+                self.size += 1
+            node[PHRASE_END] = translation
+
+    def translate_tokens(self, tokens: List[str]) -> str:
+        """Translate lowercase tokens; untranslated tokens are kept in brackets."""
+        root = self.root
+        output = []
+        position, count = 0, len(tokens)
+        while position < count:
+            node = root
+            match, match_end = None, position
+            index = position
+            while index < count:
+                node = node.get(tokens[index])
+                if node is None:
+                    break
+                index += 1
+                translation = node.get(PHRASE_END)
+                if translation is not None:
+                    match, match_end = translation, index
+
+            if match is None:
+                # If no translation is available, keep the original word
+                output.append(f"[{tokens[position]}]")
+                position += 1
+            else:
+                output.append(match)
+                position = match_end
+        return " ".join(output)
+
+
+def compile_lexicon(translations: Dict[str, Dict[str, Dict[str, str]]]) -> Dict[Tuple[str, str], PhraseTable]:
+    """Compile a source -> phrase -> target -> translation lexicon into one phrase table per language pair."""
+    pairs: Dict[Tuple[str, str], Dict[str, str]] = {}
+    for source_lang, phrases in translations.items():
+        for phrase, targets in phrases.items():
+            for target_lang, translation in targets.items():
+                pairs.setdefault((source_lang, target_lang), {})[phrase] = translation
+    return {pair: PhraseTable(phrases) for pair, phrases in pairs.items()}
+
+
+# Compiled once per process and shared by every Plugin instance
+PHRASE_TABLES = compile_lexicon(TRANSLATIONS)
+EMPTY_TABLE = PhraseTable({})
+
+
 class Plugin:
     """Example plugin for text translation."""
-    
+
+    # Translations are deterministic, so results may be served from the cache
+    cacheable = True
+
     def __init__(self):
-        # In a real plugin, you might initialize models or API clients here
-        self.languages = {
-            "en": "English",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "pt": "Portuguese",
-            "ru": "Russian",
-            "zh": "Chinese",
-            "ja": "Japanese",
-            "ko": "Korean",
-        }
-        
-        # Simple translation dictionary (for demo purposes only)
-        # A real implementation would use a proper translation service
-        self.translations = {
-            "hello": {
-                "es": "hola",
-                "fr": "bonjour",
-                "de": "hallo",
-                "it": "ciao",
-                "pt": "olá",
-                "ru": "привет",
-                "zh": "你好",
-                "ja": "こんにちは",
-                "ko": "안녕하세요",
-            },
-            "goodbye": {
-                "es": "adiós",
-                "fr": "au revoir",
-                "de": "auf wiedersehen",
-                "it": "arrivederci",
-                "pt": "adeus",
-                "ru": "до свидания",
-                "zh": "再见",
-                "ja": "さようなら",
-                "ko": "안녕히 가세요",
-            },
-            "thank you": {
-                "es": "gracias",
-                "fr": "merci",
-                "de": "danke",
-                "it": "grazie",
-                "pt": "obrigado",
-                "ru": "спасибо",
-                "zh": "谢谢",
-                "ja": "ありがとう",
-                "ko": "감사합니다",
-            }
-        }
-    
+        self.languages = LANGUAGES
+        self.phrase_tables = PHRASE_TABLES
+
+    def _check_languages(self, source_lang: str, target_langs: List[str]) -> None:
+        if source_lang not in self.languages:
+            raise ValueError(f"Source language '{source_lang}' not supported")
+        for target_lang in target_langs:
+            if target_lang not in self.languages:
+                raise ValueError(f"Target language '{target_lang}' not supported")
+
+    def _table(self, source_lang: str, target_lang: str) -> PhraseTable:
+        return self.phrase_tables.get((source_lang, target_lang), EMPTY_TABLE)
+
     def translate(self, text: str, source_lang: str = "en", target_lang: str = "es") -> dict:
         """
         Translate text from source language to target language.
-        
+
         Args:
             text: Text to translate
             source_lang: Source language code (default: en)
             target_lang: Target language code (default: es)
-            
+
         Returns:
             Dictionary with translation results
         """
-        if source_lang not in self.languages:
-            raise ValueError(f"Source language '{source_lang}' not supported")
-            
-        if target_lang not in self.languages:
-            raise ValueError(f"Target language '{target_lang}' not supported")
-            
-        # Simple word-by-word translation (for demo purposes)
-        words = text.lower().split()
-        translated_words = []
-        
-        for word in words:
-            if word in self.translations and target_lang in self.translations[word]:
-                translated_words.append(self.translations[word][target_lang])
-            else:
-                # If no translation is available, keep the original word
-                translated_words.append(f"[{word}]")
-                
-        translated_text = " ".join(translated_words)
-        
+        self._check_languages(source_lang, [target_lang])
+        translated_text = self._table(source_lang, target_lang).translate_tokens(text.lower().split())
+
         return {
             "source_text": text,
             "source_lang": self.languages[source_lang],
             "target_lang": self.languages[target_lang],
             "translated_text": translated_text
         }
-    
+
+    def translate_batch(
+        self,
+        texts: list,
+        source_lang: str = "en",
+        target_langs: Optional[list] = None
+    ) -> dict:
+        """
+        Translate many texts into one or more target languages in one call.
+
+        Each text is tokenized once and reused for every target language.
+
+        Args:
+            texts: Texts to translate
+            source_lang: Source language code (default: en)
+            target_langs: Target language codes (default: ["es"])
+
+        Returns:
+            Dictionary with one ``{"source_text", "translations"}`` entry per
+            text, in input order; ``translations`` maps each target language
+            code to the translated text
+        """
+        target_langs = target_langs or ["es"]
+        self._check_languages(source_lang, target_langs)
+        tables = [(target_lang, self._table(source_lang, target_lang)) for target_lang in target_langs]
+
+        results = []
+        for text in texts:
+            tokens = str(text).lower().split()
+            results.append({
+                "source_text": text,
+                "translations": {target_lang: table.translate_tokens(tokens) for target_lang, table in tables}
+            })
+
+        return {
+            "source_lang": self.languages[source_lang],
+            "target_langs": {target_lang: self.languages[target_lang] for target_lang in target_langs},
+            "results": results
+        }
+
     def get_supported_languages(self) -> dict:
         """
         Get a list of supported languages.
-        
+
         Returns:
             Dictionary of language codes and names
         """
-        return self.languages 
\ No newline at end of file
+        return self.languages